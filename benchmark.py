@@ -0,0 +1,284 @@
+import argparse
+import fnmatch
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import synthetic
+from sweep import SCRIPTS, load_inputs
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# background_store=WARM: skladište pozadina (--background-store) se pre merenja napuni jednim nemerenim prolazom
+WARM = 'warm'
+
+# Svaka kombinacija skripte i opcije koja se meri: (skripta iz sweep.SCRIPTS, funkcija brojanja, argumenti)
+CASES = {
+    'resenje': ('resenje', 'count_ducks_with_filled_contours', {}),
+    'resenje.scale2': ('resenje', 'count_ducks_with_filled_contours', {'scale': 2}),
+    'mikutapi': ('mikutapi', 'find_ducks', {}),
+    'ensemble': ('ensemble', 'count_ducks_ensemble', {}),
+    'kolokvijum': ('kolokvijum', 'count_blue_objects_crossing_center', {}),
+    'kolokvijum.threaded': ('kolokvijum', 'count_blue_objects_crossing_center', {'threaded': True}),
+    'kolokvijum.strip': ('kolokvijum', 'count_blue_objects_crossing_center', {'strip_width': 32}),
+    'kolokvijum.stride4': ('kolokvijum', 'count_blue_objects_crossing_center', {'idle_stride': 4}),
+    'kolokvijum.static': ('kolokvijum', 'count_blue_objects_crossing_center', {'background': 'static'}),
+    'kolokvijum.strip.static': ('kolokvijum', 'count_blue_objects_crossing_center',
+                                {'strip_width': 32, 'background': 'static'}),
+    'kolokvijum.warm': ('kolokvijum', 'count_blue_objects_crossing_center', {'background_store': WARM}),
+    'kolokvijum.strip.warm': ('kolokvijum', 'count_blue_objects_crossing_center',
+                              {'strip_width': 32, 'background_store': WARM}),
+    'klk': ('klk', 'count_and_evaluate_buzzy_beetles', {}),
+    'klk.threaded': ('klk', 'count_and_evaluate_buzzy_beetles', {'threaded': True}),
+    'klk.strip': ('klk', 'count_and_evaluate_buzzy_beetles', {'strip_width': 60}),
+}
+
+# Podfolder sa sintetičkim podacima za svaku skriptu
+DATASETS = {'resenje': 'ducks', 'mikutapi': 'ducks', 'ensemble': 'ducks', 'kolokvijum': 'kolokvijum', 'klk': 'klk'}
+
+# Metrike koje se porede sa baseline-om: (ime, True ako je veće bolje)
+COMPARED = (('throughput', True), ('latency_p90', False), ('peak_rss_mb', False))
+
+
+def dataset_specs(images=50, image_size=1024, ducks=(2, 10), videos=8, width=1280, height=720, frames=300,
+                  beetles=(1, 4), overlap=0.0, lighting=1.0, seed=0):
+    return {
+        'ducks': synthetic.ducks_spec(images, seed, image_size, ducks, overlap, lighting),
+        'kolokvijum': synthetic.beetles_spec('kolokvijum', videos, seed, width, height, frames, beetles, overlap,
+                                             lighting),
+        'klk': synthetic.beetles_spec('klk', videos, seed, width, height, frames, beetles, overlap, lighting),
+    }
+
+
+def prepare_data(data_dir, specs, needed):
+    # Generiše samo skupove koji nedostaju ili su napravljeni sa drugim parametrima
+    for name in needed:
+        folder = os.path.join(data_dir, name)
+        if synthetic.read_spec(folder) != specs[name]:
+            print(f"generating {folder}", file=sys.stderr)
+            synthetic.generate(folder, specs[name])
+
+
+def _peak_rss_mb():
+    # Linux: VmHWM je vršni RSS ovog programa; ru_maxrss posle fork+exec pamti i RSS roditelja
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is not None:
+        # ru_maxrss je u KB na Linuxu, u bajtovima na macOS-u
+        scale = 1 << 20 if sys.platform == 'darwin' else 1 << 10
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss) / (1 << 20)
+
+
+def _load_case(case_name, data_dir):
+    script_name, function, kwargs = CASES[case_name]
+    folder = os.path.join(data_dir, DATASETS[script_name])
+    # load_inputs dodaje folder skripte u sys.path, pa ide pre importa
+    inputs = load_inputs(script_name, folder)
+    script = SCRIPTS[script_name]
+    count_fn = getattr(importlib.import_module(script['module']), function)
+    return script, inputs, count_fn, {**script['defaults'], **kwargs}
+
+
+def _seed_background_store(case_name, data_dir, directory):
+    # Hladan prolaz sa istim opcijama upisuje uzorke pozadine svakog videa u directory
+    _, inputs, count_fn, kwargs = _load_case(case_name, data_dir)
+    kwargs['background_store'] = directory
+    for _, path, _ in inputs:
+        count_fn(path, **kwargs)
+
+
+def _run_case(case_name, data_dir, total_frames=None, background_store=None):
+    # Radi u novom procesu, pa je vršna memorija (RSS) samo ovog slučaja. Topli slučaj radi nad kopijom
+    # napunjenog skladišta pozadina, jer svaki prolaz prepisuje uzorke i sledeće ponavljanje bi krenulo od njih.
+    script, inputs, count_fn, kwargs = _load_case(case_name, data_dir)
+    if background_store is not None:
+        kwargs['background_store'] = tempfile.mkdtemp(prefix='backgrounds_')
+        shutil.copytree(background_store, kwargs['background_store'], dirs_exist_ok=True)
+
+    if script['inputs'] == 'images':
+        # Prvi poziv (učitavanje biblioteka, alokacije OpenCV-a) se ne meri
+        count_fn(inputs[0][1], **kwargs)
+
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    for _, path, true in inputs:
+        item_start = time.perf_counter()
+        count = count_fn(path, **kwargs)
+        latencies.append(time.perf_counter() - item_start)
+        errors.append(abs(count - true))
+    elapsed = time.perf_counter() - start
+    if background_store is not None:
+        shutil.rmtree(kwargs['background_store'], ignore_errors=True)
+
+    units = total_frames if total_frames else len(inputs)
+    return {
+        'items': len(inputs),
+        'unit': 'frames/s' if total_frames else 'images/s',
+        'throughput': units / elapsed,
+        'latency_p50': float(np.percentile(latencies, 50)),
+        'latency_p90': float(np.percentile(latencies, 90)),
+        'latency_p99': float(np.percentile(latencies, 99)),
+        'peak_rss_mb': _peak_rss_mb(),
+        'mae': float(np.mean(errors)),
+    }
+
+
+def run_benchmark(case_names, data_dir, specs, repeat=3):
+    # Svaki slučaj (i svako ponavljanje) u svom procesu; od ponavljanja se zadržava najbrže
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for case_name in case_names:
+        dataset = DATASETS[CASES[case_name][0]]
+        total_frames = specs[dataset].get('total_frames')
+        background_store = None
+        if CASES[case_name][2].get('background_store') == WARM:
+            background_store = tempfile.mkdtemp(prefix='backgrounds_')
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                executor.submit(_seed_background_store, case_name, data_dir, background_store).result()
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                runs.append(executor.submit(_run_case, case_name, data_dir, total_frames, background_store).result())
+        if background_store is not None:
+            shutil.rmtree(background_store, ignore_errors=True)
+        results[case_name] = max(runs, key=lambda run: run['throughput'])
+        print(format_result(case_name, results[case_name]))
+    return results
+
+
+def format_result(case_name, result):
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result['peak_rss_mb'] is not None else "n/a"
+    return (f"{case_name:22s} {result['throughput']:8.1f} {result['unit']:9s} "
+            f"p50 {1000 * result['latency_p50']:8.1f} ms  p90 {1000 * result['latency_p90']:8.1f} ms  "
+            f"p99 {1000 * result['latency_p99']:8.1f} ms  rss {rss:>7s}  MAE {result['mae']:.2f}")
+
+
+def compare(results, baseline, tolerance=0.15, rss_tolerance=0.2, mae_tolerance=0.0):
+    # Lista regresija u odnosu na baseline: pad brzine ili rast latencije/memorije preko tolerancije,
+    # i svaki rast MAE preko mae_tolerance
+    regressions = []
+    for case_name, result in results.items():
+        base = baseline['cases'].get(case_name)
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED:
+            if result[metric] is None or base[metric] is None:
+                continue
+            limit = rss_tolerance if metric == 'peak_rss_mb' else tolerance
+            if higher_is_better:
+                regressed = result[metric] < base[metric] * (1 - limit)
+            else:
+                regressed = result[metric] > base[metric] * (1 + limit)
+            if regressed:
+                regressions.append(f"{case_name}: {metric} {base[metric]:.4g} -> {result[metric]:.4g}")
+        if result['mae'] > base['mae'] + mae_tolerance:
+            regressions.append(f"{case_name}: mae {base['mae']:.3f} -> {result['mae']:.3f}")
+    return regressions
+
+
+def _select_cases(patterns):
+    if not patterns:
+        return list(CASES)
+    selected = [name for name in CASES if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+    if not selected:
+        raise SystemExit(f"no benchmark case matches {patterns}; cases: {', '.join(CASES)}")
+    return selected
+
+
+def main(data_dir='bench_data', cases=None, save=None, baseline=None, repeat=3, tolerance=0.15, rss_tolerance=0.2,
+         mae_tolerance=0.0, **spec_args):
+    specs = dataset_specs(**spec_args)
+    case_names = _select_cases(cases)
+
+    baseline_data = None
+    if baseline:
+        with open(baseline) as f:
+            baseline_data = json.load(f)
+        # Rezultati na drugačijim podacima nisu uporedivi
+        if baseline_data['datasets'] != specs:
+            raise SystemExit(f"{baseline} was recorded with different synthetic data settings; "
+                             f"re-run with the same options or record a new baseline")
+
+    prepare_data(data_dir, specs, sorted({DATASETS[CASES[name][0]] for name in case_names}))
+    results = run_benchmark(case_names, data_dir, specs, repeat)
+
+    if save:
+        with open(save, 'w') as f:
+            json.dump({'datasets': specs, 'machine': {'platform': platform.platform(), 'cpus': os.cpu_count(),
+                                                      'python': platform.python_version()},
+                       'cases': results}, f, indent=1)
+
+    if baseline_data is not None:
+        regressions = compare(results, baseline_data, tolerance, rss_tolerance, mae_tolerance)
+        if regressions:
+            print(f"REGRESSION against {baseline}:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            return 1
+        print(f"no regressions against {baseline}", file=sys.stderr)
+    return 0
+
+
+def _range(value):
+    low, _, high = value.partition(',')
+    return int(low), int(high or low)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark every counting pipeline on generated data: throughput, latency, peak RSS and MAE.")
+    parser.add_argument("-k", "--cases", action="append", metavar="PATTERN",
+                        help=f"run only matching cases (glob, repeatable): {', '.join(CASES)}")
+    parser.add_argument("--data", default="bench_data", help="folder for the generated data (reused between runs)")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a baseline JSON")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="compare against this baseline and exit with status 1 on any regression")
+    parser.add_argument("--repeat", type=int, default=3, help="run every case N times and keep the fastest run")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed relative throughput drop / p90 latency increase")
+    parser.add_argument("--rss-tolerance", type=float, default=0.2, help="allowed relative peak RSS increase")
+    parser.add_argument("--mae-tolerance", type=float, default=0.0, help="allowed absolute MAE increase")
+
+    data = parser.add_argument_group("synthetic data")
+    data.add_argument("--images", type=int, default=50, help="number of duck pictures")
+    data.add_argument("--image-size", type=int, default=1024)
+    data.add_argument("--ducks", type=_range, default=(2, 10), metavar="MIN,MAX", help="ducks per picture")
+    data.add_argument("--videos", type=int, default=8, help="number of videos per video script")
+    data.add_argument("--width", type=int, default=1280, help="video width")
+    data.add_argument("--height", type=int, default=720, help="video height")
+    data.add_argument("--frames", type=int, default=300, help="length of every video")
+    data.add_argument("--beetles", type=_range, default=(1, 4), metavar="MIN,MAX", help="beetles per video")
+    data.add_argument("--overlap", type=float, default=0.0,
+                      help="probability that an object touches (or closely follows) another one")
+    data.add_argument("--lighting", type=float, default=1.0, help="brightness gain")
+    data.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    sys.exit(main(args.data, args.cases, args.save, args.baseline, args.repeat, args.tolerance, args.rss_tolerance,
+                  args.mae_tolerance, images=args.images, image_size=args.image_size, ducks=args.ducks,
+                  videos=args.videos, width=args.width, height=args.height, frames=args.frames,
+                  beetles=args.beetles, overlap=args.overlap, lighting=args.lighting, seed=args.seed))
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+
+def _hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version(folder):
+    # Heš izvornog koda svih modula učitanih iz foldera skripte (skripta + pomoćni moduli),
+    # pa svaka izmena algoritma poništava stare rezultate
+    folder = os.path.abspath(folder)
+    paths = set()
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path and path.endswith('.py') and os.path.dirname(os.path.abspath(path)) == folder:
+            paths.add(os.path.abspath(path))
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class EvalCache:
+    # Predikcije po ulazu na disku (SQLite), ključ je (heš sadržaja ulaza, algoritam, parametri, verzija koda).
+    # Ponovno pokretanje računa samo ulaze koji su novi ili izmenjeni; promena parametara ili koda
+    # daje nove ključeve, a stari rezultati ostaju za slučaj povratka na prethodnu verziju.
+    def __init__(self, path, algorithm, params, version, commit_every=100):
+        self.algorithm = algorithm
+        self.params = json.dumps(params, sort_keys=True, default=list)
+        self.version = version
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self.missed_names = []  # samo prvih nekoliko, za izveštaj
+        self._pending = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS results "
+                        "(key TEXT PRIMARY KEY, algorithm TEXT, item TEXT, prediction, created REAL)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS hashes (stamp TEXT PRIMARY KEY, hash TEXT)")
+
+    def _content_hash(self, input_path):
+        # Heš se pamti po (putanja, veličina, vreme izmene), pa nepromenjen fajl ne čita se ponovo
+        try:
+            stat = os.stat(input_path)
+        except OSError:
+            return None
+        stamp = f"{os.path.abspath(input_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        row = self.db.execute("SELECT hash FROM hashes WHERE stamp = ?", (stamp,)).fetchone()
+        if row is not None:
+            return row[0]
+        content_hash = _hash_file(input_path)
+        self.db.execute("INSERT OR REPLACE INTO hashes VALUES (?, ?)", (stamp, content_hash))
+        self._changed()
+        return content_hash
+
+    def key(self, input_path):
+        # None za ulaz koji ne postoji; takav se uvek računa i ne upisuje
+        content_hash = self._content_hash(input_path)
+        if content_hash is None:
+            return None
+        material = json.dumps([content_hash, self.algorithm, self.params, self.version])
+        return hashlib.blake2b(material.encode(), digest_size=16).hexdigest()
+
+    def get(self, input_path):
+        key = self.key(input_path)
+        row = None if key is None else self.db.execute(
+            "SELECT prediction FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            if len(self.missed_names) < 10:
+                self.missed_names.append(os.path.basename(input_path))
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, input_path, prediction):
+        key = self.key(input_path)
+        if key is None:
+            return
+        self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                        (key, self.algorithm, os.path.basename(input_path), prediction, time.time()))
+        self._changed()
+
+    def _changed(self):
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.db.commit()
+            self._pending = 0
+
+    def predict(self, input_paths, compute):
+        # compute(putanje) vraća predikcije za ulaze kojih nema u kešu, istim redom
+        predictions = [self.get(path) for path in input_paths]
+        stale = [i for i, prediction in enumerate(predictions) if prediction is None]
+        if stale:
+            for i, prediction in zip(stale, compute([input_paths[i] for i in stale])):
+                predictions[i] = prediction
+                self.put(input_paths[i], prediction)
+        self.db.commit()
+        return predictions
+
+    def report(self, file=sys.stderr):
+        names = ', '.join(self.missed_names) + (' ...' if self.misses > len(self.missed_names) else '')
+        print(f"eval cache: {self.hits} hits, {self.misses} misses" + (f" ({names})" if names else ''), file=file)
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def open_eval_cache(path, script_file, algorithm, params):
+    # None kada keš nije uključen; verzija koda je heš modula iz foldera skripte
+    if not path:
+        return None
+    return EvalCache(path, algorithm, params, code_version(os.path.dirname(os.path.abspath(script_file))))
+
+
+def cached_predictions(cache, input_paths, compute):
+    if cache is None:
+        return compute(input_paths)
+    predictions = cache.predict(input_paths, compute)
+    cache.report()
+    cache.close()
+    return predictions
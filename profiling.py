@@ -0,0 +1,204 @@
+import json
+import os
+import sys
+import time
+import uuid
+from bisect import bisect_left
+
+# Gornje granice korpi histograma vremena faza (sekunde), kao podrazumevane u Prometheus klijentima
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Timer:
+    __slots__ = ('profile', 'name', 'start')
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profile:
+    # Merenja jedne obrade (slika ili video): histogram vremena po fazi i brojači događaja.
+    # Samo obični rečnici, pa se Profile iz procesa radnika vraća kao i svaki drugi rezultat.
+    enabled = True
+
+    def __init__(self, name=None):
+        self.name = name
+        self.seconds = 0.0
+        self.stages = {}  # faza -> [broj po korpi (poslednja je +Inf), zbir, broj merenja]
+        self.counters = {}
+
+    def stage(self, name):
+        return _Timer(self, name)
+
+    def observe(self, name, seconds):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        stage[0][bisect_left(BUCKETS, seconds)] += 1
+        stage[1] += seconds
+        stage[2] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NullProfile:
+    # Zamena kada merenje nije uključeno: jedan deljeni prazan kontekst i brojači koji ništa ne rade
+    enabled = False
+    _timer = _NullTimer()
+
+    def stage(self, name):
+        return self._timer
+
+    def observe(self, name, seconds):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_PROFILE = _NullProfile()
+
+
+class Profiled:
+    # Funkcija brojanja koja uz rezultat vraća i Profile; može da se pošalje procesu radniku
+    def __init__(self, count_fn):
+        self.count_fn = count_fn
+
+    def __call__(self, item, **kwargs):
+        profile = Profile(os.path.basename(item) if isinstance(item, str) else None)
+        start = time.perf_counter()
+        result = self.count_fn(item, profile=profile, **kwargs)
+        profile.seconds = time.perf_counter() - start
+        return result, profile
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class ProfileReport:
+    # Skuplja Profile svih obrađenih ulaza jedne skripte: zbirni histogrami i brojači, plus totali po fajlu
+    def __init__(self, script, json_path=None, prometheus_path=None):
+        self.script = script
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self.stages = {}
+        self.counters = {}
+        self.files = []
+
+    def wrap(self, count_fn):
+        return Profiled(count_fn)
+
+    def add(self, profile, name=None):
+        if name is not None:
+            profile.name = name
+        for stage, (buckets, total, n) in profile.stages.items():
+            merged = self.stages.setdefault(stage, [[0] * (len(BUCKETS) + 1), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+            merged[2] += n
+        for counter, value in profile.counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + value
+        self.files.append({'file': profile.name, 'seconds': profile.seconds,
+                           'stages': {stage: total for stage, (_, total, _) in profile.stages.items()},
+                           'counters': dict(profile.counters)})
+
+    def collect(self, results):
+        # Rezultati funkcije iz wrap(): Profile se zadržava, vraćaju se samo rezultati brojanja
+        plain = []
+        for result, profile in results:
+            self.add(profile)
+            plain.append(result)
+        return plain
+
+    def to_dict(self):
+        return {
+            'script': self.script,
+            'buckets': list(BUCKETS),
+            'stages': {stage: {'buckets': buckets, 'sum': total, 'count': n}
+                       for stage, (buckets, total, n) in sorted(self.stages.items())},
+            'counters': dict(sorted(self.counters.items())),
+            'files': self.files,
+        }
+
+    def prometheus(self):
+        # Tekstualni format koji čita Prometheus (npr. textfile collector node_exportera)
+        lines = ['# HELP cv_stage_seconds Wall time of one pass through a pipeline stage.',
+                 '# TYPE cv_stage_seconds histogram']
+        for stage, (buckets, total, n) in sorted(self.stages.items()):
+            cumulative = 0
+            for bound, value in zip(BUCKETS + ('+Inf',), buckets):
+                cumulative += value
+                lines.append(f'cv_stage_seconds_bucket{_labels(script=self.script, stage=stage, le=bound)} {cumulative}')
+            lines.append(f'cv_stage_seconds_sum{_labels(script=self.script, stage=stage)} {total}')
+            lines.append(f'cv_stage_seconds_count{_labels(script=self.script, stage=stage)} {n}')
+
+        lines += ['# HELP cv_events_total Pipeline events (frames, contours, candidates, colour checks, ...).',
+                  '# TYPE cv_events_total counter']
+        for counter, value in sorted(self.counters.items()):
+            lines.append(f'cv_events_total{_labels(script=self.script, event=counter)} {value}')
+
+        lines += ['# HELP cv_file_seconds Wall time of processing one input file.',
+                  '# TYPE cv_file_seconds gauge']
+        for entry in self.files:
+            lines.append(f'cv_file_seconds{_labels(script=self.script, file=entry["file"])} {entry["seconds"]}')
+        lines += ['# HELP cv_file_stage_seconds Wall time per stage for one input file.',
+                  '# TYPE cv_file_stage_seconds gauge']
+        for entry in self.files:
+            for stage, total in sorted(entry['stages'].items()):
+                lines.append(f'cv_file_stage_seconds{_labels(script=self.script, file=entry["file"], stage=stage)} '
+                             f'{total}')
+        lines += ['# HELP cv_file_events Pipeline events for one input file.',
+                  '# TYPE cv_file_events gauge']
+        for entry in self.files:
+            for counter, value in sorted(entry['counters'].items()):
+                lines.append(f'cv_file_events{_labels(script=self.script, file=entry["file"], event=counter)} '
+                             f'{value}')
+        return '\n'.join(lines) + '\n'
+
+    def _write(self, path, text):
+        # Zamena u jednom koraku, da čitač (collector) nikad ne vidi pola fajla
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def finish(self, file=sys.stderr):
+        if self.json_path:
+            self._write(self.json_path, json.dumps(self.to_dict(), indent=1))
+        if self.prometheus_path:
+            self._write(self.prometheus_path, self.prometheus())
+        stages = sorted(self.stages.items(), key=lambda item: -item[1][1])
+        print(f"profile: {len(self.files)} files, " +
+              ', '.join(f"{stage} {total:.2f} s" for stage, (_, total, _) in stages), file=file)
+
+
+def open_profile(script, json_path=None, prometheus_path=None):
+    # None kada merenje nije uključeno; funkcije brojanja tada koriste NULL_PROFILE
+    if not json_path and not prometheus_path:
+        return None
+    return ProfileReport(script, json_path, prometheus_path)
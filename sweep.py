@@ -0,0 +1,226 @@
+import argparse
+import ast
+import csv
+import importlib
+import itertools
+import os
+import sys
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Skripte koje se mogu podešavati: folder, modul, funkcija brojanja, vrsta ulaza i parametri
+# sa kojima ih poziva main() (sweep menja samo ono što je zadato u mreži)
+SCRIPTS = {
+    'resenje': {'folder': 'zadatak 1', 'module': 'resenje', 'function': 'count_ducks_with_filled_contours',
+                'inputs': 'images', 'defaults': {}},
+    'mikutapi': {'folder': 'zadatak 1', 'module': 'mikutapi', 'function': 'find_ducks',
+                 'inputs': 'images', 'defaults': {'min_area': 400, 'max_area': 5000}},
+    'ensemble': {'folder': 'zadatak 1', 'module': 'ensemble', 'function': 'count_ducks_ensemble',
+                 'inputs': 'images', 'defaults': {}},
+    'kolokvijum': {'folder': 'zadatak 2', 'module': 'kolokvijum', 'function': 'count_blue_objects_crossing_center',
+                   'inputs': 'videos', 'defaults': {'roi': (400, 250, 500, 320)}},
+    'klk': {'folder': 'zadatak 2', 'module': 'klk', 'function': 'count_and_evaluate_buzzy_beetles',
+            'inputs': 'videos', 'defaults': {}},
+}
+
+
+def _nbytes(value):
+    # Približna veličina međurezultata: nizovi po nbytes, kolekcije i objekti zbirno.
+    # Memorijski mapiran niz (frame store) je na disku i ne troši memoriju keša.
+    if isinstance(value, np.memmap):
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item) for item in value) + 8 * len(value)
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    if hasattr(value, '__dict__'):
+        return _nbytes(vars(value))
+    return sys.getsizeof(value)
+
+
+class StageCache:
+    # LRU keš izlaza faza. Ključ je (ime faze, ulaz, parametri od kojih faza zavisi), pa konfiguracije
+    # koje se razlikuju samo u kasnijim parametrima dele sve ranije faze. Vrednosti se ne menjaju
+    # posle upisa; ukupna veličina je ograničena na max_bytes.
+    def __init__(self, max_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.entries = OrderedDict()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def get(self, key, compute):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits[key[0]] += 1
+            return entry[0]
+
+        self.misses[key[0]] += 1
+        value = compute()
+        size = _nbytes(value)
+        if size <= self.max_bytes:
+            self.entries[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+        return value
+
+    def stats(self):
+        return {stage: (self.hits[stage], self.misses[stage]) for stage in sorted(set(self.hits) | set(self.misses))}
+
+
+def _freeze(value):
+    # Liste iz komandne linije postaju torke da bi parametri mogli da budu deo ključa
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def parse_grid(specs):
+    # "ime=[v1, v2, ...]" (Python literal); jedna vrednost bez liste je mreža od jednog elementa
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if not values:
+            raise ValueError(f"expected name=[values], got {spec!r}")
+        values = ast.literal_eval(values)
+        if not isinstance(values, list):
+            values = [values]
+        grid[name.strip()] = [_freeze(value) for value in values]
+    return grid
+
+
+def expand_grid(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _script_path(script):
+    return os.path.join(ROOT, script['folder'])
+
+
+def load_inputs(script_name, dataset_folder, manifest=None):
+    # (ime, putanja, tačan broj) za svaki ulaz, iz istog CSV-a koji koristi main() skripte
+    script = SCRIPTS[script_name]
+    sys.path.insert(0, _script_path(script))
+    if script['inputs'] == 'images':
+        from image_stream import iter_manifest
+        return list(iter_manifest(dataset_folder, manifest))
+    from video_batch import load_manifest
+    manifest_df, video_paths = load_manifest(dataset_folder, manifest)
+    return [(os.path.basename(path), path, int(count)) for path, count in zip(video_paths, manifest_df['count'])]
+
+
+def _init_worker(script_path):
+    sys.path.insert(0, script_path)
+    cv2.setNumThreads(1)
+
+
+def _sweep_inputs(script_name, inputs, configs, max_bytes, fixed=None):
+    # Jedan proces obrađuje svoje ulaze redom i za svaki ulaz sve konfiguracije, pa su u kešu
+    # istovremeno samo faze tog ulaza
+    script = SCRIPTS[script_name]
+    count_fn = getattr(importlib.import_module(script['module']), script['function'])
+    stages = StageCache(max_bytes)
+    errors = np.zeros((len(configs), len(inputs)))
+    for j, (_, path, true) in enumerate(inputs):
+        for i, config in enumerate(configs):
+            count = count_fn(path, stages=stages, **{**script['defaults'], **(fixed or {}), **config})
+            errors[i, j] = abs(count - true)
+    return errors, stages.stats()
+
+
+def run_sweep(script_name, inputs, configs, workers=1, max_bytes=1 << 30, fixed=None):
+    # Vraća MAE za svaku konfiguraciju i zbirnu statistiku keša po fazama
+    script_path = _script_path(SCRIPTS[script_name])
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(inputs)))
+
+    # Ulazi se dele između procesa (svaki proces ima svoj keš), a ne konfiguracije
+    parts = [list(range(k, len(inputs), workers)) for k in range(workers)]
+    if workers == 1:
+        _init_worker(script_path)
+        results = [_sweep_inputs(script_name, inputs, configs, max_bytes, fixed)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(script_path,)) as executor:
+            results = list(executor.map(_sweep_inputs, [script_name] * workers,
+                                        [[inputs[k] for k in part] for part in parts],
+                                        [configs] * workers, [max_bytes] * workers, [fixed] * workers))
+
+    errors = np.zeros((len(configs), len(inputs)))
+    stats = defaultdict(lambda: [0, 0])
+    for part, (part_errors, part_stats) in zip(parts, results):
+        errors[:, part] = part_errors
+        for stage, (hits, misses) in part_stats.items():
+            stats[stage][0] += hits
+            stats[stage][1] += misses
+    return errors.mean(axis=1), dict(stats)
+
+
+def _format_config(config):
+    return ' '.join(f"{name}={value}" for name, value in config.items()) or '(defaults)'
+
+
+def main(script_name, dataset_folder, params, manifest=None, workers=1, cache_mb=1024, top=None, output=None,
+         frame_store=None, frame_store_mb=4096):
+    grid = parse_grid(params)
+    configs = expand_grid(grid)
+    inputs = load_inputs(script_name, dataset_folder, manifest)
+
+    fixed = {}
+    if frame_store and SCRIPTS[script_name]['inputs'] == 'videos':
+        # Videi se dekodiraju samo jednom i za sve sledeće sweep-ove (vidi frame_store.py)
+        from frame_store import FrameStore
+        fixed['frame_store'] = FrameStore(frame_store, frame_store_mb << 20)
+
+    start = time.perf_counter()
+    maes, stats = run_sweep(script_name, inputs, configs, workers=workers, max_bytes=cache_mb << 20, fixed=fixed)
+    elapsed = time.perf_counter() - start
+
+    order = sorted(range(len(configs)), key=lambda i: maes[i])
+    for i in order[:top]:
+        print(f"{maes[i]:.2f}  {_format_config(configs[i])}")
+
+    if output:
+        with open(output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(grid) + ['mae'])
+            for i in order:
+                writer.writerow([configs[i][name] for name in grid] + [maes[i]])
+
+    print(f"{len(configs)} configurations x {len(inputs)} inputs in {elapsed:.1f} s", file=sys.stderr)
+    for stage, (hits, misses) in sorted(stats.items()):
+        print(f"  {stage}: {hits} hits, {misses} misses", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run a counting script over a parameter grid and print the MAE of every configuration.")
+    parser.add_argument("script", choices=sorted(SCRIPTS))
+    parser.add_argument("dataset_folder")
+    parser.add_argument("-p", "--param", action="append", default=[], metavar="NAME=[V1,V2,...]",
+                        help="keyword argument of the counting function and the values to try (Python literals)")
+    parser.add_argument("--manifest", help="CSV with ground truth (default: the script's CSV in dataset_folder)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="worker processes; inputs are split between them (0 = one per CPU core)")
+    parser.add_argument("--cache-mb", type=int, default=1024, help="memory limit of each worker's stage cache")
+    parser.add_argument("--top", type=int, help="print only the N best configurations")
+    parser.add_argument("-o", "--output", help="write every configuration and its MAE to this CSV")
+    parser.add_argument("--frame-store", metavar="DIR",
+                        help="video scripts: keep decoded ROI frames in DIR and memory-map them on later sweeps")
+    parser.add_argument("--frame-store-mb", type=int, default=4096, help="size limit of the frame store")
+    args = parser.parse_args()
+    main(args.script, args.dataset_folder, args.param, manifest=args.manifest, workers=args.workers,
+         cache_mb=args.cache_mb, top=args.top, output=args.output, frame_store=args.frame_store,
+         frame_store_mb=args.frame_store_mb)
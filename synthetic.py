@@ -0,0 +1,247 @@
+import argparse
+import csv
+import json
+import os
+
+import cv2
+import numpy as np
+
+# Sintetički ulazi sa poznatim tačnim brojem, u istom formatu kao data/ folderi zadataka
+# (picture_N.jpg + duck_count.csv, video_N.mp4 + buzzy_beetle_count.csv), pa ih skripte čitaju direktno.
+
+# Boje su zadate u HSV-u (OpenCV skala) tako da odgovaraju opsezima koje skripte traže
+DUCK_BGR = (30, 55, 105)
+BEAK_BGR = (40, 190, 230)
+WATER_BGR = (200, 185, 80)
+TILE_BGR = (210, 200, 100)
+RIM_BGR = (215, 222, 226)
+GRASS_BGR = (70, 160, 140)
+
+# Beetle videi za svaku skriptu: boja (HSV), veličina pravougaonika i traka kojom se objekti kreću
+# (x od, x do, y od, y do, u pikselima frejma – ROI skripti su zadati u pikselima, ne relativno).
+# Objekti su puni pravougaonici jer kolokvijum.py proverava srednju boju celog bounding box-a.
+BEETLE_PRESETS = {
+    'kolokvijum': {'hsv': (70, 135, 160), 'size': (40, 50), 'lane': (300, 980, 280, 540)},
+    'klk': {'hsv': (110, 200, 120), 'size': (40, 40), 'lane': (300, 980, 280, 540)},
+}
+
+
+def _hsv_to_bgr(hsv):
+    return tuple(int(v) for v in cv2.cvtColor(np.uint8([[hsv]]), cv2.COLOR_HSV2BGR)[0, 0])
+
+
+def _apply_lighting(img, rng, lighting, noise, gradient=0.1):
+    # Pojačanje osvetljenja, blagi gradijent sleva nadesno i Gausov šum
+    gain = np.linspace(1 - gradient, 1 + gradient, img.shape[1], dtype=np.float32)[None, :, None] * lighting
+    noisy = img * gain + rng.normal(0, noise, img.shape).astype(np.float32)
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def _duck_positions(rng, ducks, center, radius, spacing, overlap):
+    # Centri patkica unutar bazena; sa verovatnoćom overlap patkica se stavlja uz neku postojeću
+    # (dodiruju se ili preklapaju), inače na razmaku od bar spacing piksela od ostalih
+    positions = []
+    for _ in range(ducks):
+        touching = bool(positions) and rng.random() < overlap
+        for _ in range(200):
+            if touching:
+                px, py = positions[rng.integers(len(positions))]
+                angle = rng.uniform(0, 2 * np.pi)
+                x, y = px + spacing / 3 * np.cos(angle), py + spacing / 3 * np.sin(angle)
+            else:
+                r = radius * np.sqrt(rng.random())
+                angle = rng.uniform(0, 2 * np.pi)
+                x, y = center + r * np.cos(angle), center + r * np.sin(angle)
+            if np.hypot(x - center, y - center) > radius:
+                continue
+            if touching or all(np.hypot(x - a, y - b) >= spacing for a, b in positions):
+                break
+        positions.append((x, y))
+    return positions
+
+
+def duck_image(rng, size=1024, ducks=6, overlap=0.0, lighting=1.0, noise=4.0):
+    # Bazen odozgo (trava, ivica, voda sa pločicama) i tamne patkice; razmere odgovaraju slikama
+    # iz zadatak 1/data na 1024x1024, za druge veličine sve se skalira
+    s = size / 1024
+    center = size // 2
+    img = np.empty((size, size, 3), np.uint8)
+    img[:] = GRASS_BGR
+    cv2.circle(img, (center, center), int(330 * s), RIM_BGR, -1, cv2.LINE_AA)
+
+    water = np.zeros((size, size), np.uint8)
+    cv2.circle(water, (center, center), int(300 * s), 255, -1, cv2.LINE_AA)
+    pool = np.empty_like(img)
+    pool[:] = WATER_BGR
+    for k in range(0, size, max(2, int(24 * s))):
+        cv2.line(pool, (k, 0), (k, size), TILE_BGR, 1)
+        cv2.line(pool, (0, k), (size, k), TILE_BGR, 1)
+    img[water > 0] = pool[water > 0]
+
+    for x, y in _duck_positions(rng, ducks, center, 230 * s, 120 * s, overlap):
+        angle = rng.uniform(0, 180)
+        axes = (int(rng.uniform(36, 44) * s), int(rng.uniform(20, 24) * s))
+        cv2.ellipse(img, (int(x), int(y)), axes, angle, 0, 360, DUCK_BGR, -1, cv2.LINE_AA)
+        head = axes[0] - 4 * s
+        cv2.circle(img, (int(x + head * np.cos(np.radians(angle))), int(y + head * np.sin(np.radians(angle)))),
+                   max(1, int(6 * s)), BEAK_BGR, -1, cv2.LINE_AA)
+    return _apply_lighting(img, rng, lighting, noise)
+
+
+def beetle_video(path, rng, preset='kolokvijum', width=1280, height=720, frames=300, beetles=3, overlap=0.0,
+                 lighting=1.0, noise=2.0, fps=30, noise_bank=8):
+    # Objekti boje preseta prelaze traku sleva nadesno (svaki jednom), u nasumičnim redovima i brzinama.
+    # Sa verovatnoćom overlap objekat ide odmah iza prethodnog u istom redu (teži slučaj za praćenje).
+    # Vraća broj frejmova.
+    spec = BEETLE_PRESETS[preset]
+    w, h = spec['size']
+    x0, x1, y0, y1 = spec['lane']
+    color = tuple(min(255, int(round(c * lighting))) for c in _hsv_to_bgr(spec['hsv']))
+
+    def window(start, speed):
+        return start, start + (x1 - x0) / speed
+
+    def collides(start, speed, y):
+        # Objekti u redovima bližim od visine objekta su u traci bar 2 s razmaknuti
+        # (bliske objekte pravi samo overlap)
+        begin, end = window(start, speed)
+        gap = 2 * fps
+        return any(abs(y - other_y) < h + 10 and begin <= window(*other)[1] + gap and window(*other)[0] <= end + gap
+                   for *other, other_y in objects)
+
+    objects = []
+    for _ in range(beetles):
+        if objects and rng.random() < overlap:
+            start, speed, y = objects[-1]
+            start += (w + 6) / speed
+        else:
+            for _ in range(100):
+                speed = float(rng.uniform(3, 6))
+                start = float(rng.uniform(5, max(6, frames - (x1 - x0) / speed)))
+                y = float(rng.uniform(y0, y1 - h))
+                if not collides(start, speed, y):
+                    break
+        objects.append((start, speed, y))
+
+    background = np.empty((height, width, 3), np.uint8)
+    background[:] = (90, 110, 100)
+    background[:, :, 0] = np.linspace(60, 140, width).astype(np.uint8)[None, :]
+    background = _apply_lighting(background, rng, lighting, 0, gradient=0.0)
+
+    # Šum se bira iz nekoliko unapred napravljenih frejmova (pozitivni i negativni deo, zbog uint8)
+    bank = [rng.normal(0, noise, background.shape) for _ in range(noise_bank)]
+    bank = [(np.clip(n, 0, 255).astype(np.uint8), np.clip(-n, 0, 255).astype(np.uint8)) for n in bank]
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for f in range(frames):
+        frame = background.copy()
+        for start, speed, y in objects:
+            x = x0 + (f - start) * speed
+            if f >= start and x <= x1:
+                cv2.rectangle(frame, (int(x), int(y)), (int(x) + w, int(y) + h), color, -1)
+        positive, negative = bank[rng.integers(noise_bank)]
+        writer.write(cv2.subtract(cv2.add(frame, positive), negative))
+    writer.release()
+    return frames
+
+
+def _count(rng, count_range):
+    low, high = count_range
+    return int(rng.integers(low, high + 1))
+
+
+def _write_spec(folder, spec):
+    with open(os.path.join(folder, 'spec.json'), 'w') as f:
+        json.dump(spec, f, indent=1)
+
+
+def read_spec(folder):
+    # Parametri sa kojima je folder generisan; None ako ne postoji
+    try:
+        with open(os.path.join(folder, 'spec.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ducks_spec(n=50, seed=0, size=1024, ducks=(2, 10), overlap=0.0, lighting=1.0, quality=90):
+    return {'kind': 'ducks', 'n': n, 'seed': seed, 'size': size, 'ducks': list(ducks), 'overlap': overlap,
+            'lighting': lighting, 'quality': quality}
+
+
+def beetles_spec(preset='kolokvijum', n=8, seed=0, width=1280, height=720, frames=300, beetles=(1, 4), overlap=0.0,
+                 lighting=1.0):
+    return {'kind': 'beetles', 'preset': preset, 'n': n, 'seed': seed, 'width': width, 'height': height,
+            'frames': frames, 'beetles': list(beetles), 'overlap': overlap, 'lighting': lighting,
+            'total_frames': n * frames}
+
+
+def _generate_ducks(folder, spec, writer):
+    rng = np.random.default_rng(spec['seed'])
+    writer.writerow(['picture', 'ducks'])
+    for i in range(1, spec['n'] + 1):
+        count = _count(rng, spec['ducks'])
+        img = duck_image(rng, spec['size'], count, spec['overlap'], spec['lighting'])
+        cv2.imwrite(os.path.join(folder, f'picture_{i}.jpg'), img, [cv2.IMWRITE_JPEG_QUALITY, spec['quality']])
+        writer.writerow([f'picture_{i}.jpg', count])
+
+
+def _generate_beetles(folder, spec, writer):
+    rng = np.random.default_rng(spec['seed'])
+    writer.writerow(['video', 'count'])
+    for i in range(1, spec['n'] + 1):
+        count = _count(rng, spec['beetles'])
+        beetle_video(os.path.join(folder, f'video_{i}.mp4'), rng, spec['preset'], spec['width'], spec['height'],
+                     spec['frames'], count, spec['overlap'], spec['lighting'])
+        writer.writerow([f'video_{i}.mp4', count])
+
+
+def generate(folder, spec):
+    # Isti spec (i seed) uvek daje iste slike/videe i isti tačan broj; spec se čuva u folderu
+    os.makedirs(folder, exist_ok=True)
+    manifest = 'duck_count.csv' if spec['kind'] == 'ducks' else 'buzzy_beetle_count.csv'
+    with open(os.path.join(folder, manifest), 'w', newline='') as f:
+        (_generate_ducks if spec['kind'] == 'ducks' else _generate_beetles)(folder, spec, csv.writer(f))
+    _write_spec(folder, spec)
+
+
+def _range(value):
+    low, _, high = value.partition(',')
+    return int(low), int(high or low)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic duck pictures or beetle videos with known counts.")
+    subparsers = parser.add_subparsers(dest="kind", required=True)
+
+    ducks_parser = subparsers.add_parser("ducks", help="picture_N.jpg + duck_count.csv")
+    ducks_parser.add_argument("folder")
+    ducks_parser.add_argument("-n", type=int, default=50, help="number of pictures")
+    ducks_parser.add_argument("--size", type=int, default=1024, help="picture width and height")
+    ducks_parser.add_argument("--ducks", type=_range, default=(2, 10), metavar="MIN,MAX", help="ducks per picture")
+    ducks_parser.add_argument("--quality", type=int, default=90, help="JPEG quality")
+
+    beetles_parser = subparsers.add_parser("beetles", help="video_N.mp4 + buzzy_beetle_count.csv")
+    beetles_parser.add_argument("folder")
+    beetles_parser.add_argument("--preset", choices=sorted(BEETLE_PRESETS), default="kolokvijum",
+                                help="colour and size of the objects the given script looks for")
+    beetles_parser.add_argument("-n", type=int, default=8, help="number of videos")
+    beetles_parser.add_argument("--width", type=int, default=1280)
+    beetles_parser.add_argument("--height", type=int, default=720)
+    beetles_parser.add_argument("--frames", type=int, default=300, help="length of every video")
+    beetles_parser.add_argument("--beetles", type=_range, default=(1, 4), metavar="MIN,MAX",
+                                help="objects crossing the line per video")
+
+    for subparser in (ducks_parser, beetles_parser):
+        subparser.add_argument("--seed", type=int, default=0)
+        subparser.add_argument("--overlap", type=float, default=0.0,
+                               help="probability that an object touches (or closely follows) another one")
+        subparser.add_argument("--lighting", type=float, default=1.0, help="brightness gain")
+
+    args = parser.parse_args()
+    if args.kind == "ducks":
+        spec = ducks_spec(args.n, args.seed, args.size, args.ducks, args.overlap, args.lighting, args.quality)
+    else:
+        spec = beetles_spec(args.preset, args.n, args.seed, args.width, args.height, args.frames, args.beetles,
+                            args.overlap, args.lighting)
+    generate(args.folder, spec)
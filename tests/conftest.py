@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Skripte zadataka nisu paket, pa se njihovi folderi (i koren, zbog zajedničkih modula) dodaju na putanju
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for folder in (ROOT, os.path.join(ROOT, 'zadatak 1'), os.path.join(ROOT, 'zadatak 2')):
+    sys.path.insert(0, folder)
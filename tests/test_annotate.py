@@ -0,0 +1,39 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+from annotate import Annotator
+from kolokvijum import ROI, count_blue_objects_crossing_center
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'zadatak 2', 'data')
+
+
+def _written(path):
+    return sorted(int(name[len('frame_'):-len('.png')]) for name in os.listdir(path))
+
+
+def test_every_counts_submitted_frames_not_frame_indices(tmp_path):
+    # Analiza preskače frejmove, pa indeksi predatih frejmova ne moraju biti deljivi sa every
+    annotator = Annotator(str(tmp_path / 'frames'), every=2)
+    frame = np.zeros((8, 8, 3), np.uint8)
+    for frame_index in (1, 5, 9, 13, 17, 21):
+        annotator.submit(frame_index, frame)
+    annotator.close(file=io.StringIO())
+    assert _written(str(tmp_path / 'frames')) == [1, 9, 17]
+
+
+def test_keep_frames_are_always_written(tmp_path):
+    annotator = Annotator(str(tmp_path / 'frames'), every=0)
+    frame = np.zeros((8, 8, 3), np.uint8)
+    annotator.submit(3, frame)
+    annotator.submit(7, frame, keep=True)
+    annotator.close(file=io.StringIO())
+    assert _written(str(tmp_path / 'frames')) == [7]
+
+
+def test_show_frames_is_a_deprecated_no_op():
+    video = os.path.join(DATA, 'video_5.mp4')
+    with pytest.warns(DeprecationWarning, match='show_frames'):
+        assert count_blue_objects_crossing_center(video, True, ROI) == count_blue_objects_crossing_center(video, roi=ROI)
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+import ensemble
+from ensemble import combine, count_ducks_ensemble
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'zadatak 1', 'data')
+
+
+@pytest.mark.parametrize('counts, policy, min_count, expected', [
+    # primary: prvi član, a sledeći tek kada svi pre njega nađu manje od min_count
+    ([5, 7], 'primary', 1, 5),
+    ([0, 7], 'primary', 1, 7),
+    ([2, 7], 'primary', 3, 7),
+    ([0, 0, 4], 'primary', 1, 4),
+    # Niko ne dostiže min_count: ostaje prvi član
+    ([0, 0], 'primary', 1, 0),
+    ([2, 1], 'primary', 3, 2),
+    # mean/median se zaokružuju, .5 naviše
+    ([4, 7], 'mean', 1, 6),
+    ([4, 6], 'mean', 1, 5),
+    ([1, 2, 9], 'mean', 1, 4),
+    ([1, 2, 9], 'median', 1, 2),
+    ([3, 4], 'median', 1, 4),
+    ([3, 8], 'min', 1, 3),
+    ([3, 8], 'max', 1, 8),
+])
+def test_combine(counts, policy, min_count, expected):
+    assert combine(counts, policy, min_count) == expected
+
+
+def test_combine_rejects_unknown_policy():
+    with pytest.raises(ValueError, match='policy must be one of'):
+        combine([1, 2], 'vote')
+
+
+def test_primary_falls_back_to_the_next_member(monkeypatch):
+    calls = []
+
+    def member(count):
+        def count_fn(image_path, **kwargs):
+            calls.append(count)
+            return count
+        return count_fn, {}
+
+    monkeypatch.setattr(ensemble, 'MEMBERS', {'a': member(0), 'b': member(6)})
+    path = os.path.join(DATA, 'picture_1.jpg')
+    assert count_ducks_ensemble(path, members=('a', 'b'), return_members=True) == (6, {'a': 0, 'b': 6})
+    assert count_ducks_ensemble(path, members=('b', 'a'), policy='min') == 0
+    assert calls == [0, 6, 6, 0]
@@ -0,0 +1,81 @@
+import importlib.util
+import sys
+
+from eval_cache import EvalCache, code_version
+
+
+def _inputs(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'picture_{i}.jpg'
+        path.write_bytes(bytes([i]) * 100)
+        paths.append(str(path))
+    return paths
+
+
+def _load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _run(db, version, paths, params=None):
+    computed = []
+
+    def compute(stale):
+        computed.extend(stale)
+        return [len(path) for path in stale]
+
+    cache = EvalCache(db, 'algo', params or {'scale': 1}, version)
+    predictions = cache.predict(paths, compute)
+    cache.close()
+    return predictions, computed, (cache.hits, cache.misses)
+
+
+def test_second_run_is_served_from_the_cache(tmp_path):
+    paths = _inputs(tmp_path)
+    db = str(tmp_path / 'cache.sqlite')
+    first, computed, stats = _run(db, 'v1', paths)
+    assert computed == paths and stats == (0, 3)
+    second, computed, stats = _run(db, 'v1', paths)
+    assert second == first and computed == [] and stats == (3, 0)
+
+
+def test_changed_input_or_params_are_recomputed(tmp_path):
+    paths = _inputs(tmp_path)
+    db = str(tmp_path / 'cache.sqlite')
+    _run(db, 'v1', paths)
+    with open(paths[1], 'ab') as f:
+        f.write(b'changed')
+    _, computed, stats = _run(db, 'v1', paths)
+    assert computed == [paths[1]] and stats == (2, 1)
+    _, computed, _ = _run(db, 'v1', paths, {'scale': 2})
+    assert computed == paths
+
+
+def test_code_change_misses_and_reverting_hits_again(tmp_path, monkeypatch):
+    folder = tmp_path / 'script'
+    folder.mkdir()
+    module_path = folder / 'counter_under_test.py'
+    module_path.write_text('THRESHOLD = 80\n')
+    monkeypatch.setitem(sys.modules, 'counter_under_test', None)
+    _load_module(str(module_path), 'counter_under_test')
+    old_version = code_version(str(folder))
+
+    paths = _inputs(tmp_path)
+    db = str(tmp_path / 'cache.sqlite')
+    _run(db, old_version, paths)
+
+    module_path.write_text('THRESHOLD = 85\n')
+    new_version = code_version(str(folder))
+    assert new_version != old_version
+    _, computed, stats = _run(db, new_version, paths)
+    assert computed == paths and stats == (0, 3)
+
+    # Stari rezultati ostaju, pa povratak na prethodni kod ponovo daje pogotke
+    module_path.write_text('THRESHOLD = 80\n')
+    assert code_version(str(folder)) == old_version
+    _, computed, stats = _run(db, old_version, paths)
+    assert computed == [] and stats == (3, 0)
@@ -0,0 +1,115 @@
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+import frame_store
+from frame_store import FrameStore
+
+
+def _video(path, frames=6, value=0):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 48))
+    for i in range(frames):
+        frame = np.full((48, 64, 3), (value + 10 * i) % 256, np.uint8)
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+def _entries(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.frames'))
+
+
+def test_second_read_reuses_decoded_frames(tmp_path):
+    video = _video(tmp_path / 'a.mp4')
+    store = FrameStore(str(tmp_path / 'store'))
+    first = np.array(store.frames(video, (8, 8, 32, 24)))
+    second = store.frames(video, (8, 8, 32, 24))
+    assert (store.misses, store.hits) == (1, 1)
+    assert isinstance(second, np.memmap)
+    assert second.shape == (6, 24, 32, 3)
+    assert np.array_equal(first, second)
+
+
+def test_copied_video_is_found_by_content(tmp_path):
+    video = _video(tmp_path / 'a.mp4')
+    copy = str(tmp_path / 'b.mp4')
+    shutil.copy(video, copy)
+    store = FrameStore(str(tmp_path / 'store'))
+    store.frames(video)
+    store.frames(copy)
+    assert (store.misses, store.hits) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    videos = [_video(tmp_path / f'{i}.mp4', value=40 * i) for i in range(3)]
+    store = FrameStore(str(tmp_path / 'store'), max_bytes=2 * 6 * 48 * 64 * 3)
+    keys = {video: store.key(video) for video in videos}
+    store.frames(videos[0])
+    store.frames(videos[1])
+    # Pogodak osvežava vreme korišćenja, pa je videos[1] najdavnije korišćen
+    os.utime(os.path.join(str(tmp_path / 'store'), keys[videos[0]] + '.frames'), (0, 0))
+    store.frames(videos[0])
+    os.utime(os.path.join(str(tmp_path / 'store'), keys[videos[1]] + '.frames'), (1, 1))
+    store.frames(videos[2])
+    names = _entries(str(tmp_path / 'store'))
+    assert names == sorted(keys[video] + '.frames' for video in (videos[0], videos[2]))
+    assert not os.path.exists(os.path.join(str(tmp_path / 'store'), keys[videos[1]] + '.json'))
+
+
+def test_eviction_skips_files_removed_by_another_process(tmp_path, monkeypatch):
+    store = FrameStore(str(tmp_path / 'store'), max_bytes=0)
+    store.frames(_video(tmp_path / 'a.mp4'))
+    listdir = os.listdir
+    monkeypatch.setattr(frame_store.os, 'listdir', lambda path: listdir(path) + ['gone.frames'])
+    store.frames(_video(tmp_path / 'b.mp4', value=100))
+    monkeypatch.undo()
+    assert len(_entries(str(tmp_path / 'store'))) == 1
+
+
+def _read_all(directory, videos):
+    store = FrameStore(directory, max_bytes=3 * 6 * 48 * 64 * 3)
+    return [store.frames(video).shape[0] for video in videos]
+
+
+def test_parallel_workers_share_one_store(tmp_path):
+    videos = [_video(tmp_path / f'{i}.mp4', value=30 * i) for i in range(8)]
+    directory = str(tmp_path / 'store')
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(_read_all, [directory] * 8, [videos[i:] + videos[:i] for i in range(8)]))
+    assert results == [[6] * 8] * 8
+    assert len(os.listdir(os.path.join(directory, 'hashes'))) == 8
+
+
+def test_stale_tmp_files_are_removed_when_the_store_opens(tmp_path):
+    directory = str(tmp_path / 'store')
+    FrameStore(directory)
+    stale = [os.path.join(directory, 'a_full.frames.1.tmp'), os.path.join(directory, 'hashes', 'b.2.tmp')]
+    fresh = os.path.join(directory, 'c_full.frames.3.tmp')
+    for path in stale + [fresh]:
+        with open(path, 'wb') as f:
+            f.write(b'x')
+    for path in stale:
+        os.utime(path, (0, 0))
+    FrameStore(directory)
+    # Svež .tmp može biti upis drugog procesa koji je još u toku
+    assert [os.path.exists(path) for path in stale + [fresh]] == [False, False, True]
+
+
+def test_hash_stamps_of_evicted_videos_are_removed(tmp_path):
+    directory = str(tmp_path / 'store')
+    hashes = os.path.join(directory, 'hashes')
+    videos = [_video(tmp_path / f'{i}.mp4', value=40 * i) for i in range(3)]
+    store = FrameStore(directory, max_bytes=6 * 48 * 64 * 3)
+    store.frames(videos[0])
+    store.frames(videos[1])
+    # videos[0] je izbačen, ali je njegov zapis heša još nov
+    assert len(os.listdir(hashes)) == 2
+    for name in os.listdir(hashes):
+        os.utime(os.path.join(hashes, name), (0, 0))
+    store.frames(videos[2])
+    assert len(_entries(directory)) == 1
+    with open(os.path.join(hashes, os.listdir(hashes)[0])) as f:
+        assert _entries(directory) == [f.read() + '_full.frames']
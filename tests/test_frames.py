@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+
+import synthetic
+from frames import FrameReader, ThreadedFrameReader
+from klk import count_and_evaluate_buzzy_beetles
+from kolokvijum import ROI, count_blue_objects_crossing_center
+
+
+def _clip(folder, preset):
+    synthetic.generate(str(folder), synthetic.beetles_spec(preset, n=1))
+    return os.path.join(str(folder), 'video_1.mp4')
+
+
+def _read_all(reader, skips):
+    # (indeks, isečak) svakog vraćenog frejma, sa preskakanjem posle svakog po skips redom
+    frames = []
+    while True:
+        frame = reader.read()
+        if frame is None:
+            break
+        frames.append((reader.position, frame.copy()))
+        reader.skip(skips[len(frames) % len(skips)])
+    reader.release()
+    return frames
+
+
+def test_threaded_reader_returns_the_same_frames(tmp_path):
+    path = _clip(tmp_path, 'kolokvijum')
+    skips = [0, 0, 3, 1, 0, 7]
+    serial = _read_all(FrameReader(path, ROI), skips)
+    threaded = _read_all(ThreadedFrameReader(path, ROI, buffer_size=3), skips)
+    assert [index for index, _ in threaded] == [index for index, _ in serial]
+    assert all(np.array_equal(a, b) for (_, a), (_, b) in zip(serial, threaded))
+
+
+def test_threaded_and_serial_counts_match(tmp_path):
+    path = _clip(tmp_path / 'kolokvijum', 'kolokvijum')
+    serial = count_blue_objects_crossing_center(path, roi=ROI)
+    assert count_blue_objects_crossing_center(path, roi=ROI, threaded=True, buffer_size=4) == serial
+
+    path = _clip(tmp_path / 'klk', 'klk')
+    serial = count_and_evaluate_buzzy_beetles(path)
+    assert count_and_evaluate_buzzy_beetles(path, threaded=True, buffer_size=4) == serial
+
+
+def test_decoder_error_is_raised_in_the_consumer(tmp_path, monkeypatch):
+    path = _clip(tmp_path, 'kolokvijum')
+    decode = ThreadedFrameReader._decode
+
+    def failing_decode(self):
+        if self._next_index == 5:
+            raise OSError('read error')
+        return decode(self)
+
+    monkeypatch.setattr(ThreadedFrameReader, '_decode', failing_decode)
+    reader = ThreadedFrameReader(path, ROI, buffer_size=3)
+    frames = 0
+    with pytest.raises(OSError, match='read error'):
+        while reader.read() is not None:
+            frames += 1
+    reader.release()
+    # Frejmovi dekodirani pre greške se i dalje vraćaju
+    assert frames == 5
+
+    with pytest.raises(OSError, match='read error'):
+        count_blue_objects_crossing_center(path, roi=ROI, threaded=True)
@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+import pytest
+
+from hsv_features import HsvBoxMeans, SharedHsv, in_hsv_range
+
+
+def _reference_means(frame, boxes):
+    # Provera boje pre integralnih slika: konverzija isečka pa cv2.mean
+    return np.array([cv2.mean(cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2HSV))[:3] for x, y, w, h in boxes])
+
+
+def _random_boxes(rng, width, height, n):
+    # Okviri mogu izlaziti preko desne i donje ivice, kao isečci u kolokvijum.py
+    x = rng.integers(0, width, n)
+    y = rng.integers(0, height, n)
+    return np.stack([x, y, rng.integers(1, width // 2, n), rng.integers(1, height // 2, n)], axis=1)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_box_means_match_cvtcolor_and_mean(seed):
+    rng = np.random.default_rng(seed)
+    height, width = 120, 160
+    frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    edge_boxes = [(0, 0, width, height), (0, 0, 1, 1), (width - 1, height - 1, 1, 1), (width - 3, 10, 8, 5),
+                  (10, height - 2, 5, 8), (width - 4, height - 4, 20, 20), (0, 50, 3, height)]
+    boxes = np.concatenate([edge_boxes, _random_boxes(rng, width, height, 200)])
+
+    means = HsvBoxMeans(frame).means(boxes)
+    expected = _reference_means(frame, boxes)
+    assert np.array_equal(means, expected)
+
+    lower, upper = np.array((60, 110, 150)), np.array((82, 160, 172))
+    assert np.array_equal(in_hsv_range(means, lower, upper), in_hsv_range(expected, lower, upper))
+
+
+def test_box_means_on_shared_conversion():
+    rng = np.random.default_rng(1)
+    frame = rng.integers(0, 256, (90, 120, 3), dtype=np.uint8)
+    roi = (20, 10, 80, 60)
+    shared = SharedHsv([roi, (0, 0, 40, 40)])
+    shared.new_frame(frame)
+    x, y, w, h = roi
+    cropped_frame = frame[y:y+h, x:x+w]
+    boxes = _random_boxes(rng, w, h, 50)
+    assert np.array_equal(HsvBoxMeans(cropped_frame, shared.crop(roi)).means(boxes),
+                          _reference_means(cropped_frame, boxes))
+
+
+def test_shared_hsv_converts_each_overlap_group_once():
+    rng = np.random.default_rng(2)
+    frame = rng.integers(0, 256, (100, 200, 3), dtype=np.uint8)
+    # Prva dva regiona se preklapaju, treći je zaseban
+    regions = [(0, 0, 60, 50), (40, 20, 60, 60), (150, 0, 50, 100)]
+    shared = SharedHsv(regions)
+    assert len(shared.groups) == 2
+    for _ in range(2):
+        shared.new_frame(frame)
+        for x, y, w, h in regions:
+            assert np.array_equal(shared.crop((x, y, w, h)), cv2.cvtColor(frame[y:y+h, x:x+w], cv2.COLOR_BGR2HSV))
+    assert shared.conversions == 4
+
+    with pytest.raises(ValueError):
+        shared.crop((100, 0, 60, 10))
@@ -0,0 +1,60 @@
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+import pytest
+
+import kolokvijum
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'zadatak 2', 'data')
+
+
+class _Calibrated(Exception):
+    pass
+
+
+def test_calibration_uses_the_same_background(tmp_path, monkeypatch):
+    (tmp_path / 'buzzy_beetle_count.csv').write_text('video,count\nvideo_1.mp4,1\n')
+    seen = {}
+
+    def calibrate_stride(video_paths, strides, tolerance, **kwargs):
+        seen.update(kwargs)
+        raise _Calibrated
+
+    monkeypatch.setattr(kolokvijum, 'calibrate_stride', calibrate_stride)
+    with pytest.raises(_Calibrated):
+        kolokvijum.main(str(tmp_path), calibrate=(2, 4), background='static', background_samples=7,
+                        background_threshold=20, background_store=str(tmp_path / 'backgrounds'))
+    assert seen['background'] == 'static'
+    assert seen['background_samples'] == 7
+    assert seen['background_threshold'] == 20
+    assert seen['background_store'] == str(tmp_path / 'backgrounds')
+    assert seen['roi'] == kolokvijum.ROI
+
+
+def test_video_5_count():
+    # Jedini pravi snimak u repozitorijumu, sa ROI koji koristi main(). Pre brojanja prelaska linije
+    # buba nikada nije bila detektovana unutar prozora brojanja i rezultat je bio 0.
+    truth = pd.read_csv(os.path.join(DATA, 'buzzy_beetle_count.csv')).set_index('video')['count']
+    count = kolokvijum.count_blue_objects_crossing_center(os.path.join(DATA, 'video_5.mp4'), roi=kolokvijum.ROI)
+    assert count == truth['video_5.mp4'] == 1
+
+
+def test_grid_cell_is_not_recounted_after_the_grid_skip():
+    # Veliki plavi objekat čija je srednja kolona 3x3 mreže na liniji ćelija (centar ROI - 110)
+    roi_w, roi_h = kolokvijum.ROI[2:]
+    blue = cv2.cvtColor(np.uint8([[[70, 120, 160]]]), cv2.COLOR_HSV2BGR)[0, 0]
+    frame = np.empty((roi_h, roi_w, 3), np.uint8)
+    frame[:] = blue
+    contours = [np.array([[[100, 0]], [[189, 0]], [[189, 119]], [[100, 119]]], np.int32)]
+
+    counter = kolokvijum.CrossingCounter(roi_w)
+    assert len(counter.process(frame, 0, contours=contours)) == 3
+    assert counter.skip == kolokvijum.GRID_SKIP
+    # Prvi sledeći analizirani frejm vidi iste ćelije i ne broji ih ponovo
+    assert counter.process(frame, kolokvijum.GRID_SKIP + 1, contours=contours) == []
+    assert counter.count == 3
+    # Posle CELL_AGE frejmova se ćelije zaboravljaju
+    assert len(counter.process(frame, kolokvijum.CELL_AGE + 1, contours=contours)) == 3
+    assert len(counter.counted_cells) == 3
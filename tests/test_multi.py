@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+import synthetic
+from klk import count_and_evaluate_buzzy_beetles
+from kolokvijum import ROI, count_blue_objects_crossing_center
+from multi import check_counters, count_video
+
+# Brojači iz konfiguracije multi.py i isti brojači pokrenuti kao zasebna skripta
+KOLOKVIJUM = [
+    ({'name': 'mog2', 'algorithm': 'kolokvijum'}, {}),
+    ({'name': 'static', 'algorithm': 'kolokvijum', 'background': 'static', 'background_samples': 9},
+     {'background': 'static', 'background_samples': 9}),
+    ({'name': 'strip', 'algorithm': 'kolokvijum', 'strip_width': 32}, {'strip_width': 32}),
+]
+KLK = [
+    ({'name': 'klk', 'algorithm': 'klk'}, {}),
+    ({'name': 'klk_strip', 'algorithm': 'klk', 'strip_width': 60}, {'strip_width': 60}),
+]
+
+
+def _clips(folder, preset):
+    synthetic.generate(str(folder), synthetic.beetles_spec(preset, n=2))
+    return [os.path.join(str(folder), f'video_{i}.mp4') for i in (1, 2)]
+
+
+def test_slot_counts_match_the_single_scripts(tmp_path):
+    for path in _clips(tmp_path / 'kolokvijum', 'kolokvijum'):
+        counts = count_video(path, [spec for spec, _ in KOLOKVIJUM])
+        assert counts == {spec['name']: count_blue_objects_crossing_center(path, roi=ROI, **params)
+                          for spec, params in KOLOKVIJUM}
+    for path in _clips(tmp_path / 'klk', 'klk'):
+        counts = count_video(path, [spec for spec, _ in KLK])
+        assert counts == {spec['name']: count_and_evaluate_buzzy_beetles(path, **params) for spec, params in KLK}
+
+
+@pytest.mark.parametrize('spec, message', [
+    ({'name': 'a', 'algorithm': 'kolokvijum', 'strip': 32}, 'unknown kolokvijum options strip'),
+    ({'name': 'a', 'algorithm': 'klk', 'background': 'static'}, 'unknown klk options background'),
+    ({'name': 'a', 'algorithm': 'kolokvijum', 'background': 'median'}, 'background must be one of'),
+])
+def test_invalid_counter_options_are_rejected(spec, message):
+    with pytest.raises(ValueError, match=message):
+        check_counters([spec])
@@ -0,0 +1,60 @@
+import csv
+import os
+
+import pytest
+
+import ensemble
+import mikutapi
+import resenje
+from image_stream import read_image
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'zadatak 1', 'data')
+
+COUNTERS = {
+    'resenje': (resenje.count_ducks_with_filled_contours, {}),
+    'mikutapi': (mikutapi.find_ducks, {'min_area': 400, 'max_area': 5000}),
+}
+
+# MAE na slikama iz data/ po skali, kao u tabeli u README-u
+DOCUMENTED_MAE = {
+    'resenje': {1: 0.2, 2: 0.4, 4: 1.9, 8: 2.4},
+    'mikutapi': {1: 0.5, 2: 1.6, 4: 2.4, 8: 3.0},
+}
+
+
+def _pictures():
+    with open(os.path.join(DATA, 'duck_count.csv'), newline='') as f:
+        return [(os.path.join(DATA, row['picture']), int(row['ducks'])) for row in csv.DictReader(f)]
+
+
+def test_reduced_decode_is_smaller_and_gray():
+    path, _ = _pictures()[0]
+    full = read_image(path)
+    for scale in (2, 4, 8):
+        img = read_image(path, scale=scale, gray=True)
+        assert img.ndim == 2
+        assert img.shape == (full.shape[0] // scale, full.shape[1] // scale)
+    with open(path, 'rb') as f:
+        assert read_image(f.read(), scale=2, gray=True).shape == read_image(path, scale=2, gray=True).shape
+
+
+@pytest.mark.parametrize('scale', [1, 2, 4, 8])
+@pytest.mark.parametrize('name', COUNTERS)
+def test_scaled_counts_stay_within_documented_mae(name, scale):
+    count_fn, params = COUNTERS[name]
+    pictures = _pictures()
+    errors = [abs(count_fn(path, scale=scale, **params) - true) for path, true in pictures]
+    assert round(sum(errors) / len(errors), 1) <= DOCUMENTED_MAE[name][scale]
+
+
+def test_main_runs_at_reduced_scale(tmp_path, capsys):
+    # I/O niti u --stream režimu dekodiraju umanjenu sliku
+    output = str(tmp_path / 'predictions.csv')
+    resenje.main(DATA, stream=True, scale=2, output=output)
+    assert float(capsys.readouterr().out) <= DOCUMENTED_MAE['resenje'][2]
+    with open(output, newline='') as f:
+        assert len(list(csv.DictReader(f))) == len(_pictures())
+
+    path, _ = _pictures()[0]
+    _, counts = ensemble.count_ducks_ensemble(path, scale=2, return_members=True)
+    assert counts == {name: count_fn(path, scale=2, **params) for name, (count_fn, params) in COUNTERS.items()}
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import time
+
+from kolokvijum import ROI, count_blue_objects_crossing_center
+from live import VideoFileSource
+from scheduler import StreamScheduler, _Stream
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'zadatak 2', 'data')
+
+
+class _Source:
+    def __init__(self, live):
+        self.live = live
+
+
+class _Counter:
+    # Zamena za LiveCounter sa stanjem koje raspoređivač čita
+    def __init__(self, live=False, ready=True, lag=0.0):
+        self.source = _Source(live)
+        self.ready = ready
+        self.stride = 1
+        self.dropped = 0
+        self.last_event = None
+        self._lag = lag
+
+    def lag(self, now=None):
+        return self._lag
+
+
+def _scheduler(counters, **kwargs):
+    scheduler = StreamScheduler(workers=1, **kwargs)
+    scheduler.streams = [_Stream(f'feed{i}', counter, 1) for i, counter in enumerate(counters)]
+    return scheduler
+
+
+def _serve(scheduler, turns):
+    # Jedan slot: izabrani tok dobija jednu sekundu analize
+    order = []
+    for _ in range(turns):
+        stream, = scheduler._pick(1)
+        stream.service += 1.0
+        order.append(stream.name)
+    return order
+
+
+def test_busy_feeds_take_turns():
+    scheduler = _scheduler([_Counter(), _Counter(), _Counter()])
+    assert _serve(scheduler, 6) == ['feed0', 'feed1', 'feed2'] * 2
+
+
+def test_feed_returning_from_idle_does_not_take_over():
+    counters = [_Counter(), _Counter(), _Counter(ready=False)]
+    scheduler = _scheduler(counters)
+    _serve(scheduler, 10)
+    counters[2].ready = True
+    order = _serve(scheduler, 6)
+    assert order.count('feed2') == 2
+
+
+def test_busy_feed_is_not_picked_twice():
+    scheduler = _scheduler([_Counter(), _Counter()])
+    scheduler.streams[0].busy = True
+    assert [stream.name for stream in scheduler._pick(2)] == ['feed1']
+
+
+def test_only_quiet_live_feeds_are_shed():
+    live, file_source = _Counter(live=True, lag=2.0), _Counter(live=False)
+    scheduler = _scheduler([live, file_source], quiet_seconds=0.0)
+    scheduler._shed_load(time.time() + 1.0)
+    assert live.stride == 2
+    assert file_source.stride == 1
+
+
+def test_file_backlog_is_not_overload():
+    live, file_source = _Counter(live=True), _Counter(live=False, lag=30.0)
+    scheduler = _scheduler([live, file_source], quiet_seconds=0.0)
+    scheduler._shed_load(time.time() + 1.0)
+    assert (live.stride, file_source.stride) == (1, 1)
+
+
+def test_feeds_count_like_the_batch_script():
+    video = os.path.join(DATA, 'video_5.mp4')
+    scheduler = StreamScheduler(workers=2)
+    for name in ('a', 'b'):
+        scheduler.add(name, VideoFileSource(video), roi=ROI)
+
+    async def collect():
+        return [event async for event in scheduler.events()]
+
+    events = asyncio.run(collect())
+    expected = count_blue_objects_crossing_center(video, roi=ROI)
+    assert {stream['source']: stream['count'] for stream in scheduler.stats()} == {'a': expected, 'b': expected}
+    assert sorted(event.source for event in events) == ['a'] * expected + ['b'] * expected
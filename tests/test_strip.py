@@ -0,0 +1,33 @@
+import csv
+import os
+
+import pytest
+
+import synthetic
+from klk import count_and_evaluate_buzzy_beetles
+from kolokvijum import ROI, count_blue_objects_crossing_center
+from profiling import Profile
+
+# Za svaku skriptu: funkcija brojanja, argumenti sa kojima je poziva main(), širina trake iz benchmark.py
+# i brojač frejmova na kojima je traka ipak zamenjena celim ROI
+COUNTERS = {
+    'kolokvijum': (count_blue_objects_crossing_center, {'roi': ROI}, 32, 'full_roi_fallbacks'),
+    'klk': (count_and_evaluate_buzzy_beetles, {}, 60, 'full_frame_fallbacks'),
+}
+
+
+@pytest.mark.parametrize('preset', COUNTERS)
+def test_strip_mode_counts_match_full_roi(tmp_path, preset):
+    count_fn, params, strip_width, fallbacks = COUNTERS[preset]
+    folder = str(tmp_path)
+    synthetic.generate(folder, synthetic.beetles_spec(preset, n=3))
+    with open(os.path.join(folder, 'buzzy_beetle_count.csv'), newline='') as f:
+        rows = list(csv.DictReader(f))
+    paths = [os.path.join(folder, row['video']) for row in rows]
+
+    full = [count_fn(path, **params) for path in paths]
+    assert full == [int(row['count']) for row in rows]
+    profile = Profile()
+    assert [count_fn(path, strip_width=strip_width, profile=profile, **params) for path in paths] == full
+    # Većina frejmova se zaista obrađuje samo u trakama
+    assert profile.counters.get(fallbacks, 0) < profile.counters['frames'] / 2
@@ -0,0 +1,61 @@
+import os
+
+import synthetic
+from kolokvijum import ROI, count_blue_objects_crossing_center
+from tracking import CentroidTracker
+
+
+def test_tracks_keep_ids_across_frames():
+    tracker = CentroidTracker(max_distance=40)
+    first, _ = tracker.update([(100, 100), (300, 100)], 0)
+    second, _ = tracker.update([(305, 102), (104, 101)], 1)
+    assert [track.id for track in second] == [first[1].id, first[0].id]
+    assert second[0].hits == 2
+
+
+def test_nearest_detection_gets_the_track():
+    tracker = CentroidTracker(max_distance=40)
+    track, = tracker.update([(100, 100)], 0)[0]
+    tracks, _ = tracker.update([(130, 100), (105, 100)], 1)
+    assert tracks[1] is track
+    assert tracks[0].id != track.id
+
+
+def test_far_detection_starts_a_new_track():
+    tracker = CentroidTracker(max_distance=40)
+    track, = tracker.update([(100, 100)], 0)[0]
+    other, = tracker.update([(100, 150)], 1)[0]
+    assert other.id != track.id
+
+
+def test_track_expires_after_max_age():
+    tracker = CentroidTracker(max_distance=40, max_age=5)
+    track, = tracker.update([(100, 100)], 0)[0]
+    assert tracker.update([(102, 100)], 5)[0][0] is track
+    assert tracker.update([(104, 100)], 11)[0][0] is not track
+    assert len(tracker.tracks) == 1
+
+
+def test_line_crossing_is_reported_once_per_crossing():
+    tracker = CentroidTracker(max_distance=40, line_x=200)
+    crossed = []
+    for frame_index, x in enumerate(range(180, 230, 6)):
+        _, crossings = tracker.update([(x, 100)], frame_index)
+        crossed += crossings
+    assert len(crossed) == 1
+    assert crossed[0].direction == 1
+    assert crossed[0].x > 200
+
+    _, crossings = tracker.update([(190, 100)], len(range(180, 230, 6)))
+    assert [crossing.direction for crossing in crossings] == [-1]
+
+
+def test_objects_in_the_same_row_are_counted_separately(tmp_path):
+    # Prvi video podrazumevanog sintetičkog skupa: kada su se pratile samo detekcije na liniji, dve bube
+    # na sličnoj visini spajale su se u jedan trag i brojalo se 3
+    folder = str(tmp_path)
+    synthetic.generate(folder, synthetic.beetles_spec('kolokvijum', n=1))
+    with open(os.path.join(folder, 'buzzy_beetle_count.csv')) as f:
+        truth = int(f.read().split()[-1].split(',')[1])
+    assert truth == 4
+    assert count_blue_objects_crossing_center(os.path.join(folder, 'video_1.mp4'), roi=ROI) == truth
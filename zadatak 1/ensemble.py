@@ -0,0 +1,147 @@
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+import mikutapi
+import resenje
+from image_stream import SCALES, iter_manifest, read_image
+
+# profiling.py je zajednički za oba zadatka i nalazi se u korenu repozitorijuma
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from profiling import NULL_PROFILE, open_profile
+
+# Članovi ansambla: funkcija brojanja i parametri sa kojima je poziva main() njene skripte
+MEMBERS = {
+    'resenje': (resenje.count_ducks_with_filled_contours, {}),
+    'mikutapi': (mikutapi.find_ducks, {'min_area': 400, 'max_area': 5000}),
+}
+DEFAULT_MEMBERS = ('resenje', 'mikutapi')
+POLICIES = ('primary', 'mean', 'median', 'min', 'max')
+
+
+class ImageStages:
+    # Međurezultati jedne slike, sa istim get(key, compute) kao StageCache u sweep.py. Svi članovi dobijaju
+    # isti keš, pa se faze sa istim ključem (dekodirana slika) računaju jednom.
+    def __init__(self):
+        self.values = {}
+        self.hits = 0
+
+    def get(self, key, compute):
+        if key in self.values:
+            self.hits += 1
+            return self.values[key]
+        value = self.values[key] = compute()
+        return value
+
+
+def combine(counts, policy='primary', min_count=1):
+    # counts su predikcije članova redom.
+    # primary: prvi član; sledeći se koristi samo kada svi pre njega nađu manje od min_count patkica
+    # mean/median: zaokruženo na najbliži ceo broj (.5 naviše); min/max: najmanja/najveća predikcija
+    if policy == 'primary':
+        return next((count for count in counts if count >= min_count), counts[0])
+    if policy in ('mean', 'median'):
+        value = np.mean(counts) if policy == 'mean' else np.median(counts)
+        return int(np.floor(value + 0.5))
+    if policy == 'min':
+        return min(counts)
+    if policy == 'max':
+        return max(counts)
+    raise ValueError(f"policy must be one of {POLICIES}")
+
+
+def count_ducks_ensemble(image_path, members=DEFAULT_MEMBERS, policy='primary', min_count=1, scale=1,
+                         return_members=False, stages=None, profile=None):
+    # Slika (putanja ili već dekodirana) se dekodira jednom i upisuje u keš kao faza 'image', koju
+    # oba algoritma čitaju umesto sopstvenog dekodiranja. stages je StageCache iz sweep-a; bez njega
+    # svaka slika dobija svoj ImageStages. Sa return_members vraća (broj, {član: broj}).
+    profile = profile or NULL_PROFILE
+    name = image_path if isinstance(image_path, str) else '<image>'
+    if stages is None:
+        stages = ImageStages()
+
+    def decode():
+        img = read_image(image_path, scale=scale, gray=scale > 1)
+        if img is None:
+            raise ValueError(f"cannot decode {name}")
+        return img
+
+    with profile.stage('decode'):
+        stages.get(('image', name, scale), decode)
+
+    counts = {}
+    for member in members:
+        count_fn, params = MEMBERS[member]
+        counts[member] = count_fn(name, scale=scale, stages=stages, profile=profile, **params)
+    combined = combine([counts[member] for member in members], policy, min_count)
+    profile.count('ducks_combined', combined)
+    if return_members:
+        return combined, counts
+    return combined
+
+
+def main(dataset_folder, members=DEFAULT_MEMBERS, policy='primary', min_count=1, manifest=None, output=None,
+         scale=1, profile=None, prometheus=None):
+    for member in members:
+        if member not in MEMBERS:
+            raise ValueError(f"unknown member {member}; members: {', '.join(MEMBERS)}")
+    # Merenje faza (--profile/--prometheus); faze istog imena oba algoritma se sabiraju
+    report = open_profile('ensemble', profile, prometheus)
+    count_fn = count_ducks_ensemble if report is None else report.wrap(count_ducks_ensemble)
+
+    rows = []
+    for picture, path, true in iter_manifest(dataset_folder, manifest):
+        result = count_fn(path, members=members, policy=policy, min_count=min_count, scale=scale,
+                          return_members=True)
+        if report is not None:
+            result, = report.collect([result])
+        combined, counts = result
+        rows.append((picture, [counts[member] for member in members], combined, true))
+    if report is not None:
+        report.finish()
+
+    if output:
+        with open(output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['picture', *members, 'combined', 'true'])
+            for picture, counts, combined, true in rows:
+                writer.writerow([picture, *counts, combined, true])
+
+    # MAE svakog člana na stderr, MAE kombinovane predikcije (samo broj) na stdout
+    true_counts = np.array([true for _, _, _, true in rows])
+    for i, member in enumerate(members):
+        member_counts = np.array([counts[i] for _, counts, _, _ in rows])
+        print(f"{member}: MAE {np.mean(np.abs(member_counts - true_counts))}", file=sys.stderr)
+    combined_counts = np.array([combined for _, _, combined, _ in rows])
+    print(f"{np.mean(np.abs(combined_counts - true_counts))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Count ducks with several algorithms off one decoded image and shared intermediates, "
+                    "combine their predictions and print the MAE of the combined count.")
+    parser.add_argument("dataset_folder")
+    parser.add_argument("--members", type=lambda value: tuple(value.split(",")), default=DEFAULT_MEMBERS,
+                        metavar="NAME,NAME,...",
+                        help=f"algorithms in order of preference: {', '.join(MEMBERS)} (default: resenje,mikutapi)")
+    parser.add_argument("--policy", choices=POLICIES, default="primary",
+                        help="primary: first member, the next one only when it finds fewer than --min-count ducks; "
+                             "mean/median: rounded; min/max")
+    parser.add_argument("--min-count", type=int, default=1,
+                        help="with --policy primary, fall back to the next member below this count")
+    parser.add_argument("--manifest", help="CSV with picture,ducks columns (default: <dataset_folder>/duck_count.csv)")
+    parser.add_argument("-o", "--output", help="write every member's prediction and the combined one as CSV")
+    parser.add_argument("--scale", type=int, choices=SCALES, default=1,
+                        help="decode JPEGs reduced by this factor (faster, but counts drift from full resolution, "
+                             "see README); ROI, kernels and area bands are rescaled to match")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="time every pipeline stage and write histograms, counters and per-image totals as JSON")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="write the same measurements in Prometheus text format (implies profiling)")
+    args = parser.parse_args()
+    main(args.dataset_folder, members=args.members, policy=args.policy, min_count=args.min_count,
+         manifest=args.manifest, output=args.output, scale=args.scale, profile=args.profile,
+         prometheus=args.prometheus)
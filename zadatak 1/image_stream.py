@@ -0,0 +1,204 @@
+import csv
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+# JPEG dekoder direktno daje sliku umanjenu 2, 4 ili 8 puta (skaliranje u DCT domenu),
+# a grayscale dekodiranje preskače konverziju boja
+_DECODE_FLAGS = {
+    (1, False): cv2.IMREAD_COLOR, (1, True): cv2.IMREAD_GRAYSCALE,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2, (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, False): cv2.IMREAD_REDUCED_COLOR_4, (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8, (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+SCALES = (1, 2, 4, 8)
+
+
+def read_image(image, scale=1, gray=False):
+    # Putanja do slike, sirovi bajtovi fajla ili već dekodirana slika. Dekodirana slika se smatra
+    # već umanjenom za scale; samo se, ako treba, prevodi u grayscale.
+    if scale not in SCALES:
+        raise ValueError(f"scale must be one of {SCALES}")
+    flags = _DECODE_FLAGS[(scale, gray)]
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return cv2.imdecode(np.frombuffer(image, np.uint8), flags)
+    if isinstance(image, (str, os.PathLike)):
+        return cv2.imread(os.fspath(image), flags)
+    if gray and image is not None and image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def scale_area(area, scale):
+    # Površine u pikselima se smanjuju sa kvadratom faktora umanjenja
+    return area / (scale * scale)
+
+
+def scale_kernel(size, scale, odd=False):
+    # Veličina kernela (definisana za punu rezoluciju) na umanjenoj slici; kernel 1x1 ne radi ništa,
+    # pa je najmanja veličina 2 (3 za kernele koji moraju biti neparni)
+    if scale == 1:
+        return size
+    size = max(2, int(round(size / scale)))
+    if odd and size % 2 == 0:
+        size += 1
+    return size
+
+
+def iter_manifest(dataset_folder, manifest=None):
+    # Manifest je CSV u formatu duck_count.csv (kolone picture, ducks); čita se red po red
+    manifest_path = manifest or os.path.join(dataset_folder, 'duck_count.csv')
+    with open(manifest_path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield row['picture'], os.path.join(dataset_folder, row['picture']), int(row['ducks'])
+
+
+def iter_directory(dataset_folder):
+    # os.scandir ne pravi listu svih fajlova unapred; ove slike nemaju tačan broj patkica
+    with os.scandir(dataset_folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield entry.name, entry.path, None
+
+
+def _init_worker():
+    cv2.setNumThreads(1)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _load(path, pool, func, loader):
+    # Radi na I/O niti: čita fajl i dekodira ga (imdecode oslobađa GIL), ili bajtove šalje procesu
+    # koji ih sam dekodira, jer je kompresovana slika mnogo manja za prenos od dekodirane
+    data = _read_file(path)
+    if pool is not None:
+        return pool.submit(func, data)
+    img = loader(data)
+    if img is None:
+        raise ValueError(f"cannot decode {path}")
+    return img
+
+
+class OnlineMAE:
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, predicted, true):
+        if predicted is None or true is None:
+            return
+        self.total += abs(predicted - true)
+        self.count += 1
+
+    @property
+    def value(self):
+        return self.total / self.count if self.count else float('nan')
+
+
+class ResultWriter:
+    # Rezultati se upisuju čim stignu; .jsonl daje JSON po liniji, sve ostalo CSV
+    FIELDS = ('picture', 'predicted', 'true', 'error')
+
+    def __init__(self, path, flush_every=256):
+        self.file = open(path, 'w', newline='')
+        self.jsonl = path.lower().endswith('.jsonl')
+        self.flush_every = flush_every
+        self.rows = 0
+        if not self.jsonl:
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(self.FIELDS)
+
+    def write(self, row):
+        if self.jsonl:
+            self.file.write(json.dumps(dict(zip(self.FIELDS, row))) + '\n')
+        else:
+            self.csv.writerow(['' if value is None else value for value in row])
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def stream_counts(count_fn, items, workers=1, io_threads=4, prefetch=None, loader=read_image, cache=None,
+                  profile=None, **kwargs):
+    # items su (ime, putanja, tačan broj ili None); loader dekodira sliku na I/O niti. Najviše prefetch
+    # slika je istovremeno u memoriji, pa potrošnja ne zavisi od broja slika.
+    # Rezultati izlaze redosledom ulaza: (ime, broj, tačno, greška). Slike čiji je rezultat
+    # u cache-u (EvalCache) se ne čitaju. Sa profile (ProfileReport) se meri svaka izračunata slika.
+    func = partial(count_fn if profile is None else profile.wrap(count_fn), **kwargs)
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    if prefetch is None:
+        prefetch = 2 * max(workers, io_threads)
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 1 else None
+    try:
+        with ThreadPoolExecutor(max_workers=io_threads) as io:
+            pending = deque()
+            for name, path, true in items:
+                cached = cache.get(path) if cache is not None else None
+                if cached is not None:
+                    pending.append((name, path, true, None, cached))
+                else:
+                    pending.append((name, path, true, io.submit(_load, path, pool, func, loader), None))
+                if len(pending) >= prefetch:
+                    yield _finish(func, cache, profile, *pending.popleft())
+            while pending:
+                yield _finish(func, cache, profile, *pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def _finish(func, cache, profile, name, path, true, future, cached):
+    if future is None:
+        return name, int(cached), true, None
+    try:
+        result = future.result()
+        if isinstance(result, Future):
+            count = result.result()
+        else:
+            count = func(result)
+    except Exception as e:
+        return name, None, true, f"{type(e).__name__}: {e}"
+    if profile is not None:
+        count, image_profile = count
+        profile.add(image_profile, name)
+    if cache is not None:
+        cache.put(path, int(count))
+    return name, int(count), true, None
+
+
+def run_stream(count_fn, items, output=None, **kwargs):
+    # Vraća MAE nad slikama koje imaju tačan broj; greške se beleže i ne prekidaju obradu
+    mae = OnlineMAE()
+    writer = ResultWriter(output) if output else None
+    processed = failed = 0
+    try:
+        for row in stream_counts(count_fn, items, **kwargs):
+            processed += 1
+            if row[3] is not None:
+                failed += 1
+                print(f"{row[0]}: {row[3]}", file=sys.stderr)
+            mae.add(row[1], row[2])
+            if writer is not None:
+                writer.write(row)
+    finally:
+        if writer is not None:
+            writer.close()
+    print(f"{processed} images, {failed} failed, {mae.count} labelled", file=sys.stderr)
+    return mae.value
@@ -1,36 +1,99 @@
+import argparse
+import os
 import sys
+from functools import partial
 import numpy as np
 import cv2
 import pandas as pd
 
-def find_ducks(image_path, min_area=500, max_area=5000):
-    # Učitavanje slike
-    img = cv2.imread(image_path)
-    
+# eval_cache.py je zajednički za oba zadatka i nalazi se u korenu repozitorijuma
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from eval_cache import cached_predictions, open_eval_cache
+from profiling import NULL_PROFILE, open_profile
+
+from image_stream import (SCALES, iter_directory, iter_manifest, read_image, run_stream,
+                          scale_kernel)
+
+EXTRA_BANDS = ((5980, 6300), (7700, 9000))
+
+def _stage(stages, key, compute):
+    # Keš međurezultata za sweep parametara; bez njega se faza samo izračuna
+    return compute() if stages is None else stages.get(key, compute)
+
+def _is_duck_area(area, min_area, max_area, scale=1, extra_bands=EXTRA_BANDS):
+    # Granice su zadate za punu rezoluciju, pa se površina vraća na tu skalu
+    area = area * scale * scale
+    return min_area <= area <= max_area or any(low < area < high for low, high in extra_bands)
+
+def _load(image_path, scale=1):
+    # Na punoj rezoluciji ostaje dekodiranje u boji (zamućenje pa konverzija, kao ranije),
+    # umanjena slika se dekodira direktno u sivo
+    return read_image(image_path, scale=scale, gray=scale > 1)
+
+def _blurred_crop(img, scale=1, blur_size=7):
     # Kropovanje slike (odabir centralnog dela)
     h, w = img.shape[:2]
     crop_img = img[h//5:4*h//5, w//5:4*w//5]  # kropovanje centralnog dela slike
     
+    # Zamućenje slike kako bi se smanjio šum
+    blur_size = scale_kernel(blur_size, scale, odd=True)
+    img_blur = cv2.GaussianBlur(crop_img, (blur_size, blur_size), 0)
+    
+    # Konverzija u grayscale
+    return cv2.cvtColor(img_blur, cv2.COLOR_BGR2GRAY) if img_blur.ndim == 3 else img_blur
+
+def _binary(img_gray, scale=1, threshold=85, kernel_size=5):
     # Pravljenje kružne maske koja će ignorisati konture u uglovima
-    mask = np.zeros(crop_img.shape[:2], dtype=np.uint8)
+    mask = np.zeros(img_gray.shape[:2], dtype=np.uint8)
     center = (mask.shape[1] // 2, mask.shape[0] // 2)
     radius = min(center)
     cv2.circle(mask, center, radius, 255, -1)  # Bela kružna maska
     
-    # Zamućenje slike kako bi se smanjio šum
-    img_blur = cv2.GaussianBlur(crop_img, (7, 7), 0)
-    
-    # Konverzija u grayscale i globalni threshold za binarizaciju
-    img_gray = cv2.cvtColor(img_blur, cv2.COLOR_BGR2GRAY)
-    _, img_bin = cv2.threshold(img_gray, 85, 255, cv2.THRESH_BINARY_INV)
+    # Globalni threshold za binarizaciju
+    _, img_bin = cv2.threshold(img_gray, threshold, 255, cv2.THRESH_BINARY_INV)
     
     # Čišćenje binarne slike
-    kernel = np.ones((5, 5), np.uint8)
+    kernel = np.ones((scale_kernel(kernel_size, scale),) * 2, np.uint8)
     img_bin_cleaned = cv2.morphologyEx(img_bin, cv2.MORPH_CLOSE, kernel)
     img_bin_cleaned = cv2.morphologyEx(img_bin_cleaned, cv2.MORPH_OPEN, kernel)
     
-    # Primena kružne maske i detekcija kontura
+    # Primena kružne maske
     img_bin_masked = cv2.bitwise_and(img_bin_cleaned, img_bin_cleaned, mask=mask)
+    return img_bin_cleaned, img_bin_masked, center, radius
+
+def _decoded_blur(image_path, scale, blur_size, stages=None, profile=NULL_PROFILE):
+    # Dekodirana slika je zajednička faza sa resenje.py (isti ključ i isto dekodiranje)
+    with profile.stage('decode'):
+        img = _stage(stages, ('image', image_path, scale), lambda: _load(image_path, scale))
+    with profile.stage('blur'):
+        return _blurred_crop(img, scale, blur_size)
+
+def _staged_binary(image_path, scale, blur_size, threshold, kernel_size, stages, profile=NULL_PROFILE):
+    # Faze: dekodiranje + zamućenje (slika, skala, blur), pa binarna maska (i prag, kernel)
+    key = (image_path, scale, blur_size)
+    img_gray = _stage(stages, ('blur',) + key, lambda: _decoded_blur(image_path, scale, blur_size, stages, profile))
+    key += (threshold, kernel_size)
+    with profile.stage('binary'):
+        binary = _stage(stages, ('binary',) + key, lambda: _binary(img_gray, scale, threshold, kernel_size))
+    return key, binary
+
+def _count_bands(profile, areas, min_area, max_area, scale=1, extra_bands=EXTRA_BANDS):
+    # Brojač kandidata po opsegu površine (samo kada je merenje uključeno)
+    for low, high in ((min_area, max_area),) + tuple(extra_bands):
+        profile.count(f'candidates_{low}_{high}', sum(1 for area in areas if low <= area * scale * scale <= high))
+
+def _fallback_mask(img_bin_cleaned, center, radius, scale=1, fallback_radius=0.7, fallback_kernel=10):
+    # Uži krug i dilatacija za slike na kojima prvi prolaz ne nađe nijednu patkicu
+    smaller_radius = int(radius * fallback_radius)
+    small_mask = np.zeros(img_bin_cleaned.shape[:2], dtype=np.uint8)
+    cv2.circle(small_mask, center, smaller_radius, 255, -1)
+    img_bin_masked = cv2.bitwise_and(img_bin_cleaned, img_bin_cleaned, mask=small_mask)
+
+    large_kernel = np.ones((scale_kernel(fallback_kernel, scale),) * 2, np.uint8)
+    return cv2.dilate(img_bin_masked, large_kernel, iterations=2)
+
+def _filled_contour_areas(img_bin_masked):
+    # Detekcija kontura
     contours, _ = cv2.findContours(img_bin_masked, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
     # Kreiranje slike sa popunjenim konturama
@@ -40,39 +103,73 @@ def find_ducks(image_path, min_area=500, max_area=5000):
 
     # Ponovna detekcija kontura na popunjenoj slici
     filled_contours, _ = cv2.findContours(img_filled_bin, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return [cv2.contourArea(contour) for contour in filled_contours]
+
+def _contour_areas(img_bin):
+    contours, _ = cv2.findContours(img_bin, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return [cv2.contourArea(contour) for contour in contours]
+
+def find_ducks(image_path, min_area=500, max_area=5000, scale=1, blur_size=7, threshold=85, kernel_size=5,
+               extra_bands=EXTRA_BANDS, fallback_radius=0.7, fallback_kernel=10, stages=None, profile=None):
+    profile = profile or NULL_PROFILE
+    # Učitavanje slike i binarizacija
+    key, (img_bin_cleaned, img_bin_masked, center, radius) = _staged_binary(
+        image_path, scale, blur_size, threshold, kernel_size, stages, profile)
 
-    # Filtriranje kontura prema površini
-    valid_contours = []
-    for contour in filled_contours:
-        area = cv2.contourArea(contour)
-        if min_area <= area <= max_area or 5980 < area < 6300 or 7700 < area < 9000:
-            valid_contours.append(contour)
-
-    # Ako nema patkica, primeni dilaciju na uži krug
-    if len(valid_contours) == 0:
-        smaller_radius = int(radius * 0.7)
-        small_mask = np.zeros(crop_img.shape[:2], dtype=np.uint8)
-        cv2.circle(small_mask, center, smaller_radius, 255, -1)
-        img_bin_masked = cv2.bitwise_and(img_bin_cleaned, img_bin_cleaned, mask=small_mask)
-        
-        # Primena dilatacije na uži krug i ponovna detekcija kontura
-        large_kernel = np.ones((10, 10), np.uint8)
-        img_bin_dilated = cv2.dilate(img_bin_masked, large_kernel, iterations=2)
-        contours, _ = cv2.findContours(img_bin_dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if min_area <= area <= max_area or 5980 < area < 6300 or 7700 < area < 9000:
-                valid_contours.append(contour)
-
-    return len(valid_contours)
-
-def main(dataset_folder):
+    # Filtriranje popunjenih kontura prema površini
+    with profile.stage('find_contours'):
+        areas = _stage(stages, ('areas',) + key, lambda: _filled_contour_areas(img_bin_masked))
+    with profile.stage('area_filter'):
+        valid_areas = [area for area in areas if _is_duck_area(area, min_area, max_area, scale, extra_bands)]
+
+    # Ako nema patkica, primeni dilaciju na uži krug i ponovo detektuj konture
+    if len(valid_areas) == 0:
+        profile.count('fallback')
+        with profile.stage('fallback'):
+            areas = _stage(stages, ('fallback_areas',) + key + (fallback_radius, fallback_kernel),
+                           lambda: _contour_areas(_fallback_mask(img_bin_cleaned, center, radius, scale,
+                                                                 fallback_radius, fallback_kernel)))
+            valid_areas = [area for area in areas if _is_duck_area(area, min_area, max_area, scale, extra_bands)]
+
+    if profile.enabled:
+        profile.count('contours', len(areas))
+        _count_bands(profile, areas, min_area, max_area, scale, extra_bands)
+        profile.count('ducks', len(valid_areas))
+    return len(valid_areas)
+
+def main(dataset_folder, stream=False, workers=1, manifest=None, scan=False,
+         output=None, io_threads=4, prefetch=None, scale=1, eval_cache=None, profile=None, prometheus=None):
     # Poziv funkcije za svaku sliku i čuvanje rezultata
-    predicted_counts = []
-    for i in range(1, 11):
-        image_path = f'{dataset_folder}/picture_{i}.jpg'
-        count = find_ducks(image_path, min_area=400, max_area=5000)
-        predicted_counts.append(count)
+    count_ducks = find_ducks
+    params = {'min_area': 400, 'max_area': 5000, 'scale': scale}
+    # Predikcije po slici se čuvaju po (sadržaj slike, algoritam, parametri, verzija koda)
+    cache = open_eval_cache(eval_cache, __file__, 'mikutapi', params)
+    # Merenje faza (--profile/--prometheus); bez njega funkcije brojanja koriste NULL_PROFILE
+    report = open_profile('mikutapi', profile, prometheus)
+    if stream:
+        # Slike se čitaju lenjo iz manifesta (ili foldera) i rezultati se upisuju odmah
+        items = iter_directory(dataset_folder) if scan else iter_manifest(dataset_folder, manifest)
+        mae = run_stream(count_ducks, items, output=output, workers=workers, io_threads=io_threads,
+                         prefetch=prefetch, loader=partial(_load, scale=scale), cache=cache, profile=report,
+                         **params)
+        if cache is not None:
+            cache.report()
+            cache.close()
+        if report is not None:
+            report.finish()
+        print(f"{mae}")
+        return
+
+    image_paths = [f'{dataset_folder}/picture_{i}.jpg' for i in range(1, 11)]
+    count_fn = count_ducks if report is None else report.wrap(count_ducks)
+
+    def count_images(paths):
+        results = [count_fn(path, **params) for path in paths]
+        return results if report is None else report.collect(results)
+
+    predicted_counts = cached_predictions(cache, image_paths, count_images)
+    if report is not None:
+        report.finish()
 
     # Učitavanje očekivanih vrednosti iz CSV fajla i računanje MAE
     duck_count_df = pd.read_csv(f'{dataset_folder}/duck_count.csv')
@@ -84,6 +181,29 @@ def main(dataset_folder):
     print(f"{mae}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python script.py <dataset_folder>")
-    main(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Count ducks on every picture and print the MAE.")
+    parser.add_argument("dataset_folder")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream images lazily from the manifest with bounded memory instead of picture_1..10")
+    parser.add_argument("--manifest", help="CSV with picture,ducks columns (default: <dataset_folder>/duck_count.csv)")
+    parser.add_argument("--scan", action="store_true",
+                        help="with --stream, count every image in the folder instead of the manifest (no MAE)")
+    parser.add_argument("-o", "--output", help="write per-image results as they finish (.csv or .jsonl)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="worker processes for --stream (0 = one per CPU core)")
+    parser.add_argument("--io-threads", type=int, default=4, help="threads that read and decode images ahead")
+    parser.add_argument("--prefetch", type=int, help="max images in flight (default: 2 x max(workers, io threads))")
+    parser.add_argument("--scale", type=int, choices=SCALES, default=1,
+                        help="decode JPEGs reduced by this factor (faster, but counts drift from full resolution, "
+                             "see README); ROI, kernels and area bands are rescaled to match")
+    parser.add_argument("--eval-cache", metavar="FILE",
+                        help="SQLite file with per-image predictions; only new or changed images are recomputed")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="time every pipeline stage and write histograms, counters and per-image totals as JSON")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="write the same measurements in Prometheus text format (implies profiling)")
+    args = parser.parse_args()
+    main(args.dataset_folder, stream=args.stream, workers=args.workers,
+         manifest=args.manifest, scan=args.scan, output=args.output, io_threads=args.io_threads,
+         prefetch=args.prefetch, scale=args.scale, eval_cache=args.eval_cache,
+         profile=args.profile, prometheus=args.prometheus)
@@ -1,60 +1,185 @@
+import argparse
+import os
 import sys
+from functools import partial
 import cv2
 import numpy as np
 import pandas as pd
 
-def count_ducks_with_filled_contours(image_path):
-    img = cv2.imread(image_path)
-    crop_img = img[250:800, 200:800]
+# eval_cache.py je zajednički za oba zadatka i nalazi se u korenu repozitorijuma
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from eval_cache import cached_predictions, open_eval_cache
+from profiling import NULL_PROFILE, open_profile
 
-    grayscale_img = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
+from image_stream import (SCALES, iter_directory, iter_manifest, read_image, run_stream,
+                          scale_area, scale_kernel)
 
-    _, binary_img = cv2.threshold(grayscale_img, 80, 255, cv2.THRESH_BINARY_INV)
+AREA_BANDS = ((750, 2100), (2200, 5000), (6700, 7000), (7500, 10000))
 
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-    closed_img = cv2.morphologyEx(binary_img, cv2.MORPH_CLOSE, kernel, iterations=2)
+CROP = (250, 800, 200, 800)  # y0, y1, x0, x1 na punoj rezoluciji
 
-    edges = cv2.Canny(closed_img, threshold1=50, threshold2=150)
+def _stage(stages, key, compute):
+    # Keš međurezultata za sweep parametara; bez njega se faza samo izračuna
+    return compute() if stages is None else stages.get(key, compute)
 
-    dilated_edges = cv2.dilate(edges, kernel, iterations=2)
-    dilated_edges = cv2.erode(dilated_edges, kernel, iterations=1)
-    edges_closed = cv2.morphologyEx(dilated_edges, cv2.MORPH_CLOSE, kernel, iterations=1)
+def _area_test(area_bands, scale=1):
+    bands = [(scale_area(low, scale), scale_area(high, scale)) for low, high in area_bands]
+    def area_ok(area):
+        return any(low < area < high for low, high in bands)
+    return area_ok
 
-    filled_img = np.zeros_like(grayscale_img)
+def _load(image_path, scale=1):
+    # Na punoj rezoluciji se dekodira u boji i u sivo konvertuje tek kropovani deo (isto kao ranije);
+    # umanjena slika se dekodira direktno u sivo, bez konverzije boja
+    return read_image(image_path, scale=scale, gray=scale > 1)
+
+def _gray_crop(img, scale=1):
+    y0, y1, x0, x1 = (c // scale for c in CROP)
+    crop_img = img[y0:y1, x0:x1]
+    if crop_img.ndim == 3:
+        return cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
+    return crop_img
+
+def _edges_closed(grayscale_img, scale=1, threshold=80, kernel_size=5, canny=(50, 150), profile=NULL_PROFILE):
+    with profile.stage('threshold'):
+        _, binary_img = cv2.threshold(grayscale_img, threshold, 255, cv2.THRESH_BINARY_INV)
+
+    kernel_size = scale_kernel(kernel_size, scale, odd=True)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
+    with profile.stage('morphology'):
+        closed_img = cv2.morphologyEx(binary_img, cv2.MORPH_CLOSE, kernel, iterations=2)
+
+    with profile.stage('canny'):
+        edges = cv2.Canny(closed_img, threshold1=canny[0], threshold2=canny[1])
+
+    with profile.stage('morphology'):
+        dilated_edges = cv2.dilate(edges, kernel, iterations=2)
+        dilated_edges = cv2.erode(dilated_edges, kernel, iterations=1)
+        edges_closed = cv2.morphologyEx(dilated_edges, cv2.MORPH_CLOSE, kernel, iterations=1)
+    return edges_closed
+
+def _decoded_gray(image_path, scale, stages=None, profile=NULL_PROFILE):
+    # Dekodirana slika je zajednička faza sa mikutapi.py (isti ključ i isto dekodiranje), pa je ensemble.py
+    # i sweep čitaju jednom
+    with profile.stage('decode'):
+        img = _stage(stages, ('image', image_path, scale), lambda: _load(image_path, scale))
+    with profile.stage('gray'):
+        return _gray_crop(img, scale)
+
+def _staged_edges(image_path, scale, threshold, kernel_size, canny, stages, profile=NULL_PROFILE):
+    # Faze: dekodiranje + sivo (zavisi od slike i skale), pa ivice (i od praga, kernela i Canny granica)
+    key = (image_path, scale)
+    grayscale_img = _stage(stages, ('gray',) + key, lambda: _decoded_gray(image_path, scale, stages, profile))
+    key += (threshold, kernel_size, tuple(canny))
+    edges_closed = _stage(stages, ('edges',) + key,
+                          lambda: _edges_closed(grayscale_img, scale, threshold, kernel_size, canny, profile))
+    return key, edges_closed
+
+def _count_bands(profile, areas, area_bands, scale=1):
+    # Brojač kandidata po opsegu površine (samo kada je merenje uključeno)
+    for low, high in area_bands:
+        scaled_low, scaled_high = scale_area(low, scale), scale_area(high, scale)
+        profile.count(f'candidates_{low}_{high}', sum(1 for area in areas if scaled_low < area < scaled_high))
+
+def _contour_areas(edges_closed):
     contours, _ = cv2.findContours(edges_closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return [(cv2.contourArea(cnt), cv2.boundingRect(cnt), cnt) for cnt in contours]
+
+def count_ducks_with_filled_contours(image_path, scale=1, threshold=80, kernel_size=5, canny=(50, 150),
+                                     area_bands=AREA_BANDS, merge_kernel=4, stages=None, profile=None):
+    profile = profile or NULL_PROFILE
+    key, edges_closed = _staged_edges(image_path, scale, threshold, kernel_size, canny, stages, profile)
+    area_ok = _area_test(area_bands, scale)
+
+    filled_img = np.zeros_like(edges_closed)
+    with profile.stage('find_contours'):
+        contours = _stage(stages, ('contours',) + key, lambda: _contour_areas(edges_closed))
 
     filtered_contours = []
     
-    for cnt in contours:
-        area = cv2.contourArea(cnt)
-        if 750 < area < 2100 or 2200 < area < 5000 or 6700 < area < 7000 or 7500 < area < 10000:
-            x, y, w, h = cv2.boundingRect(cnt)
-            if x > 0 and y > 0 and x + w < filled_img.shape[1] and y + h < filled_img.shape[0]:
-                filtered_contours.append(cnt)
-                cv2.drawContours(filled_img, [cnt], -1, 255, thickness=cv2.FILLED)
+    with profile.stage('area_filter'):
+        for area, (x, y, w, h), cnt in contours:
+            if area_ok(area):
+                if x > 0 and y > 0 and x + w < filled_img.shape[1] and y + h < filled_img.shape[0]:
+                    filtered_contours.append(cnt)
+                    cv2.drawContours(filled_img, [cnt], -1, 255, thickness=cv2.FILLED)
 
-    small_kernel = np.ones((4, 4), np.uint8)
-    filled_img = cv2.dilate(filled_img, small_kernel, iterations=3)
+    with profile.stage('merge'):
+        small_kernel = np.ones((scale_kernel(merge_kernel, scale),) * 2, np.uint8)
+        filled_img = cv2.dilate(filled_img, small_kernel, iterations=3)
 
-    final_contours, _ = cv2.findContours(filled_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        final_contours, _ = cv2.findContours(filled_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
+    if profile.enabled:
+        profile.count('contours', len(contours))
+        _count_bands(profile, [area for area, _, _ in contours], area_bands, scale)
+        profile.count('border_rejected', sum(1 for area, _, _ in contours if area_ok(area)) - len(filtered_contours))
+        profile.count('ducks', len(final_contours))
     return len(final_contours)
 
-def main(dataset_folder):
+def main(dataset_folder, stream=False, workers=1, manifest=None, scan=False,
+         output=None, io_threads=4, prefetch=None, scale=1, eval_cache=None, profile=None, prometheus=None):
+    count_ducks = count_ducks_with_filled_contours
+    # Predikcije po slici se čuvaju po (sadržaj slike, algoritam, parametri, verzija koda)
+    cache = open_eval_cache(eval_cache, __file__, 'resenje', {'scale': scale})
+    # Merenje faza (--profile/--prometheus); bez njega funkcije brojanja koriste NULL_PROFILE
+    report = open_profile('resenje', profile, prometheus)
+    if stream:
+        # Slike se čitaju lenjo iz manifesta (ili foldera) i rezultati se upisuju odmah
+        items = iter_directory(dataset_folder) if scan else iter_manifest(dataset_folder, manifest)
+        mae = run_stream(count_ducks, items, output=output, workers=workers, io_threads=io_threads,
+                         prefetch=prefetch, loader=partial(_load, scale=scale), cache=cache, profile=report,
+                         scale=scale)
+        if cache is not None:
+            cache.report()
+            cache.close()
+        if report is not None:
+            report.finish()
+        print(f"{mae}")
+        return
+
     duck_count_df = pd.read_csv(f'{dataset_folder}/duck_count.csv')
     true_counts = duck_count_df.set_index('picture')['ducks']
 
-    predicted_counts = []
-    for i in range(1, 11):
-        image_path = f'{dataset_folder}/picture_{i}.jpg'
-        predicted_count = count_ducks_with_filled_contours(image_path)
-        predicted_counts.append(predicted_count)
+    image_paths = [f'{dataset_folder}/picture_{i}.jpg' for i in range(1, 11)]
+    count_fn = count_ducks if report is None else report.wrap(count_ducks)
+
+    def count_images(paths):
+        results = [count_fn(path, scale=scale) for path in paths]
+        return results if report is None else report.collect(results)
+
+    predicted_counts = cached_predictions(cache, image_paths, count_images)
+    if report is not None:
+        report.finish()
 
     predicted_counts_series = pd.Series(predicted_counts, index=true_counts.index)
     mae = np.mean(np.abs(predicted_counts_series - true_counts))
     print(f"{mae}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python script.py <dataset_folder>")
-    main(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Count ducks on every picture and print the MAE.")
+    parser.add_argument("dataset_folder")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream images lazily from the manifest with bounded memory instead of picture_1..10")
+    parser.add_argument("--manifest", help="CSV with picture,ducks columns (default: <dataset_folder>/duck_count.csv)")
+    parser.add_argument("--scan", action="store_true",
+                        help="with --stream, count every image in the folder instead of the manifest (no MAE)")
+    parser.add_argument("-o", "--output", help="write per-image results as they finish (.csv or .jsonl)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="worker processes for --stream (0 = one per CPU core)")
+    parser.add_argument("--io-threads", type=int, default=4, help="threads that read and decode images ahead")
+    parser.add_argument("--prefetch", type=int, help="max images in flight (default: 2 x max(workers, io threads))")
+    parser.add_argument("--scale", type=int, choices=SCALES, default=1,
+                        help="decode JPEGs reduced by this factor (faster, but counts drift from full resolution, "
+                             "see README); ROI, kernels and area bands are rescaled to match")
+    parser.add_argument("--eval-cache", metavar="FILE",
+                        help="SQLite file with per-image predictions; only new or changed images are recomputed")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="time every pipeline stage and write histograms, counters and per-image totals as JSON")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="write the same measurements in Prometheus text format (implies profiling)")
+    args = parser.parse_args()
+    main(args.dataset_folder, stream=args.stream, workers=args.workers,
+         manifest=args.manifest, scan=args.scan, output=args.output, io_threads=args.io_threads,
+         prefetch=args.prefetch, scale=args.scale, eval_cache=args.eval_cache,
+         profile=args.profile, prometheus=args.prometheus)
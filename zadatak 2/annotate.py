@@ -0,0 +1,119 @@
+import os
+import queue
+import sys
+import threading
+
+import cv2
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi')
+FORMATS = ('mp4', 'png')
+
+# Boje (BGR): linije brojanja, kandidat koji nije prošao proveru boje, kandidat iste boje, prebrojan objekat
+LINE_COLOUR = (255, 0, 0)
+REJECTED_COLOUR = (0, 0, 255)
+ACCEPTED_COLOUR = (0, 255, 0)
+COUNTED_COLOUR = (0, 255, 255)
+
+
+class Annotator:
+    # Crtanje i upis anotiranih frejmova na pozadinskoj niti. Analiza samo kopira frejm u ograničen red;
+    # kada je red pun frejm se odbacuje (broji se u dropped), pa disk nikad ne usporava brojanje.
+    # path je .mp4/.avi (jedan anotirani video) ili folder za PNG slike.
+    # every: upisuje se svaki every-ti predati (analizirani) frejm, bez obzira na njegov indeks u videu, jer se
+    # frejmovi preskaču; 0 znači samo frejmovi sa keep=True (prebrojan objekat).
+    def __init__(self, path, every=1, fps=30.0, queue_size=32):
+        self.path = path
+        self.video = path.lower().endswith(VIDEO_EXTENSIONS)
+        self.every = every
+        self.fps = fps
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+        self._writer = None
+        if not self.video:
+            os.makedirs(path, exist_ok=True)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame_index, frame, marks=(), lines=(), text=None, keep=False):
+        # marks su ((x0, y0), (x1, y1), boja); frejm se kopira jer je posle ovog poziva možda već prepisan
+        # (prsten dekodera, keš sweep-a)
+        self.submitted += 1
+        if not keep and (not self.every or (self.submitted - 1) % self.every):
+            return
+        if self._queue.full():
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait((frame_index, frame.copy(), marks, lines, text))
+        except queue.Full:
+            self.dropped += 1
+
+    def _draw(self, frame, marks, lines, text):
+        for x in lines:
+            cv2.line(frame, (x, 0), (x, frame.shape[0] - 1), LINE_COLOUR, 1)
+        for top_left, bottom_right, colour in marks:
+            cv2.rectangle(frame, top_left, bottom_right, colour, 2)
+        if text:
+            cv2.putText(frame, text, (5, 15), cv2.FONT_HERSHEY_SIMPLEX, 0.45, COUNTED_COLOUR, 1, cv2.LINE_AA)
+        return frame
+
+    def _write(self, frame_index, frame):
+        if not self.video:
+            cv2.imwrite(os.path.join(self.path, f"frame_{frame_index:06d}.png"), frame)
+            return
+        if self._writer is None:
+            fourcc = cv2.VideoWriter_fourcc(*('mp4v' if self.path.lower().endswith('.mp4') else 'MJPG'))
+            self._writer = cv2.VideoWriter(self.path, fourcc, self.fps, (frame.shape[1], frame.shape[0]))
+        self._writer.write(frame)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            frame_index, frame, marks, lines, text = item
+            try:
+                self._write(frame_index, self._draw(frame, marks, lines, text))
+                self.written += 1
+            except Exception as e:  # greška pri upisu ne sme da prekine brojanje
+                self.error = self.error or f"{type(e).__name__}: {e}"
+
+    def close(self, file=sys.stderr):
+        # Čeka da se upišu frejmovi koji su već u redu
+        self._queue.put(None)
+        self._thread.join()
+        if self._writer is not None:
+            self._writer.release()
+        print(f"annotated {self.path}: {self.written} frames written, {self.dropped} dropped"
+              + (f", {self.error}" if self.error else ''), file=file)
+
+
+def _video_fps(video_path, default=30.0):
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fps if fps and fps > 0 else default
+
+
+def open_annotator(folder, video_path, fmt='mp4', every=None, queue_size=32):
+    # None kada anotacija nije uključena, pa petlja analize ne radi ništa dodatno.
+    # Svaki video dobija svoj izlaz u folderu: <video>.annotated.mp4 ili <video>/frame_NNNNNN.png
+    if not folder:
+        return None
+    if fmt not in FORMATS:
+        raise ValueError(f"annotation format must be one of {FORMATS}")
+    os.makedirs(folder, exist_ok=True)
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    if fmt == 'mp4':
+        path = os.path.join(folder, f"{name}.annotated.mp4")
+    else:
+        path = os.path.join(folder, name)
+    if every is None:
+        # Video je podrazumevano potpun, a PNG samo frejmovi na kojima je objekat prebrojan
+        every = 1 if fmt == 'mp4' else 0
+    # Anotirani video ima frame rate ulaznog; preskočeni frejmovi se ne upisuju, pa je kraći od njega
+    fps = _video_fps(video_path) if fmt == 'mp4' else 30.0
+    return Annotator(path, every, fps, queue_size)
@@ -0,0 +1,102 @@
+import os
+import re
+import uuid
+from collections import deque
+
+import cv2
+import numpy as np
+
+from frames import FrameReader
+
+BACKGROUNDS = ('mog2', 'static')
+
+
+class StaticBackground:
+    # Nepromenljiva pozadina (npr. medijana uzorkovanih frejmova): prednji plan je apsolutna razlika
+    # od pozadine preko praga. Isti apply() kao MOG2, pa se koristi umesto njega; stopa učenja se ignoriše.
+    stage = 'static_diff'
+
+    def __init__(self, background, threshold=30):
+        self.background = background
+        self.threshold = threshold
+
+    def apply(self, frame, learningRate=-1):
+        diff = cv2.absdiff(frame, self.background)
+        if diff.ndim == 3:
+            diff = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        return mask
+
+
+def median_background(frames):
+    return np.median(np.stack(frames), axis=0).astype(np.uint8)
+
+
+def sample_frames(video_path, roi=None, samples=15, frame_store=None):
+    # samples ROI frejmova ravnomerno raspoređenih po videu; između njih grab() (ili pomeranje u frame store-u)
+    if frame_store is not None:
+        reader = frame_store.open(video_path, roi)
+        total = len(reader.frames)
+    else:
+        reader = FrameReader(video_path, roi)
+        total = int(reader.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(total // samples, 1)
+    frames = []
+    while len(frames) < samples:
+        cropped_frame = reader.read()
+        if cropped_frame is None:
+            break
+        frames.append(cropped_frame.copy())
+        reader.skip(step - 1)
+    reader.release()
+    return frames
+
+
+class BackgroundSampler:
+    # Poslednjih size frejmova, uzetih na svakih every analiziranih, kao uzorak pozadine za sledeće pokretanje.
+    # Objekti koji prolaze su na svakom mestu samo u malom delu uzoraka, pa ih model ne uči kao pozadinu.
+    def __init__(self, size=50, every=10):
+        self.every = every
+        self.frames = deque(maxlen=size)
+        self._seen = 0
+
+    def add(self, frame):
+        if self._seen % self.every == 0:
+            self.frames.append(frame.copy())
+        self._seen += 1
+
+
+class BackgroundStore:
+    # Uzorci pozadine po kameri i ROI-u (.npy, niz uzoraka x visina x širina x 3). OpenCV ne može da sačuva
+    # stanje MOG2 (mešavine Gausovih raspodela), pa se čuvaju frejmovi: novi model ih prvo primeni redom
+    # i kreće iz stanja u kome bi bio posle njih (topli start).
+    def __init__(self, directory, samples=50, every=10):
+        self.directory = directory
+        self.samples = samples
+        self.every = every
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, camera, roi):
+        roi_part = 'full' if roi is None else '_'.join(str(int(v)) for v in roi)
+        name = re.sub(r'[^A-Za-z0-9._-]+', '_', camera)
+        return os.path.join(self.directory, f"{name}_{roi_part}.npy")
+
+    def load(self, camera, roi=None):
+        # Uzorci ili None kada ih za ovu kameru i ROI još nema
+        try:
+            return np.load(self._path(camera, roi))
+        except (OSError, ValueError):
+            return None
+
+    def sampler(self):
+        return BackgroundSampler(self.samples, self.every)
+
+    def save(self, camera, roi, frames):
+        # frames: uzorci (BackgroundSampler.frames ili frejmovi za statičnu pozadinu)
+        if not len(frames):
+            return
+        path = self._path(camera, roi)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.stack(frames))
+        os.replace(tmp_path, path)
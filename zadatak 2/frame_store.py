@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+
+import cv2
+import numpy as np
+
+from frames import FrameReader, MemoryFrameReader
+
+# .tmp fajl koji se ovoliko sekundi nije menjao ostao je iza prekinutog procesa (upis u toku ga stalno osvežava);
+# isto važi za zapis heša čije dekodiranje nije završeno
+STALE_SECONDS = 3600
+
+
+def _file_hash(video_path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(video_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _resolve_roi(video_path, roi):
+    # ROI zadat funkcijom (npr. center_square_roi) se računa iz dimenzija videa, bez dekodiranja
+    if not callable(roi):
+        return roi
+    cap = cv2.VideoCapture(video_path)
+    shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+    cap.release()
+    return roi(shape)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class FrameStore:
+    # Dekodirani ROI isečci videa na disku, jedan niz (frejmovi x visina x širina x 3) po videu i ROI-u.
+    # Ključ je heš sadržaja fajla + ROI, pa preimenovan ili kopiran video ne dekodira se ponovo.
+    # Nizovi se čitaju preko memorijskog mapiranja i frejmovi su pogledi u njih (bez kopiranja);
+    # kada ukupna veličina pređe max_bytes brišu se najdavnije korišćeni.
+    # Više procesa (-j) može deliti isti folder: svaki fajl se upisuje atomski, a fajl koji je drugi proces
+    # u međuvremenu obrisao se tretira kao promašaj. Zapisi heševa videa bez ijednog niza i .tmp fajlovi
+    # prekinutih procesa se brišu pri otvaranju i uz izbacivanje nizova.
+    def __init__(self, directory, max_bytes=4 << 30):
+        self.directory = directory
+        self.hashes_directory = os.path.join(directory, 'hashes')
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.hashes_directory, exist_ok=True)
+        self._remove_stale()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def _content_hash(self, video_path):
+        # Heš se pamti po (putanja, veličina, vreme izmene), pa topli start ne čita ceo video.
+        # Svaki video ima svoj fajl, pa procesi ne prepisuju jedan drugom zajednički indeks.
+        stat = os.stat(video_path)
+        stamp = f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        hash_path = os.path.join(self.hashes_directory, hashlib.blake2b(stamp.encode(), digest_size=16).hexdigest())
+        try:
+            with open(hash_path) as f:
+                return f.read()
+        except OSError:
+            pass
+        content_hash = _file_hash(video_path)
+        self._write_atomic(hash_path, content_hash.encode())
+        return content_hash
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def key(self, video_path, roi=None):
+        roi = _resolve_roi(video_path, roi)
+        roi_part = 'full' if roi is None else '_'.join(str(int(v)) for v in roi)
+        return f"{self._content_hash(video_path)}_{roi_part}"
+
+    def frames(self, video_path, roi=None):
+        if not os.path.isfile(video_path):
+            # Isto kao VideoCapture nad nepostojećim fajlom: nema frejmova
+            return np.zeros((0, 0, 0, 3), np.uint8)
+        key = self.key(video_path, roi)
+        meta_path = self._path(key, '.json')
+        data_path = self._path(key, '.frames')
+        try:
+            frames = self._load(meta_path, data_path)
+            self.hits += 1
+            return frames
+        except FileNotFoundError:
+            pass
+        self.misses += 1
+        frames = self._decode(video_path, roi, data_path, meta_path)
+        self._evict(keep=data_path)
+        return frames
+
+    def _load(self, meta_path, data_path):
+        # FileNotFoundError kada niz ne postoji (ili ga je drugi proces upravo obrisao)
+        os.utime(data_path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta['count'] == 0:
+            return np.zeros((0, 0, 0, 3), np.uint8)
+        return np.memmap(data_path, dtype=np.uint8, mode='r', shape=tuple(meta['shape']))
+
+    def _decode(self, video_path, roi, data_path, meta_path):
+        # Frejmovi se upisuju redom kako se dekodiraju, pa memorija ne zavisi od dužine videa.
+        # Niz se mapira pre nego što postane vidljiv drugim procesima, pa mapiranje ostaje ispravno
+        # i ako ga neki od njih odmah obriše.
+        tmp_path = f"{data_path}.{uuid.uuid4().hex}.tmp"
+        reader = FrameReader(video_path, roi)
+        count = 0
+        shape = None
+        with open(tmp_path, 'wb') as f:
+            for cropped_frame in reader:
+                shape = cropped_frame.shape
+                f.write(np.ascontiguousarray(cropped_frame).data)
+                count += 1
+        reader.release()
+        shape = [count] + list(shape) if count else [0, 0, 0, 3]
+        frames = np.memmap(tmp_path, dtype=np.uint8, mode='r', shape=tuple(shape)) if count else \
+            np.zeros((0, 0, 0, 3), np.uint8)
+        os.replace(tmp_path, data_path)
+        self._write_atomic(meta_path, json.dumps({'video': os.path.basename(video_path), 'count': count,
+                                                  'shape': shape}).encode())
+        return frames
+
+    def _files(self, directory, suffix):
+        # Drugi proces može istovremeno brisati iste fajlove; fajl koji više ne postoji se preskače
+        files = []
+        for name in os.listdir(directory):
+            if name.endswith(suffix):
+                path = os.path.join(directory, name)
+                try:
+                    files.append((name, path, os.stat(path)))
+                except FileNotFoundError:
+                    continue
+        return files
+
+    def _evict(self, keep=None):
+        entries = [(stat.st_mtime, stat.st_size, path) for _, path, stat in self._files(self.directory, '.frames')]
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            _remove_file(path)
+            _remove_file(path[:-len('.frames')] + '.json')
+            total -= size
+        self._remove_stale()
+
+    def _remove_stale(self):
+        # Zapis heša se čuva dok postoji bar jedan niz tog videa (ključ počinje hešom sadržaja), a stari
+        # .tmp fajlovi u oba foldera se brišu
+        stale = time.time() - STALE_SECONDS
+        for _, path, stat in self._files(self.directory, '.tmp') + self._files(self.hashes_directory, '.tmp'):
+            if stat.st_mtime < stale:
+                _remove_file(path)
+        stored = {name.split('_', 1)[0] for name, _, _ in self._files(self.directory, '.frames')}
+        for name, path, stat in self._files(self.hashes_directory, ''):
+            if name.endswith('.tmp') or stat.st_mtime >= stale:
+                continue
+            try:
+                with open(path) as f:
+                    content_hash = f.read()
+            except FileNotFoundError:
+                continue
+            if content_hash not in stored:
+                _remove_file(path)
+
+    def open(self, video_path, roi=None):
+        return MemoryFrameReader(self.frames(video_path, roi))
@@ -0,0 +1,277 @@
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+def crop_roi(frame, roi):
+    if roi is None:
+        return frame
+    x, y, w, h = roi
+    return frame[y:y+h, x:x+w]
+
+
+class FrameStats:
+    def __init__(self, capacity=0):
+        self.capacity = capacity
+        self.decoded = 0
+        self.analysed = 0
+        self.skipped = 0
+        self.decode_time = 0.0
+        self.analysis_time = 0.0
+        self.occupancy_total = 0
+        self.occupancy_max = 0
+
+    def summary(self):
+        return {
+            'frames': self.analysed,
+            'skipped': self.skipped,
+            'decode_fps': self.decoded / self.decode_time if self.decode_time else 0.0,
+            'analysis_fps': self.analysed / self.analysis_time if self.analysis_time else 0.0,
+            'queue_mean': self.occupancy_total / self.analysed if self.analysed else 0.0,
+            'queue_max': self.occupancy_max,
+            'queue_capacity': self.capacity,
+        }
+
+
+def format_stats(name, summary):
+    return (f"{name}: {summary['frames']} frames ({summary['skipped']} skipped), "
+            f"decode {summary['decode_fps']:.1f} fps, "
+            f"analysis {summary['analysis_fps']:.1f} fps, "
+            f"queue {summary['queue_mean']:.1f}/{summary['queue_capacity']} (max {summary['queue_max']})")
+
+
+def print_stats(names, summaries):
+    for name, summary in zip(names, summaries):
+        print(format_stats(name, summary), file=sys.stderr)
+
+
+class FrameReader:
+    # Dekodira i kropuje frejmove na istoj niti na kojoj se radi analiza.
+    # roi je (x, y, w, h), None (ceo frejm) ili funkcija koja od dimenzija frejma vraća (x, y, w, h).
+    def __init__(self, video_path, roi=None):
+        self.cap = cv2.VideoCapture(video_path)
+        self.roi = roi
+        self.stats = FrameStats()
+        self.position = -1  # indeks poslednjeg vraćenog frejma
+        self._next_index = 0  # indeks sledećeg frejma u videu
+        self._last_return = None
+
+    def _resolve_roi(self, frame):
+        if callable(self.roi):
+            self.roi = self.roi(frame.shape)
+        return self.roi
+
+    def _decode(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self._next_index += 1
+        return crop_roi(frame, self._resolve_roi(frame))
+
+    def _grab(self):
+        # grab() pomera video napred bez dekodiranja i konverzije frejma
+        if not self.cap.grab():
+            return False
+        self._next_index += 1
+        return True
+
+    def _next(self):
+        start = time.perf_counter()
+        cropped_frame = self._decode()
+        if cropped_frame is not None:
+            self.position = self._next_index - 1
+            self.stats.decoded += 1
+            self.stats.decode_time += time.perf_counter() - start
+        return cropped_frame
+
+    def read(self):
+        # Vreme između dva poziva read() je vreme koje je potrošila analiza prethodnog frejma
+        if self._last_return is not None:
+            self.stats.analysis_time += time.perf_counter() - self._last_return
+            self._last_return = None
+
+        cropped_frame = self._next()
+        if cropped_frame is not None:
+            self.stats.analysed += 1
+            self._last_return = time.perf_counter()
+        return cropped_frame
+
+    def skip(self, n):
+        # Preskače n frejmova posle poslednjeg vraćenog
+        for _ in range(n):
+            if not self._grab():
+                break
+            self.stats.skipped += 1
+
+    def __iter__(self):
+        while True:
+            cropped_frame = self.read()
+            if cropped_frame is None:
+                return
+            yield cropped_frame
+
+    def release(self):
+        self.cap.release()
+
+
+class ThreadedFrameReader(FrameReader):
+    # Nit dekodera puni prsten od buffer_size unapred alociranih ROI isečaka, a analiza ih čita.
+    # Kada je prsten pun dekoder čeka (backpressure), pa memorija ne raste sa dužinom videa.
+    # Frejm vraćen iz read() važi do sledećeg poziva read(). Izuzetak na niti dekodera se, posle
+    # već dekodiranih frejmova, ponovo podiže iz read() umesto da izgleda kao kraj videa.
+    def __init__(self, video_path, roi=None, buffer_size=8):
+        super().__init__(video_path, roi)
+        if buffer_size < 2:
+            raise ValueError("buffer_size must be at least 2")
+        self.buffer_size = buffer_size
+        self.stats.capacity = buffer_size
+        self._slots = [None] * buffer_size
+        self._indices = [0] * buffer_size
+        self._skip_until = 0
+        self._head = 0
+        self._count = 0
+        self._held = False
+        self._done = False
+        self._error = None
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    def _free_slots(self):
+        return self.buffer_size - self._count - (1 if self._held else 0)
+
+    def _store(self, index, cropped_frame):
+        slot = self._slots[index]
+        if slot is None or slot.shape != cropped_frame.shape:
+            self._slots[index] = np.ascontiguousarray(cropped_frame).copy()
+        else:
+            np.copyto(slot, cropped_frame)
+
+    def _produce(self):
+        try:
+            while True:
+                with self._cond:
+                    while not self._stopped and self._free_slots() == 0:
+                        self._cond.wait()
+                    if self._stopped:
+                        return
+                    index = (self._head + self._count) % self.buffer_size
+                    skip_until = self._skip_until
+
+                if self._next_index < skip_until:
+                    if not self._grab():
+                        return
+                    with self._cond:
+                        self.stats.skipped += 1
+                    continue
+
+                start = time.perf_counter()
+                frame_index = self._next_index
+                cropped_frame = self._decode()
+                if cropped_frame is None:
+                    return
+                self._store(index, cropped_frame)
+                elapsed = time.perf_counter() - start
+
+                with self._cond:
+                    self._indices[index] = frame_index
+                    self._count += 1
+                    self.stats.decoded += 1
+                    self.stats.decode_time += elapsed
+                    self._cond.notify_all()
+        except BaseException as e:
+            with self._cond:
+                self._error = e
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def _next(self):
+        with self._cond:
+            self._held = False
+            self._cond.notify_all()
+            while True:
+                while self._count == 0 and not self._done:
+                    self._cond.wait()
+                if self._count == 0:
+                    if self._error is not None:
+                        raise self._error
+                    return None
+
+                occupancy = self._count
+                frame_index = self._indices[self._head]
+                cropped_frame = self._slots[self._head]
+                self._head = (self._head + 1) % self.buffer_size
+                self._count -= 1
+                self._cond.notify_all()
+
+                # Frejmovi koje je dekoder pripremio pre nego što je stigao zahtev za preskakanje
+                if frame_index < self._skip_until:
+                    self.stats.skipped += 1
+                    continue
+
+                self.stats.occupancy_total += occupancy
+                self.stats.occupancy_max = max(self.stats.occupancy_max, occupancy)
+                self._held = True
+                self.position = frame_index
+                return cropped_frame
+
+    def skip(self, n):
+        # Dekoder umesto dekodiranja radi grab() sve do frejma skip_until
+        with self._cond:
+            self._skip_until = max(self._skip_until, self.position + 1 + n)
+            self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+        super().release()
+
+
+class MemoryFrameReader(FrameReader):
+    # Isti interfejs kao FrameReader, ali nad već dekodiranim frejmovima (npr. iz keša sweep-a)
+    def __init__(self, frames):
+        self.frames = frames
+        self.cap = None
+        self.roi = None
+        self.stats = FrameStats()
+        self.position = -1
+        self._next_index = 0
+        self._last_return = None
+
+    def _decode(self):
+        if self._next_index >= len(self.frames):
+            return None
+        cropped_frame = self.frames[self._next_index]
+        self._next_index += 1
+        return cropped_frame
+
+    def _grab(self):
+        if self._next_index >= len(self.frames):
+            return False
+        self._next_index += 1
+        return True
+
+    def release(self):
+        pass
+
+
+def load_frames(video_path, roi=None):
+    # Svi ROI isečci videa; kopija da isečak ne bi držao ceo frejm u memoriji
+    reader = FrameReader(video_path, roi)
+    frames = [cropped_frame.copy() for cropped_frame in reader]
+    reader.release()
+    return frames
+
+
+def open_frames(video_path, roi=None, threaded=False, buffer_size=8):
+    if threaded:
+        return ThreadedFrameReader(video_path, roi, buffer_size=buffer_size)
+    return FrameReader(video_path, roi)
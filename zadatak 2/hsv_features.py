@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+
+
+class HsvBoxMeans:
+    # HSV konverzija jednom po frejmu + integralna slika, pa je srednja vrednost
+    # bilo kog pravougaonika četiri čitanja umesto nove konverzije i cv2.mean.
+    # hsv je već konvertovan frejm (SharedHsv), pa se konverzija preskače.
+    def __init__(self, frame, hsv=None):
+        self.hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV) if hsv is None else hsv
+        self.sums = cv2.integral(self.hsv)
+
+    def means(self, boxes):
+        # boxes: niz (x, y, w, h); rezultat je matrica N x 3 sa srednjim H, S, V
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        h, w = self.hsv.shape[:2]
+        x0 = np.clip(boxes[:, 0], 0, w)
+        y0 = np.clip(boxes[:, 1], 0, h)
+        x1 = np.clip(boxes[:, 0] + boxes[:, 2], 0, w)
+        y1 = np.clip(boxes[:, 1] + boxes[:, 3], 0, h)
+
+        sums = self.sums
+        totals = sums[y1, x1] - sums[y0, x1] - sums[y1, x0] + sums[y0, x0]
+        area = (x1 - x0) * (y1 - y0)
+        # Množenje recipročnom vrednošću, isto kao u cv2.mean, da bi poređenja sa granicama bila identična
+        with np.errstate(divide='ignore'):
+            scale = np.where(area > 0, 1.0 / area, 0.0)
+        return totals * scale[:, None]
+
+
+def in_hsv_range(means, lower, upper):
+    return np.all((means >= lower) & (means <= upper), axis=1)
+
+
+def _overlap(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def _union(a, b):
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def overlap_groups(regions):
+    # Regioni (x, y, w, h) spojeni u grupe koje se preklapaju; rezultat je lista obuhvatnih pravougaonika.
+    # Spajanje se ponavlja dok se nijedna dva pravougaonika ne preklapaju.
+    groups = []
+    for region in regions:
+        box = tuple(region)
+        merged = True
+        while merged:
+            merged = False
+            for group in groups:
+                if _overlap(group, box):
+                    groups.remove(group)
+                    box = _union(group, box)
+                    merged = True
+                    break
+        groups.append(box)
+    return groups
+
+
+class SharedHsv:
+    # HSV konverzija deljena između brojača sa različitim regionima istog frejma. Regioni koji se preklapaju
+    # čine grupu koja se konvertuje jednom po frejmu (i tek kada je neki brojač zatraži), a svaki brojač
+    # dobija svoj isečak. Konverzija je po pikselu, pa je isečak isti kao konverzija samog regiona.
+    def __init__(self, regions):
+        self.groups = overlap_groups(regions)
+        self.frame = None
+        self.conversions = 0
+        self._hsv = {}
+
+    def new_frame(self, frame):
+        self.frame = frame
+        self._hsv.clear()
+
+    def crop(self, region):
+        x, y, w, h = region
+        for index, (gx, gy, gw, gh) in enumerate(self.groups):
+            if gx <= x and gy <= y and x + w <= gx + gw and y + h <= gy + gh:
+                break
+        else:
+            raise ValueError(f"region {region} was not registered")
+        hsv = self._hsv.get(index)
+        if hsv is None:
+            hsv = self._hsv[index] = cv2.cvtColor(self.frame[gy:gy+gh, gx:gx+gw], cv2.COLOR_BGR2HSV)
+            self.conversions += 1
+        return hsv[y-gy:y-gy+h, x-gx:x-gx+w]
@@ -1,69 +1,201 @@
+import argparse
 import cv2
 import pandas as pd
 import numpy as np
 import os
 import sys
 
-def count_and_evaluate_buzzy_beetles(video_path, track_line=450, min_contour_area=1000, max_contour_area=2000, distance_threshold=40):
-    cap = cv2.VideoCapture(video_path)
-    count = 0
-    tracked_objects = []  # Lista za praćenje objekata (x, y)
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Kropovanje na srednji kvadrat
-        h, w, _ = frame.shape
-        size = min(h, w)
-        start_x = (w - size) // 2
-        start_y = (h - size) // 2 + 200
-        frame = frame[start_y:start_y+size - 100, start_x:start_x+size]
-
-        # Konverzija u HSV i maskiranje tamno plave boje
-        hsv_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        lower_blue = np.array([85, 80, 45])  # Donja granica za tamno plavu
-        upper_blue = np.array([140, 255, 255])  # Gornja granica za tamno plavu
+from frame_store import FrameStore
+from frames import load_frames, open_frames, print_stats
+from tracking import CentroidTracker
+
+# eval_cache.py je zajednički za oba zadatka i nalazi se u korenu repozitorijuma
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from eval_cache import cached_predictions, open_eval_cache
+from profiling import NULL_PROFILE, open_profile
+
+def center_square_roi(frame_shape):
+    # Kropovanje na srednji kvadrat
+    h, w = frame_shape[:2]
+    size = min(h, w)
+    start_x = (w - size) // 2
+    start_y = (h - size) // 2 + 200
+    return (start_x, start_y, size, size - 100)
+
+def blue_contours(frame, lower_blue, upper_blue, x0=0, x1=None, profile=NULL_PROFILE, hsv=None):
+    # Konverzija u HSV i maskiranje tamno plave boje (samo kolone x0:x1);
+    # hsv je već konvertovan ceo frejm (deljena konverzija u multi.py)
+    with profile.stage('hsv_mask'):
+        if hsv is None:
+            hsv_frame = cv2.cvtColor(frame[:, x0:x1], cv2.COLOR_BGR2HSV)
+        else:
+            hsv_frame = hsv[:, x0:x1]
         mask = cv2.inRange(hsv_frame, lower_blue, upper_blue)
 
-        # Pronalaženje kontura
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if min_contour_area <= area <= max_contour_area:
-                x, y, w, h = cv2.boundingRect(contour)
-                center_x = x + w // 2
-                center_y = y + h // 2
-
-                # Provera da li je objekat već praćen
-                is_new_object = True
-                for (prev_x, prev_y) in tracked_objects:
-                    if np.sqrt((center_x - prev_x) ** 2 + (center_y - prev_y) ** 2) < distance_threshold:
-                        is_new_object = False
-                        break
-
-                # Ako je novi objekat i prelazi liniju, dodaj ga u praćenje
-                if is_new_object and center_x > track_line:
-                    tracked_objects.append((center_x, center_y))
-                    count += 1
-
-    cap.release()
+    # Pronalaženje kontura, koordinate su u odnosu na ceo frejm
+    with profile.stage('find_contours'):
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, 0))
+    return contours
+
+def frame_contours(frame, lower_blue, upper_blue, track_line, strip_width=None, profile=NULL_PROFILE, hsv=None):
+    # Konture jednog frejma i desna granica brojanja
+    profile.count('frames')
+    if not strip_width:
+        return blue_contours(frame, lower_blue, upper_blue, profile=profile, hsv=hsv), frame.shape[1]
+    # U režimu trake broji se samo objekat čiji je centar u traci desno od linije.
+    # Ceo frejm se obrađuje samo kada neka kontura dodiruje ivicu trake (objekat je odsečen).
+    strip_x0 = max(0, track_line - strip_width // 2)
+    strip_x1 = min(frame.shape[1], track_line + strip_width // 2)
+    contours = blue_contours(frame, lower_blue, upper_blue, strip_x0, strip_x1, profile=profile, hsv=hsv)
+    for contour in contours:
+        x, _, w, _ = cv2.boundingRect(contour)
+        if (strip_x0 > 0 and x <= strip_x0) or (strip_x1 < frame.shape[1] and x + w >= strip_x1):
+            profile.count('full_frame_fallbacks')
+            return blue_contours(frame, lower_blue, upper_blue, profile=profile, hsv=hsv), strip_x1
+    return contours, strip_x1
+
+def _frame_contours(reader, lower_blue, upper_blue, track_line, strip_width=None, profile=NULL_PROFILE):
+    # (indeks frejma, konture, desna granica brojanja) za svaki frejm
+    while True:
+        with profile.stage('decode'):
+            frame = reader.read()
+        if frame is None:
+            return
+        contours, strip_x1 = frame_contours(frame, lower_blue, upper_blue, track_line, strip_width, profile)
+        yield reader.position, contours, strip_x1
+
+def _cached_frame_contours(video_path, lower_blue, upper_blue, stages, frame_store=None):
+    # Sweep: konture po frejmu zavise samo od videa i HSV granica, pa ih dele sve ostale konfiguracije
+    def compute():
+        frames = stages.get(('frames', video_path, 'center_square'),
+                            lambda: frame_store.frames(video_path, center_square_roi) if frame_store
+                            else load_frames(video_path, center_square_roi))
+        return [(index, blue_contours(frame, lower_blue, upper_blue), frame.shape[1])
+                for index, frame in enumerate(frames)]
+    return stages.get(('blue_contours', video_path, tuple(lower_blue), tuple(upper_blue)), compute)
+
+# Opcije koje BeetleCounter prima (i koje brojač klk u multi.py prihvata)
+COUNTER_OPTIONS = ('track_line', 'min_contour_area', 'max_contour_area', 'distance_threshold', 'max_track_age',
+                   'lower_blue', 'upper_blue', 'strip_width')
+
+
+class BeetleCounter:
+    # Stanje brojanja jednog videa: tragovi objekata i broj. process() prima konture jednog frejma
+    # i vraća koliko je objekata na njemu prebrojano; process_frame() ih prvo nalazi na kropovanom frejmu.
+    def __init__(self, track_line=450, min_contour_area=1000, max_contour_area=2000, distance_threshold=40,
+                 max_track_age=15, lower_blue=(85, 80, 45), upper_blue=(140, 255, 255), strip_width=None,
+                 profile=None):
+        self.profile = profile or NULL_PROFILE
+        self.lower_blue = np.array(lower_blue)
+        self.upper_blue = np.array(upper_blue)
+        self.strip_width = strip_width
+        self.track_line = track_line
+        self.min_contour_area = min_contour_area
+        self.max_contour_area = max_contour_area
+        self.count = 0
+        # Praćenje objekata (x, y); trag se zaboravlja kada objekat nestane iz kadra
+        self.tracker = CentroidTracker(max_distance=distance_threshold, max_age=max_track_age)
+
+    def process(self, contours, frame_index, strip_x1):
+        profile = self.profile
+        centers = []
+        with profile.stage('area_filter'):
+            for contour in contours:
+                area = cv2.contourArea(contour)
+                if self.min_contour_area <= area <= self.max_contour_area:
+                    x, y, w, h = cv2.boundingRect(contour)
+                    centers.append((x + w // 2, y + h // 2))
+        profile.count('contours', len(contours))
+        profile.count('candidates', len(centers))
+
+        # Svaki objekat (trag) se broji jednom, kada mu centar pređe liniju
+        with profile.stage('tracking'):
+            tracks, _ = self.tracker.update(centers, frame_index)
+        counted = 0
+        for (center_x, _), track in zip(centers, tracks):
+            if not track.counted and self.track_line < center_x <= strip_x1:
+                track.counted = True
+                counted += 1
+        self.count += counted
+        return counted
+
+    def process_frame(self, frame, frame_index, hsv=None):
+        contours, strip_x1 = frame_contours(frame, self.lower_blue, self.upper_blue, self.track_line,
+                                            self.strip_width, self.profile, hsv)
+        return self.process(contours, frame_index, strip_x1)
+
+def count_and_evaluate_buzzy_beetles(video_path, track_line=450, min_contour_area=1000, max_contour_area=2000, distance_threshold=40,
+                                     threaded=False, buffer_size=8, return_stats=False, strip_width=None, max_track_age=15,
+                                     lower_blue=(85, 80, 45), upper_blue=(140, 255, 255), stages=None, frame_store=None,
+                                     profile=None):
+    profile = profile or NULL_PROFILE
+    counter = BeetleCounter(track_line, min_contour_area, max_contour_area, distance_threshold, max_track_age,
+                            lower_blue, upper_blue, strip_width, profile)
+    lower_blue = np.array(lower_blue)  # Donja granica za tamno plavu
+    upper_blue = np.array(upper_blue)  # Gornja granica za tamno plavu
+
+    reader = None
+    if stages is None:
+        if frame_store is not None:
+            reader = frame_store.open(video_path, center_square_roi)
+        else:
+            reader = open_frames(video_path, center_square_roi, threaded=threaded, buffer_size=buffer_size)
+        contours_per_frame = _frame_contours(reader, lower_blue, upper_blue, track_line, strip_width, profile)
+    elif strip_width:
+        raise ValueError("stage caching does not support strip mode")
+    else:
+        contours_per_frame = _cached_frame_contours(video_path, lower_blue, upper_blue, stages, frame_store)
+
+    for frame_index, contours, strip_x1 in contours_per_frame:
+        counter.process(contours, frame_index, strip_x1)
+
+    count = counter.count
+    if reader is not None:
+        reader.release()
+    profile.count('counted', count)
+    if return_stats:
+        return count, reader.stats.summary() if reader is not None else {}
     return count
 
-def main(dataset_folder):
+def main(dataset_folder, threaded=False, buffer_size=8, stats=False, strip_width=None, frame_store=None,
+         frame_store_mb=4096, eval_cache=None, profile=None, prometheus=None):
+    store = FrameStore(frame_store, frame_store_mb << 20) if frame_store else None
     ground_truth_path = os.path.join(dataset_folder, 'buzzy_beetle_count.csv')
     videos = [os.path.join(dataset_folder, f) for f in os.listdir(dataset_folder) if f.endswith('.mp4')]
 
     # Učitavanje tačnih vrednosti
     ground_truth = pd.read_csv(ground_truth_path)
 
+    # Merenje faza (--profile/--prometheus); bez njega funkcija brojanja koristi NULL_PROFILE
+    report = open_profile('klk', profile, prometheus)
+    count_fn = count_and_evaluate_buzzy_beetles
+    if report is not None:
+        count_fn = report.wrap(count_fn)
+
     # Procesiranje svakog videa
-    predicted_counts = []
-    for video_path in sorted(videos):
-        video_name = os.path.basename(video_path)
-        count = count_and_evaluate_buzzy_beetles(video_path)
-        predicted_counts.append({'video': video_name, 'predicted_count': count})
+    def count_videos(paths):
+        counts = []
+        for video_path in paths:
+            result = count_fn(video_path, threaded=threaded, buffer_size=buffer_size,
+                              return_stats=stats, strip_width=strip_width, frame_store=store)
+            if report is not None:
+                result, = report.collect([result])
+            if stats:
+                count, summary = result
+                print_stats([os.path.basename(video_path)], [summary])
+            else:
+                count = result
+            counts.append(count)
+        return counts
+
+    # Predikcije po videu se čuvaju po (sadržaj videa, algoritam, parametri, verzija koda)
+    cache = open_eval_cache(eval_cache, __file__, 'klk', {'strip_width': strip_width})
+    videos = sorted(videos)
+    counts = cached_predictions(cache, videos, count_videos)
+    if report is not None:
+        report.finish()
+    predicted_counts = [{'video': os.path.basename(video_path), 'predicted_count': count}
+                        for video_path, count in zip(videos, counts)]
 
     predicted_df = pd.DataFrame(predicted_counts)
     result_df = pd.merge(ground_truth, predicted_df, on='video')
@@ -74,5 +206,29 @@ def main(dataset_folder):
     print(f"{mae:.1f}")
 
 if __name__ == "__main__":
-    dataset_folder = sys.argv[1]  # Prvi argument komandne linije
-    main(dataset_folder)
+    parser = argparse.ArgumentParser(description="Count dark blue beetles crossing the tracking line and print the MAE.")
+    parser.add_argument("dataset_folder")  # Prvi argument komandne linije
+    parser.add_argument("--threaded", action="store_true",
+                        help="decode frames on a separate thread while the previous ones are analysed")
+    parser.add_argument("--buffer-size", type=int, default=8,
+                        help="number of cropped frames buffered between decoder and analysis (with --threaded)")
+    parser.add_argument("--stats", action="store_true",
+                        help="print decode fps, analysis fps and queue occupancy per video to stderr")
+    parser.add_argument("--strip-width", type=int,
+                        help="analyse only a band of this width around the tracking line")
+    parser.add_argument("--frame-store", metavar="DIR",
+                        help="keep decoded frames in DIR (keyed by video content and ROI) and memory-map them "
+                             "on later runs instead of decoding")
+    parser.add_argument("--frame-store-mb", type=int, default=4096,
+                        help="size limit of the frame store; least recently used videos are removed first")
+    parser.add_argument("--eval-cache", metavar="FILE",
+                        help="SQLite file with per-video predictions; only new or changed videos are recomputed")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="time every pipeline stage and write histograms, counters and per-video totals as JSON")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="write the same measurements in Prometheus text format (implies profiling)")
+    args = parser.parse_args()
+    main(args.dataset_folder, threaded=args.threaded, buffer_size=args.buffer_size, stats=args.stats,
+         strip_width=args.strip_width, frame_store=args.frame_store, frame_store_mb=args.frame_store_mb,
+         eval_cache=args.eval_cache, profile=args.profile, prometheus=args.prometheus)
+
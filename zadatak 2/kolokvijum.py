@@ -1,116 +1,547 @@
+import argparse
 import cv2
-import numpy as np
-import pandas as pd
+import os
 import sys
+import warnings
+import numpy as np
+
+from annotate import ACCEPTED_COLOUR, COUNTED_COLOUR, REJECTED_COLOUR, open_annotator
+from background import BACKGROUNDS, BackgroundStore, StaticBackground, median_background, sample_frames
+from frame_store import FrameStore
+from frames import MemoryFrameReader, load_frames, open_frames, print_stats
+from hsv_features import HsvBoxMeans, in_hsv_range
+from tracking import CentroidTracker
+from video_batch import load_manifest, run_batch
+
+# eval_cache.py je zajednički za oba zadatka i nalazi se u korenu repozitorijuma
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from eval_cache import cached_predictions, open_eval_cache
+from profiling import NULL_PROFILE, open_profile
+
+def _count_lines(center_x):
+    # Kolone u kojima se broji: centar malog objekta je pomeren za -120, a centar ćelije velikog za +110
+    return (center_x + 120, center_x - 110)
+
+def _blob_near_line(contours, center_x, margin):
+    count_lines = _count_lines(center_x)
+    for cnt in contours:
+        if cv2.contourArea(cnt) <= 1000:
+            continue
+        x, _, w, _ = cv2.boundingRect(cnt)
+        for line in count_lines:
+            if x - margin <= line <= x + w + margin:
+                return True
+    return False
+
+BACKGROUND_HISTORY = 500
+
+# Frejmovi koji se preskaču posle brojanja ćelije mreže. Prebrojana ćelija se pamti dva takva preskoka,
+# da bi je video bar sledeći analizirani frejm.
+GRID_SKIP = 40
+CELL_AGE = 2 * GRID_SKIP
+
+# Deo kadra (x, y, w, h) u kome se broji na snimcima iz zadatka
+ROI = (400, 250, 500, 320)
+
+def _grid_cell_is_blue(mean_hsv):
+    h, s, v = mean_hsv[:, 0], mean_hsv[:, 1], mean_hsv[:, 2]
+    return (56 <= h) & (h <= 82) & \
+           (((110 <= s) & (s <= 130)) | ((140 <= s) & (s <= 160))) & \
+           (150 <= v) & (v <= 170)
+
+def _create_background_subtractor():
+    return cv2.createBackgroundSubtractorMOG2(history=BACKGROUND_HISTORY, varThreshold=50, detectShadows=True)
+
+def _foreground_mask(fgbg, frame, learning_rate=-1, profile=NULL_PROFILE):
+    # fgbg je MOG2 ili StaticBackground (faza static_diff)
+    with profile.stage(getattr(fgbg, 'stage', 'mog2')):
+        fgmask = fgbg.apply(frame, learningRate=learning_rate)
+    with profile.stage('median_blur'):
+        fgmask = cv2.medianBlur(fgmask, 5)
+    #_, fgmask = cv2.threshold(fgmask, 25, 255, cv2.THRESH_BINARY)
+    return fgmask
+
+def _foreground_contours(fgbg, frame, learning_rate=-1, profile=NULL_PROFILE):
+    fgmask = _foreground_mask(fgbg, frame, learning_rate, profile)
+    with profile.stage('find_contours'):
+        contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return contours
+
+class _CachedForeground:
+    # Konture prednjeg plana iz keša stanja (sweep). Stanje MOG2 zavisi od svih frejmova koje je model
+    # do sada video, pa je ključ niz indeksa primenjenih frejmova. Dok se konfiguracije ne razilaze konture
+    # se uzimaju iz keša; pri prvom promašaju model se dovodi u isto stanje ponovnim primenjivanjem
+    # frejmova koji su u međuvremenu preskočeni.
+    def __init__(self, stages, key, frames):
+        self.stages = stages
+        self.key = ('foreground', key, BACKGROUND_HISTORY)
+        self.frames = frames
+        self.fgbg = _create_background_subtractor()
+        self.sequence = 0
+        self.pending = []
+
+    def contours(self, frame_index):
+        self.sequence = hash((self.sequence, frame_index))
+        self.pending.append(frame_index)
+        return self.stages.get(self.key + (self.sequence,), self._compute)
+
+    def _compute(self):
+        *replay, frame_index = self.pending
+        for index in replay:
+            self.fgbg.apply(self.frames[index])
+        self.pending = []
+        return _foreground_contours(self.fgbg, self.frames[frame_index])
+
+def _strip_contours(frame, strips, strip_models, min_partial_area=150, profile=NULL_PROFILE):
+    # Pozadinski model i konture samo u uskim trakama oko linija brojanja.
+    # Objekat koji dodiruje ivicu trake je odsečen, pa za njega treba cela ROI.
+    contours = []
+    needs_full_roi = False
+    for (x0, x1), model in zip(strips, strip_models):
+        # medianBlur je na uskim i visokim slikama višestruko sporiji, pa se traka obrađuje položena
+        fgmask = cv2.transpose(_foreground_mask(model, cv2.transpose(frame[:, x0:x1]), profile=profile))
+        with profile.stage('find_contours'):
+            strip_contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, 0))
+        for cnt in strip_contours:
+            x, _, w, _ = cv2.boundingRect(cnt)
+            if (x0 > 0 and x <= x0) or (x1 < frame.shape[1] and x + w >= x1):
+                if cv2.contourArea(cnt) > min_partial_area:
+                    needs_full_roi = True
+                continue
+            contours.append(cnt)
+    return contours, needs_full_roi
+
+def _candidates(contours, center_x):
+    # Svi mali objekti frejma (prate se, a broje kada pređu liniju) i ćelije 3x3 mreže velikih objekata
+    # blizu linije
+    small_boxes = []
+    grid_boxes = []
+    grid_marks = []
+    for cnt in contours:
+        if 1000 < cv2.contourArea(cnt) < 4000:
+            small_boxes.append(cv2.boundingRect(cnt))
+
+        elif 9000 < cv2.contourArea(cnt) < 12000 or 13000 < cv2.contourArea(cnt) < 40000: 
+            x, y, w, h = cv2.boundingRect(cnt)
+            step_x = max(w // 3, 1) 
+            step_y = max(h // 3, 1) 
+
+            for i in range(0, w, step_x):
+                for j in range(0, h, step_y):
+                    sub_x = x + i
+                    sub_y = y + j
+                    sub_w = min(step_x, w - i)
+                    sub_h = min(step_y, h - j)
+
+                    center_of_object = sub_x + sub_w // 2 + 110
 
-def count_blue_objects_crossing_center(video_path, show_frames=False, roi=None, skip_frames=3):
-    cap = cv2.VideoCapture(video_path)
-    beetle_count = 0
-    counted_ids = set()
-    skip_counter = 0
+                    if center_x - 15 <= center_of_object <= center_x + 15:
+                        grid_boxes.append((sub_x, sub_y, sub_w, sub_h))
+                        grid_marks.append(((sub_x, sub_y), (sub_x+step_x, sub_y+step_y)))
+    return small_boxes, grid_boxes, grid_marks
 
-    fgbg = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=50, detectShadows=True)
+class CrossingCounter:
+    # Stanje brojanja jednog videa ili kamere: pozadinski model(i), prebrojani tragovi i broj.
+    # process() analizira jedan ROI frejm i vraća okvire (x, y, w, h) objekata prebrojanih na njemu;
+    # posle poziva je u skip broj sledećih frejmova koje ne treba analizirati.
+    # background je statična pozadina (ROI slika) umesto MOG2; warm_frames su sačuvani uzorci pozadine
+    # koje MOG2 primeni pre prvog frejma; sampler (BackgroundSampler) skuplja uzorke za sledeće pokretanje.
+    # line je kolona centra ROI od koje se računaju linije brojanja (podrazumevano sredina).
+    def __init__(self, width, skip_frames=3, idle_stride=1, approach_margin=40, strip_width=None, strip_refresh=25,
+                 track_distance=40, track_age=15, lower_blue=(60, 110, 150), upper_blue=(82, 160, 172),
+                 profile=None, annotator=None, background=None, background_threshold=30, warm_frames=None,
+                 sampler=None, line=None):
+        self.profile = profile or NULL_PROFILE
+        self.annotator = annotator
+        self.sampler = sampler
+        self.skip_frames = skip_frames
+        self.idle_stride = idle_stride
+        self.approach_margin = approach_margin
+        self.strip_width = strip_width
+        self.strip_refresh = strip_refresh
+        self.lower_blue = np.array(lower_blue)
+        self.upper_blue = np.array(upper_blue)
+        self.count = 0
+        self.skip = 0
+        self.center_x = width // 2 if line is None else line
+        # Svaki mali objekat se prati na svakom analiziranom frejmu i broji (jednom) kada mu centar pređe
+        # liniju; trag koji nije viđen track_age frejmova se zaboravlja
+        self.tracks = CentroidTracker(max_distance=track_distance, max_age=track_age,
+                                      line_x=_count_lines(self.center_x)[0])
+        # Ćelije mreže se i dalje broje po tačnom okviru; okvir prebrojan pre više od CELL_AGE frejmova
+        # se briše, da skup ne raste sa dužinom videa
+        self.counted_cells = {}
+        if background is not None:
+            self.fgbg = StaticBackground(background, background_threshold)
+        else:
+            self.fgbg = _create_background_subtractor()
+        if strip_width:
+            self.strips = [(max(0, line - strip_width // 2), min(width, line + strip_width // 2))
+                           for line in _count_lines(self.center_x)]
+            if background is not None:
+                # Trake se obrađuju položene, pa i njihova pozadina
+                self.strip_models = [StaticBackground(cv2.transpose(background[:, x0:x1]), background_threshold)
+                                     for x0, x1 in self.strips]
+            else:
+                self.strip_models = [_create_background_subtractor() for _ in self.strips]
+            self.frames_since_full = 0
+            self.frames_seen = 0
+        if warm_frames is not None and background is None:
+            self._warm_up(warm_frames)
 
-    ret, first_frame = cap.read()
-    if not ret:
-        return 0
+    def _warm_up(self, frames):
+        # Topli start: modeli primene sačuvane uzorke pozadine, sa istom (automatskom) stopom učenja
+        # kao da su to bili prvi frejmovi videa
+        for frame in frames:
+            self.fgbg.apply(frame)
+            if self.strip_width:
+                for (x0, x1), model in zip(self.strips, self.strip_models):
+                    model.apply(cv2.transpose(frame[:, x0:x1]))
+        if self.strip_width:
+            self.frames_seen = len(frames)
+
+    def _contours(self, frame):
+        if not self.strip_width:
+            return _foreground_contours(self.fgbg, frame, profile=self.profile)
+        # Model cele ROI se osvežava retko i koristi se samo kada neki objekat izađe iz trake.
+        # Stopa učenja prati broj svih analiziranih frejmova (kao da je model video svaki),
+        # inače bi posle retkih osvežavanja brzo "upio" objekte u pozadinu.
+        contours, needs_full_roi = _strip_contours(frame, self.strips, self.strip_models, profile=self.profile)
+        self.frames_since_full += 1
+        self.frames_seen += 1
+        if needs_full_roi or self.frames_since_full >= self.strip_refresh:
+            full_contours = _foreground_contours(self.fgbg, frame,
+                                                 learning_rate=1.0 / min(2 * self.frames_seen, BACKGROUND_HISTORY),
+                                                 profile=self.profile)
+            self.frames_since_full = 0
+            if needs_full_roi:
+                self.profile.count('full_roi_fallbacks')
+                contours = full_contours
+        return contours
+
+    def process(self, frame, frame_index, contours=None, hsv=None):
+        # contours su konture prednjeg plana iz keša faza (sweep); bez njih ih računa pozadinski model.
+        # hsv je funkcija koja vraća HSV ovog frejma (deljena konverzija u multi.py); poziva se samo
+        # kada postoje kandidati.
+        profile = self.profile
+        center_x = self.center_x
+        profile.count('frames')
+        if self.sampler is not None:
+            self.sampler.add(frame)
+        if contours is None:
+            contours = self._contours(frame)
+        profile.count('contours', len(contours))
+
+        # Kandidati iz svih kontura frejma; boja se zatim proverava za sve odjednom
+        with profile.stage('area_filter'):
+            small_boxes, grid_boxes, grid_marks = _candidates(contours, center_x)
+
+        # Mali objekti su kandidati samo na frejmu na kome njihov (još neprebrojani) trag pređe liniju
+        with profile.stage('tracking'):
+            tracks, crossings = self.tracks.update([(x + w // 2, y + h // 2) for x, y, w, h in small_boxes],
+                                                   frame_index)
+        crossed = {crossing.track_id for crossing in crossings}
+        small = [(box, track) for box, track in zip(small_boxes, tracks) if track.id in crossed and not track.counted]
+        for box, seen in list(self.counted_cells.items()):
+            if frame_index - seen > CELL_AGE:
+                del self.counted_cells[box]
+        grid = [(box, mark) for box, mark in zip(grid_boxes, grid_marks) if box not in self.counted_cells]
+
+        candidate_boxes = [box for box, _ in small] + [box for box, _ in grid]
+        candidate_marks = [((x, y), (x + w, y + h)) for (x, y, w, h), _ in small] + [mark for _, mark in grid]
+        skip_counter = 0
+        counted = []
+        counted_marks = []
+        if candidate_boxes:
+            with profile.stage('hsv_check'):
+                mean_hsv = HsvBoxMeans(frame, hsv() if hsv is not None else None).means(candidate_boxes)
+                is_blue = np.concatenate([in_hsv_range(mean_hsv[:len(small)], self.lower_blue, self.upper_blue),
+                                          _grid_cell_is_blue(mean_hsv[len(small):])])
+            if profile.enabled:
+                profile.count('candidates_small', len(small))
+                profile.count('candidates_grid', len(grid))
+                profile.count('colour_passed', int(np.count_nonzero(is_blue)))
+
+            for (box, track), mark, blue in zip(small, candidate_marks, is_blue):
+                if blue:
+                    track.counted = True
+                    self.count += 1
+                    skip_counter = self.skip_frames
+                    counted.append(box)
+                    counted_marks.append(mark)
+            for (box, mark), blue in zip(grid, is_blue[len(small):]):
+                if blue:
+                    self.counted_cells[box] = frame_index
+                    self.count += 1
+                    skip_counter = GRID_SKIP
+                    counted.append(box)
+                    counted_marks.append(mark)
+
+        if self.annotator is not None:
+            # Kandidati: crveno odbijeni po boji, zeleno plavi, žuto upravo prebrojani
+            marks = [(*mark, ACCEPTED_COLOUR if blue else REJECTED_COLOUR)
+                     for mark, blue in zip(candidate_marks, is_blue)] if candidate_boxes else []
+            marks += [(*mark, COUNTED_COLOUR) for mark in counted_marks]
+            self.annotator.submit(frame_index, frame, marks, _count_lines(center_x),
+                                  f"frame {frame_index}  count {self.count}", keep=bool(counted_marks))
+
+        # Dok se ništa ne približava liniji dovoljno je analizirati svaki idle_stride-ti frejm
+        if skip_counter == 0 and self.idle_stride > 1 and \
+                not _blob_near_line(contours, center_x, self.approach_margin):
+            skip_counter = self.idle_stride - 1
+        self.skip = skip_counter
+        return counted
+
+# Opcije brojanja koje open_counter prima pored videa i ROI-a (i koje brojač kolokvijum u multi.py prihvata)
+COUNTER_OPTIONS = ('background', 'background_samples', 'background_threshold', 'skip_frames', 'idle_stride',
+                   'approach_margin', 'strip_width', 'strip_refresh', 'track_distance', 'track_age', 'lower_blue',
+                   'upper_blue', 'line')
+
+
+def open_counter(video_path, roi, frame_shape, background='mog2', background_samples=15, store=None, camera=None,
+                 frame_store=None, profile=None, **counter_kwargs):
+    # CrossingCounter za ROI videa sa izabranom pozadinom. Uzorci dolaze iz store (BackgroundStore) po kameri
+    # i ROI-u; MOG2 ih primeni pre prvog frejma i sa store skuplja nove u counter.sampler. Statična pozadina
+    # je medijana sačuvanih uzoraka, ili frejmova ravnomerno uzetih iz celog videa (pa se čuvaju).
+    profile = profile or NULL_PROFILE
+    if background not in BACKGROUNDS:
+        raise ValueError(f"background must be one of {BACKGROUNDS}")
+    camera = camera or os.path.basename(video_path)
+    samples = store.load(camera, roi) if store is not None else None
+    if samples is not None and samples.shape[1:] != frame_shape:
+        samples = None
+
+    static = sampler = None
+    if background == 'static':
+        with profile.stage('background_sample'):
+            if samples is None:
+                frames = sample_frames(video_path, roi, background_samples, frame_store)
+                samples = np.stack(frames)
+                if store is not None:
+                    store.save(camera, roi, frames)
+            static = median_background(samples)
+    elif store is not None:
+        sampler = store.sampler()
+    return CrossingCounter(roi[2], profile=profile, background=static,
+                           warm_frames=samples if background == 'mog2' else None, sampler=sampler, **counter_kwargs)
+
+
+def count_blue_objects_crossing_center(video_path, show_frames=False, roi=None, skip_frames=3,
+                                       threaded=False, buffer_size=8, return_stats=False,
+                                       idle_stride=1, approach_margin=40, strip_width=None, strip_refresh=25,
+                                       track_distance=40, track_age=15,
+                                       lower_blue=(60, 110, 150), upper_blue=(82, 160, 172), stages=None,
+                                       frame_store=None, profile=None, annotate=None, annotate_format='mp4',
+                                       annotate_every=None, annotate_queue=32, background='mog2',
+                                       background_samples=15, background_threshold=30, background_store=None,
+                                       camera=None):
+    # show_frames je zastareo i ništa ne radi: prozor sa waitKey(0) je blokirao brojanje, pa se frejmovi sada
+    # upisuju na disk (annotate)
+    if show_frames:
+        warnings.warn("show_frames is deprecated and ignored; use annotate to write annotated frames",
+                      DeprecationWarning, stacklevel=2)
+    profile = profile or NULL_PROFILE
+    if background not in BACKGROUNDS:
+        raise ValueError(f"background must be one of {BACKGROUNDS}")
+    if stages is not None and (background != 'mog2' or background_store):
+        raise ValueError("stage caching supports only a cold MOG2 background")
+    if stages is None and frame_store is not None:
+        reader = frame_store.open(video_path, roi)
+    elif stages is None:
+        reader = open_frames(video_path, roi, threaded=threaded, buffer_size=buffer_size)
+    else:
+        # Sweep: dekodirani frejmovi i maske prednjeg plana dolaze iz keša faza
+        if strip_width:
+            raise ValueError("stage caching does not support strip mode")
+        frames = stages.get(('frames', video_path, roi),
+                            lambda: frame_store.frames(video_path, roi) if frame_store else load_frames(video_path, roi))
+        reader = MemoryFrameReader(frames)
+        foreground = _CachedForeground(stages, (video_path, roi), frames)
+
+    # Prvi frejm samo određuje dimenzije ROI i ne analizira se
+    with profile.stage('decode'):
+        first_frame = reader.read()
+    if first_frame is None:
+        reader.release()
+        return (0, reader.stats.summary()) if return_stats else 0
 
     if roi is None:
         roi = (0, 0, first_frame.shape[1], first_frame.shape[0])
 
-    x_roi, y_roi, w_roi, h_roi = roi
+    # Uzorci pozadine po kameri i ROI-u (--background-store); kamera je podrazumevano sam video
+    store = BackgroundStore(background_store) if background_store else None
+    camera = camera or os.path.basename(video_path)
 
-    lower_blue = np.array([60, 110, 150])
-    upper_blue = np.array([82, 160, 172])
+    # Anotirani frejmovi (--annotate) se crtaju i upisuju na pozadinskoj niti; bez toga je annotator None
+    annotator = open_annotator(annotate, video_path, annotate_format, annotate_every, annotate_queue)
 
-    center_x = w_roi // 2
+    counter = open_counter(video_path, roi, first_frame.shape, background=background,
+                           background_samples=background_samples, store=store, camera=camera,
+                           frame_store=frame_store, profile=profile, annotator=annotator, skip_frames=skip_frames,
+                           idle_stride=idle_stride, approach_margin=approach_margin, strip_width=strip_width,
+                           strip_refresh=strip_refresh, track_distance=track_distance, track_age=track_age,
+                           lower_blue=lower_blue, upper_blue=upper_blue, background_threshold=background_threshold)
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
+    while True:
+        # Čekanje na sledeći frejm: dekodiranje (ili kopija iz frame store-a), sa --threaded čekanje na red
+        with profile.stage('decode'):
+            cropped_frame = reader.read()
+        if cropped_frame is None:
             break
 
-        if skip_counter > 0:
-            skip_counter -= 1
-            continue
+        contours = None
+        if stages is not None:
+            with profile.stage('foreground'):
+                contours = foreground.contours(reader.position)
+        counter.process(cropped_frame, reader.position, contours)
 
-        cropped_frame = frame[y_roi:y_roi+h_roi, x_roi:x_roi+w_roi]
-        fgmask = fgbg.apply(cropped_frame)
-        fgmask = cv2.medianBlur(fgmask, 5)
-        #_, fgmask = cv2.threshold(fgmask, 25, 255, cv2.THRESH_BINARY)
+        if counter.skip > 0:
+            reader.skip(counter.skip)
 
-        contours, _ = cv2.findContours(fgmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    reader.release()
+    if annotator is not None:
+        annotator.close()
+    if counter.sampler is not None:
+        store.save(camera, roi, counter.sampler.frames)
+    profile.count('frames_skipped', reader.stats.skipped)
+    profile.count('counted', counter.count)
+    if return_stats:
+        return counter.count, reader.stats.summary()
+    return counter.count
+
+def calibrate_stride(video_paths, strides=(2, 4, 8), tolerance=0, workers=1, **kwargs):
+    # Najveći idle_stride čiji se brojevi po videu razlikuju od punog frame rate-a najviše za tolerance
+    full_counts = run_batch(count_blue_objects_crossing_center, video_paths, workers=workers, **kwargs)
+    best_stride = 1
+    errors = {}
+    for stride in sorted(strides):
+        counts = run_batch(count_blue_objects_crossing_center, video_paths, workers=workers,
+                           idle_stride=stride, **kwargs)
+        errors[stride] = max((abs(a - b) for a, b in zip(counts, full_counts)), default=0)
+        if errors[stride] <= tolerance:
+            best_stride = stride
+    return best_stride, errors
+
+def main(dataset_folder, workers=1, manifest=None, threaded=False, buffer_size=8, stats=False,
+         idle_stride=1, approach_margin=40, calibrate=None, stride_tolerance=0,
+         strip_width=None, strip_refresh=25, frame_store=None, frame_store_mb=4096, eval_cache=None,
+         profile=None, prometheus=None, annotate=None, annotate_format='mp4', annotate_every=None,
+         annotate_queue=32, background='mog2', background_samples=15, background_threshold=30,
+         background_store=None):
+    ground_truth_df, video_paths = load_manifest(dataset_folder, manifest)
+    # Dekodirani ROI frejmovi se čuvaju na disku i sledeće pokretanje ih samo mapira u memoriju
+    store = FrameStore(frame_store, frame_store_mb << 20) if frame_store else None
+
+    # Parametri od kojih zavisi broj (ostali utiču samo na brzinu)
+    params = {'roi': ROI, 'approach_margin': approach_margin, 'strip_width': strip_width,
+              'strip_refresh': strip_refresh, 'background': background, 'background_samples': background_samples,
+              'background_threshold': background_threshold}
+    if calibrate:
+        # Kalibracija broji sa istom pozadinom (i sačuvanim uzorcima) kao pravo pokretanje
+        idle_stride, errors = calibrate_stride(video_paths, calibrate, stride_tolerance, workers=workers,
+                                               frame_store=store, background_store=background_store, **params)
+        for stride, error in errors.items():
+            print(f"stride {stride}: max count difference {error}", file=sys.stderr)
+        print(f"using idle stride {idle_stride}", file=sys.stderr)
+    params['idle_stride'] = idle_stride
+
+    # Merenje faza (--profile/--prometheus); svaki proces vraća Profile uz broj
+    report = open_profile('kolokvijum', profile, prometheus)
+    count_fn = count_blue_objects_crossing_center
+    if report is not None:
+        count_fn = report.wrap(count_fn)
+
+    def count_videos(paths):
+        results = run_batch(count_fn, paths, workers=workers,
+                            threaded=threaded, buffer_size=buffer_size, return_stats=stats, frame_store=store,
+                            annotate=annotate, annotate_format=annotate_format, annotate_every=annotate_every,
+                            annotate_queue=annotate_queue, background_store=background_store, **params)
+        if report is not None:
+            results = report.collect(results)
+        if not stats:
+            return results
+        print_stats([os.path.basename(path) for path in paths], [summary for _, summary in results])
+        return [count for count, _ in results]
+
+    # Predikcije po videu se čuvaju po (sadržaj videa, algoritam, parametri, verzija koda)
+    if eval_cache and background_store and background == 'mog2':
+        # Topli MOG2 zavisi od prethodnih pokretanja, pa sačuvane predikcije ne bi odgovarale
+        print("--eval-cache is not used with a warm MOG2 background (--background-store)", file=sys.stderr)
+        eval_cache = None
+    cache = open_eval_cache(eval_cache, __file__, 'kolokvijum', params)
+    predicted_counts = cached_predictions(cache, video_paths, count_videos)
+    if report is not None:
+        report.finish()
 
-        for cnt in contours:
-            if 1000 < cv2.contourArea(cnt) < 4000:
-                x, y, w, h = cv2.boundingRect(cnt)
-                obj_id = (x, y, w, h)
-                center_of_object = x + w // 2 - 120
-
-                if center_x - 6 <= center_of_object <= center_x + 6:
-                    roi_hsv = cv2.cvtColor(cropped_frame[y:y+h, x:x+w], cv2.COLOR_BGR2HSV)
-                    mean_hsv = cv2.mean(roi_hsv)[:3]
-
-                    if lower_blue[0] <= mean_hsv[0] <= upper_blue[0] and \
-                       lower_blue[1] <= mean_hsv[1] <= upper_blue[1] and \
-                       lower_blue[2] <= mean_hsv[2] <= upper_blue[2]:
-                        counted_ids.add(obj_id)
-                        beetle_count += 1
-                        skip_counter = skip_frames
-                        cv2.rectangle(cropped_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                        cv2.imshow('Slika beetl-a',cropped_frame)
-                        cv2.waitKey(0)
-
-            elif 9000 < cv2.contourArea(cnt) < 12000 or 13000 < cv2.contourArea(cnt) < 40000: 
-                x, y, w, h = cv2.boundingRect(cnt)
-                step_x = max(w // 3, 1) 
-                step_y = max(h // 3, 1) 
-
-                for i in range(0, w, step_x):
-                    for j in range(0, h, step_y):
-                        sub_x = x + i
-                        sub_y = y + j
-                        sub_w = min(step_x, w - i)
-                        sub_h = min(step_y, h - j)
-
-                        sub_obj_id = (sub_x, sub_y, sub_w, sub_h)
-
-                        center_of_object = sub_x + sub_w // 2 + 110
-
-                        if center_x - 15 <= center_of_object <= center_x + 15 and sub_obj_id not in counted_ids:
-                            roi_hsv = cv2.cvtColor(cropped_frame[sub_y:sub_y+sub_h, sub_x:sub_x+sub_w], cv2.COLOR_BGR2HSV)
-                            mean_hsv = cv2.mean(roi_hsv)[:3]
-
-                            if 56 <= mean_hsv[0] <= 82 and \
-                            (110 <= mean_hsv[1] <= 130 or 140 <= mean_hsv[1] <= 160) and \
-                            150 <= mean_hsv[2] <= 170:
-                                counted_ids.add(sub_obj_id) 
-                                beetle_count += 1
-                                skip_counter = 40
-                                cv2.rectangle(cropped_frame, (sub_x, sub_y), (sub_x+step_x, sub_y+step_y), (0,255,0), 2)
-                                cv2.imshow('slika pravougaonik', cropped_frame)
-                                cv2.waitKey(0)
-
-    cap.release()
-    cv2.destroyAllWindows()
-    return beetle_count
-
-def main(dataset_folder):
-    ground_truth_df = pd.read_csv(f"{dataset_folder}/buzzy_beetle_count.csv")
-    ground_truth_series = ground_truth_df.set_index('video')['count']
-
-    predicted_counts = []
-    for i in range(1, 11):
-        video_path = f"{dataset_folder}/video_{i}.mp4"
-        roi = (400, 250, 500, 320)
-        beetle_count = count_blue_objects_crossing_center(video_path, show_frames=False, roi=roi)
-        predicted_counts.append(beetle_count)
-
-    predicted_counts_series = pd.Series(predicted_counts, index=ground_truth_series.index)
-    mae = np.mean(np.abs(predicted_counts_series - ground_truth_series))
+    mae = np.mean(np.abs(np.array(predicted_counts) - ground_truth_df['count'].to_numpy()))
     print(f"{mae:.1f}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python script.py <dataset_folder>")
-    main(sys.argv[1])
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Count blue beetles crossing the center line and print the MAE.")
+    parser.add_argument("dataset_folder")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of worker processes (0 = all cores, 1 = serial run)")
+    parser.add_argument("--manifest",
+                        help="CSV with video,count columns (default: <dataset_folder>/buzzy_beetle_count.csv)")
+    parser.add_argument("--threaded", action="store_true",
+                        help="decode frames on a separate thread while the previous ones are analysed")
+    parser.add_argument("--buffer-size", type=int, default=8,
+                        help="number of ROI frames buffered between decoder and analysis (with --threaded)")
+    parser.add_argument("--stats", action="store_true",
+                        help="print decode fps, analysis fps and queue occupancy per video to stderr")
+    parser.add_argument("--stride", type=int, default=1,
+                        help="analyse only every N-th frame while no blob is near the counting line")
+    parser.add_argument("--approach-margin", type=int, default=40,
+                        help="distance in pixels from the counting line at which full frame rate resumes")
+    parser.add_argument("--calibrate-stride", type=lambda value: [int(v) for v in value.split(",")],
+                        metavar="N,N,...",
+                        help="compare these strides against the full frame rate and use the largest one "
+                             "within --stride-tolerance")
+    parser.add_argument("--stride-tolerance", type=int, default=0,
+                        help="allowed per-video count difference to the full frame rate when calibrating")
+    parser.add_argument("--strip-width", type=int,
+                        help="run background subtraction only on bands of this width around the counting lines")
+    parser.add_argument("--strip-refresh", type=int, default=25,
+                        help="update the full-ROI background model every N frames in strip mode")
+    parser.add_argument("--frame-store", metavar="DIR",
+                        help="keep decoded ROI frames in DIR (keyed by video content and ROI) and memory-map them "
+                             "on later runs instead of decoding")
+    parser.add_argument("--frame-store-mb", type=int, default=4096,
+                        help="size limit of the frame store; least recently used videos are removed first")
+    parser.add_argument("--eval-cache", metavar="FILE",
+                        help="SQLite file with per-video predictions; only new or changed videos are recomputed")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="time every pipeline stage and write histograms, counters and per-video totals as JSON")
+    parser.add_argument("--prometheus", metavar="FILE",
+                        help="write the same measurements in Prometheus text format (implies profiling)")
+    parser.add_argument("--annotate", metavar="DIR",
+                        help="write annotated output (candidate boxes, counting lines, running count) for every video "
+                             "to DIR from a background thread; frames are dropped rather than slowing the count")
+    parser.add_argument("--annotate-format", choices=("mp4", "png"), default="mp4",
+                        help="one annotated MP4 per video, or PNG frames in a folder per video")
+    parser.add_argument("--annotate-every", type=int,
+                        help="annotate every N-th analysed frame (default: every frame for mp4; for png 0, "
+                             "i.e. only frames where a beetle is counted)")
+    parser.add_argument("--annotate-queue", type=int, default=32,
+                        help="frames waiting for the writer; when full, new frames are dropped")
+    parser.add_argument("--background", choices=BACKGROUNDS, default="mog2",
+                        help="mog2: adaptive MOG2 model; static: median of sampled frames, then absolute "
+                             "difference and threshold (cheaper, but does not follow lighting changes)")
+    parser.add_argument("--background-samples", type=int, default=15,
+                        help="frames sampled across each video for the static background")
+    parser.add_argument("--background-threshold", type=int, default=30,
+                        help="grey-level difference from the static background that counts as foreground")
+    parser.add_argument("--background-store", metavar="DIR",
+                        help="keep background samples per video and ROI in DIR: MOG2 starts warm from the samples "
+                             "of the previous run, the static background is not re-sampled")
+    args = parser.parse_args()
+    main(args.dataset_folder, workers=args.workers, manifest=args.manifest, threaded=args.threaded,
+         buffer_size=args.buffer_size, stats=args.stats, idle_stride=args.stride,
+         approach_margin=args.approach_margin, calibrate=args.calibrate_stride,
+         stride_tolerance=args.stride_tolerance, strip_width=args.strip_width,
+         strip_refresh=args.strip_refresh, frame_store=args.frame_store, frame_store_mb=args.frame_store_mb,
+         eval_cache=args.eval_cache, profile=args.profile, prometheus=args.prometheus, annotate=args.annotate,
+         annotate_format=args.annotate_format, annotate_every=args.annotate_every,
+         annotate_queue=args.annotate_queue, background=args.background,
+         background_samples=args.background_samples, background_threshold=args.background_threshold,
+         background_store=args.background_store)
@@ -0,0 +1,514 @@
+import argparse
+import asyncio
+import json
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from background import BACKGROUNDS, BackgroundStore, median_background
+from frames import crop_roi
+from kolokvijum import ROI, CrossingCounter
+
+# Zaglavlje svakog frejma test servera: širina, visina, indeks frejma, vreme snimanja (Unix sekunde)
+HEADER = struct.Struct('<IIQd')
+
+
+def _read_exact(stream, view):
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+class VideoFileSource:
+    # Video fajl kao izvor. Sa realtime=True frejmovi stižu brzinom snimanja, kao sa kamere, a vreme
+    # snimanja je trenutak u kome je frejm trebalo da stigne (kašnjenje dekodera se vidi u latenciji).
+    def __init__(self, path, realtime=False):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise OSError(f"cannot open {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.live = realtime
+        self._start = None
+        self._frames = 0
+
+    def _timestamp(self):
+        timestamp = time.time()
+        if self.live:
+            if self._start is None:
+                self._start = timestamp
+            due = self._start + self._frames / self.fps
+            if due > timestamp:
+                time.sleep(due - timestamp)
+            timestamp = due
+        self._frames += 1
+        return timestamp
+
+    def read(self):
+        # (frejm, vreme snimanja) ili None na kraju
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        return frame, self._timestamp()
+
+    def grab(self):
+        # Frejm koji se neće analizirati: grab() bez konverzije u BGR
+        if not self.cap.grab():
+            return False
+        self._timestamp()
+        return True
+
+    def close(self):
+        self.cap.release()
+
+
+class RawPipeSource:
+    # Sirovi BGR frejmovi poznate veličine iz pipe-a, npr. ffmpeg -i <kamera> -f rawvideo -pix_fmt bgr24 -
+    live = True
+
+    def __init__(self, stream, width, height):
+        self.stream = stream
+        self.shape = (height, width, 3)
+
+    def read(self):
+        frame = np.empty(self.shape, np.uint8)
+        if not _read_exact(self.stream, memoryview(frame.reshape(-1))):
+            return None
+        return frame, time.time()
+
+    def close(self):
+        pass  # stdin nije naš
+
+
+class SocketSource:
+    # Klijent test servera (serve_video): svaki frejm je HEADER pa sirovi BGR bajtovi
+    live = True
+
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, port))
+        self.stream = self.sock.makefile('rb')
+
+    def read(self):
+        header = bytearray(HEADER.size)
+        if not _read_exact(self.stream, memoryview(header)):
+            return None
+        width, height, _, timestamp = HEADER.unpack(header)
+        frame = np.empty((height, width, 3), np.uint8)
+        if not _read_exact(self.stream, memoryview(frame.reshape(-1))):
+            return None
+        return frame, timestamp
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+def open_source(spec, raw_size=None, realtime=False):
+    # "-" je stdin sa sirovim BGR frejmovima (potrebna je veličina), tcp://host:port je test server,
+    # sve ostalo je video fajl
+    if spec == '-':
+        if raw_size is None:
+            raise ValueError("raw frames on stdin need the frame size")
+        return RawPipeSource(sys.stdin.buffer, *raw_size)
+    if spec.startswith('tcp://'):
+        host, _, port = spec[len('tcp://'):].rpartition(':')
+        return SocketSource(host or '127.0.0.1', int(port))
+    return VideoFileSource(spec, realtime)
+
+
+class _FrameQueue:
+    # Nit čita izvor i u red od najviše size frejmova stavlja samo kopije ROI isečaka, pa ceo frejm
+    # ne ostaje u memoriji dok čeka analizu. Živ izvor ne čeka analizu: kada je red pun
+    # najstariji frejm se odbacuje (dropped). Fajl koji se ne pušta u realnom vremenu čeka, pa se ništa ne gubi.
+    # Frejmove do skip_until (npr. zbog stride-a) izvor koji ima grab() preskače bez dekodiranja u BGR.
+    # Izvor zatvara nit koja ga čita, kada izađe iz petlje. on_frame se poziva (sa niti čitača) kada red
+    # prestane da bude prazan i na kraju izvora.
+    def __init__(self, source, size, roi=None, on_frame=None):
+        self.source = source
+        self.size = size
+        self.roi = roi
+        self.on_frame = on_frame
+        self.drop = getattr(source, 'live', False)
+        self.frames = deque()
+        self.received = 0
+        self.dropped = 0
+        self.grabbed = 0
+        self.skip_until = -1
+        self.error = None
+        self._done = False
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    while not self.drop and len(self.frames) >= self.size and not self._stopped:
+                        self._cond.wait()
+                    if self._stopped:
+                        return
+                if self.received <= self.skip_until and hasattr(self.source, 'grab'):
+                    if not self.source.grab():
+                        return
+                    self.received += 1
+                    self.grabbed += 1
+                    continue
+                item = self.source.read()
+                if item is None:
+                    return
+                frame, timestamp = item
+                if self.roi is not None:
+                    frame = crop_roi(frame, self.roi).copy()
+                with self._cond:
+                    was_empty = not self.frames
+                    if len(self.frames) >= self.size:
+                        self.frames.popleft()
+                        self.dropped += 1
+                    self.frames.append((self.received, frame, timestamp))
+                    self.received += 1
+                    self._cond.notify_all()
+                if was_empty and self.on_frame is not None:
+                    self.on_frame()
+        except Exception as e:  # npr. prekinuta veza; analiza završava kao na kraju videa
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.source.close()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+            if self.on_frame is not None:
+                self.on_frame()
+
+    @property
+    def finished(self):
+        return self._done and not self.frames
+
+    def oldest(self):
+        # Vreme snimanja najstarijeg frejma koji čeka, ili None
+        with self._cond:
+            return self.frames[0][2] if self.frames else None
+
+    def get(self, block=True):
+        # (indeks, frejm, vreme snimanja); None kada izvor završi (ili, bez block, kada nema frejma)
+        with self._cond:
+            while block and not self.frames and not self._done:
+                self._cond.wait()
+            if not self.frames:
+                return None
+            item = self.frames.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        # Nit blokirana u čitanju živog izvora izlazi posle sledećeg frejma (daemon je, ne čeka se)
+        with self._cond:
+            self._stopped = True
+            self.frames.clear()
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+
+
+class CrossingEvent:
+    def __init__(self, source, timestamp, frame_index, bbox, count, latency):
+        self.source = source
+        self.timestamp = timestamp  # vreme snimanja frejma
+        self.frame_index = frame_index
+        self.bbox = bbox  # (x, y, w, h) u koordinatama celog frejma
+        self.count = count  # broj prebrojanih do sada, uključujući ovaj
+        self.latency = latency  # od snimanja frejma do događaja, sekunde
+
+    def to_dict(self):
+        return {'source': self.source, 'timestamp': round(self.timestamp, 3), 'frame': self.frame_index,
+                'bbox': list(self.bbox), 'count': self.count, 'latency': round(self.latency, 4)}
+
+
+class LiveCounter:
+    # Brojanje iz kolokvijum.py (CrossingCounter) nad frejmovima koji stižu uživo. step() analizira
+    # sledeći frejm i vraća listu prelazaka linije na njemu (najčešće praznu), ili None kada izvor završi.
+    # Frejm koji je čekao duže od max_latency se preskače, pa kašnjenje ostaje ograničeno i kada
+    # analiza ne stiže da obradi sve.
+    # background_store (BackgroundStore) čuva uzorke pozadine pod imenom izvora: MOG2 kreće toplo iz uzoraka
+    # prethodnog pokretanja i na close() čuva nove, a statična pozadina (background='static') je njihova medijana.
+    def __init__(self, source, roi=ROI, max_latency=None, buffer_size=4, name=None, on_frame=None,
+                 background='mog2', background_store=None, **counter_kwargs):
+        self.source = source
+        self.name = name
+        self.roi = roi
+        self.max_latency = max_latency
+        self.counter_kwargs = counter_kwargs
+        self.background = background
+        self.background_store = background_store
+        self._samples = self._sampler = None
+        if background not in BACKGROUNDS:
+            raise ValueError(f"background must be one of {BACKGROUNDS}")
+        if background_store is not None:
+            if name is None:
+                raise ValueError("a background store needs the source name")
+            self._samples = background_store.load(name, roi)
+        if background == 'static':
+            if self._samples is None:
+                raise ValueError(f"no stored background samples for {name}; run once with the MOG2 background "
+                                 f"and a background store first")
+            counter_kwargs['background'] = median_background(self._samples)
+        elif background_store is not None:
+            self._sampler = counter_kwargs['sampler'] = background_store.sampler()
+        self.counter = None
+        self.analysed = 0
+        self.skipped = 0
+        self.late = 0
+        self.latencies = deque(maxlen=1000)  # od snimanja do kraja analize, za poslednje analizirane frejmove
+        self.last_event = None  # vreme poslednjeg prelaska
+        self._skip_until = -1
+        self._queue = _FrameQueue(source, buffer_size, roi, on_frame)
+
+    def _analyse(self, item):
+        # Događaji na frejmu, ili None kada frejm nije analiziran (prvi, preskočen, zakasneo)
+        frame_index, cropped_frame, timestamp = item
+        if self.counter is None:
+            # Kao u count_blue_objects_crossing_center: prvi frejm samo određuje širinu ROI
+            width = self.roi[2] if self.roi else cropped_frame.shape[1]
+            samples = self._samples
+            if samples is not None and samples.shape[1:] != cropped_frame.shape:
+                if self.background == 'static':
+                    raise ValueError(f"stored background of {self.name} does not match the frame size")
+                samples = None
+            warm_frames = samples if self.background == 'mog2' else None
+            self.counter = CrossingCounter(width, warm_frames=warm_frames, **self.counter_kwargs)
+            return None
+        if frame_index <= self._skip_until:
+            self.skipped += 1
+            return None
+        if self.max_latency is not None and time.time() - timestamp > self.max_latency:
+            self.late += 1
+            return None
+
+        boxes = self.counter.process(cropped_frame, frame_index)
+        self._skip_until = self._queue.skip_until = frame_index + self.counter.skip
+        now = time.time()
+        self.analysed += 1
+        self.latencies.append(now - timestamp)
+        if boxes:
+            self.last_event = now
+        x0, y0 = self.roi[:2] if self.roi else (0, 0)
+        first = self.counter.count - len(boxes)
+        return [CrossingEvent(self.name, timestamp, frame_index, (x + x0, y + y0, w, h), first + i + 1,
+                              now - timestamp)
+                for i, (x, y, w, h) in enumerate(boxes)]
+
+    def step(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return None
+            events = self._analyse(item)
+            if events is not None:
+                return events
+
+    def drain(self, max_frames):
+        # Obrađuje najviše max_frames frejmova koji su već stigli, bez čekanja, i vraća sve njihove događaje
+        events = []
+        for _ in range(max_frames):
+            item = self._queue.get(block=False)
+            if item is None:
+                break
+            events.extend(self._analyse(item) or ())
+        return events
+
+    @property
+    def ready(self):
+        # Ima frejm koji čeka (drain ima šta da radi)
+        return bool(self._queue.frames)
+
+    @property
+    def finished(self):
+        return self._queue.finished
+
+    def lag(self, now=None):
+        # Koliko dugo čeka najstariji neobrađen frejm, sekunde
+        oldest = self._queue.oldest()
+        return 0.0 if oldest is None else (now or time.time()) - oldest
+
+    @property
+    def dropped(self):
+        return self._queue.dropped
+
+    @property
+    def stride(self):
+        return self.counter_kwargs.get('idle_stride', 1)
+
+    @stride.setter
+    def stride(self, value):
+        # idle_stride se menja u toku rada; važi samo dok se ništa ne približava liniji
+        self.counter_kwargs['idle_stride'] = value
+        if self.counter is not None:
+            self.counter.idle_stride = value
+
+    def __iter__(self):
+        while True:
+            events = self.step()
+            if events is None:
+                return
+            yield from events
+
+    @property
+    def count(self):
+        return self.counter.count if self.counter is not None else 0
+
+    def summary(self):
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            'source': self.name,
+            'count': self.count,
+            'frames': self._queue.received,
+            'analysed': self.analysed,
+            'skipped': self.skipped + self._queue.grabbed,
+            'late': self.late,
+            'dropped': self.dropped,
+            'stride': self.stride,
+            'lag': self.lag(),
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_p99': float(np.percentile(latencies, 99)),
+            'latency_max': float(latencies.max()),
+            'error': self._queue.error,
+        }
+
+    def close(self):
+        self._queue.close()
+        if self._sampler is not None:
+            # Kopija, jer analiza (nit pool-a) možda još dodaje uzorke
+            self.background_store.save(self.name, self.roi, list(self._sampler.frames))
+            self._sampler = None
+
+
+def iter_crossings(source, **kwargs):
+    # Generator događaja; izvor se zatvara i kada potrošač ranije prekine iteraciju
+    stream = LiveCounter(source, **kwargs)
+    try:
+        yield from stream
+    finally:
+        stream.close()
+
+
+async def crossings(source, executor=None, **kwargs):
+    # Asinhrona verzija: frejm se analizira u executor-u (OpenCV oslobađa GIL), pa jedna petlja
+    # događaja može da prati više kamera
+    loop = asyncio.get_running_loop()
+    stream = LiveCounter(source, **kwargs)
+    try:
+        while True:
+            events = await loop.run_in_executor(executor, stream.step)
+            if events is None:
+                return
+            for event in events:
+                yield event
+    finally:
+        stream.close()
+
+
+def _serve_client(conn, path, loop):
+    source = VideoFileSource(path, realtime=True)
+    index = 0
+    try:
+        with conn:
+            while True:
+                item = source.read()
+                if item is None:
+                    if not loop:
+                        return
+                    source.close()
+                    source = VideoFileSource(path, realtime=True)
+                    continue
+                frame, timestamp = item
+                frame = np.ascontiguousarray(frame)
+                conn.sendall(HEADER.pack(frame.shape[1], frame.shape[0], index, timestamp))
+                conn.sendall(memoryview(frame.reshape(-1)))
+                index += 1
+    except OSError:
+        pass  # klijent je prekinuo vezu
+    finally:
+        source.close()
+
+
+def serve_video(path, host='127.0.0.1', port=8765, loop=False):
+    # Lokalni test server: svakom klijentu šalje video brzinom snimanja, kao kamera
+    with socket.create_server((host, port)) as server:
+        print(f"serving {path} on tcp://{host}:{port}", file=sys.stderr)
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=_serve_client, args=(conn, path, loop), daemon=True).start()
+
+
+def _size(value):
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height)
+
+
+def parse_roi(value):
+    # Vrednost opcije --roi u live.py i scheduler.py: "full" ili x,y,w,h
+    if value == 'full':
+        return None
+    x, y, w, h = (int(v) for v in value.split(','))
+    return x, y, w, h
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count beetles crossing the center line on a live feed.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    count_parser = subparsers.add_parser("count", help="print every crossing as a JSON line as it happens")
+    count_parser.add_argument("source", help="video file, '-' for raw BGR frames on stdin, or tcp://HOST:PORT")
+    count_parser.add_argument("--raw-size", type=_size, metavar="WxH", help="frame size of raw frames on stdin")
+    count_parser.add_argument("--realtime", action="store_true",
+                              help="play a video file at its frame rate, like a camera")
+    count_parser.add_argument("--roi", type=parse_roi, default=ROI, metavar="X,Y,W,H",
+                              help="counting region (default: the one kolokvijum.py uses; 'full' = whole frame)")
+    count_parser.add_argument("--max-latency", type=float,
+                              help="skip frames that waited longer than this many seconds")
+    count_parser.add_argument("--buffer-size", type=int, default=4,
+                              help="frames queued between the source and the analysis; a live source drops "
+                                   "the oldest when it is full")
+    count_parser.add_argument("--stride", type=int, default=1,
+                              help="analyse only every N-th frame while no blob is near the counting line")
+    count_parser.add_argument("--strip-width", type=int,
+                              help="run background subtraction only on bands of this width around the counting lines")
+    count_parser.add_argument("--background", choices=BACKGROUNDS, default="mog2",
+                              help="mog2: adaptive model; static: median of the samples stored for this source "
+                                   "(needs --background-store)")
+    count_parser.add_argument("--background-store", metavar="DIR",
+                              help="background samples per source and ROI: MOG2 starts warm from the previous run "
+                                   "and saves new samples on exit")
+
+    serve_parser = subparsers.add_parser("serve", help="local test stream server that plays a video at its frame rate")
+    serve_parser.add_argument("video")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--loop", action="store_true", help="restart the video when it ends")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve_video(args.video, args.host, args.port, args.loop)
+    else:
+        stream = LiveCounter(open_source(args.source, args.raw_size, args.realtime), roi=args.roi,
+                             max_latency=args.max_latency, buffer_size=args.buffer_size, name=args.source,
+                             idle_stride=args.stride, strip_width=args.strip_width, background=args.background,
+                             background_store=BackgroundStore(args.background_store) if args.background_store
+                             else None)
+        try:
+            for event in stream:
+                print(json.dumps(event.to_dict()), flush=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stream.close()
+            print(json.dumps(stream.summary()), file=sys.stderr)
@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+import klk
+import kolokvijum
+from background import BACKGROUNDS
+from frames import crop_roi, open_frames
+from hsv_features import SharedHsv
+from klk import BeetleCounter, center_square_roi
+from kolokvijum import ROI, open_counter
+from video_batch import load_manifest, run_batch
+
+ALGORITHMS = ('kolokvijum', 'klk')
+# Opcije brojača svakog algoritma (pored name, algorithm i roi)
+COUNTER_OPTIONS = {'kolokvijum': kolokvijum.COUNTER_OPTIONS, 'klk': klk.COUNTER_OPTIONS}
+
+# Podrazumevano: oba algoritma sa svojim ROI i parametrima, da bi se uporedili na istim snimcima
+DEFAULT_COUNTERS = (
+    {'name': 'kolokvijum', 'algorithm': 'kolokvijum'},
+    {'name': 'klk', 'algorithm': 'klk'},
+)
+
+
+class _CrossingSlot:
+    # Brojač iz kolokvijum.py za jedan ROI: svoj pozadinski model, tragovi i preskakanje frejmova.
+    # Opcije (i pozadina, npr. 'background': 'static') se tumače kao u count_blue_objects_crossing_center.
+    def __init__(self, name, roi, params, profile, video_path):
+        self.name = name
+        self.roi = roi
+        self.params = params
+        self.video_path = video_path
+        self.profile = profile
+        self.counter = None
+        self.skip_until = -1
+
+    def process(self, frame, frame_index, shared):
+        if self.counter is None:
+            # Kao u count_blue_objects_crossing_center: prvi frejm samo određuje širinu ROI
+            self.counter = open_counter(self.video_path, self.roi, crop_roi(frame, self.roi).shape,
+                                        profile=self.profile, **self.params)
+            return
+        if frame_index <= self.skip_until:
+            return
+        self.counter.process(crop_roi(frame, self.roi), frame_index, hsv=lambda: shared.crop(self.roi))
+        self.skip_until = frame_index + self.counter.skip
+
+    @property
+    def count(self):
+        return self.counter.count if self.counter is not None else 0
+
+
+class _BeetleSlot:
+    # Brojač iz klk.py za jedan ROI; analizira svaki frejm
+    skip_until = -1
+
+    def __init__(self, name, roi, params, profile):
+        self.name = name
+        self.roi = roi
+        self.counter = BeetleCounter(profile=profile, **params)
+
+    def process(self, frame, frame_index, shared):
+        # U režimu trake se konvertuje samo traka, pa deljeni HSV cele ROI ne bi bio jeftiniji
+        hsv = shared.crop(self.roi) if not self.counter.strip_width else None
+        self.counter.process_frame(crop_roi(frame, self.roi), frame_index, hsv)
+
+    @property
+    def count(self):
+        return self.counter.count
+
+
+def _resolve_roi(roi, algorithm, frame_shape):
+    # ROI brojača ograničen na frejm: (x, y, w, h), 'full', ili podrazumevani ROI algoritma
+    height, width = frame_shape[:2]
+    if roi is None:
+        roi = ROI if algorithm == 'kolokvijum' else center_square_roi(frame_shape)
+    elif roi == 'full':
+        roi = (0, 0, width, height)
+    x, y, w, h = (int(v) for v in roi)
+    x0, y0 = min(max(x, 0), width), min(max(y, 0), height)
+    return x0, y0, min(x + w, width) - x0, min(y + h, height) - y0
+
+
+def _open_counter(spec, video_path, frame_shape, profile):
+    params = dict(spec)
+    name = params.pop('name')
+    algorithm = params.pop('algorithm')
+    roi = _resolve_roi(params.pop('roi', None), algorithm, frame_shape)
+    if algorithm == 'kolokvijum':
+        return _CrossingSlot(name, roi, params, profile, video_path)
+    if algorithm == 'klk':
+        return _BeetleSlot(name, roi, params, profile)
+    raise ValueError(f"algorithm must be one of {ALGORITHMS}")
+
+
+def check_counters(counters):
+    names = [spec.get('name') for spec in counters]
+    if not counters or None in names or len(set(names)) != len(names):
+        raise ValueError("every counter needs a unique name")
+    for spec in counters:
+        if spec.get('algorithm') not in ALGORITHMS:
+            raise ValueError(f"{spec['name']}: algorithm must be one of {ALGORITHMS}")
+        unknown = sorted(set(spec) - {'name', 'algorithm', 'roi'} - set(COUNTER_OPTIONS[spec['algorithm']]))
+        if unknown:
+            raise ValueError(f"{spec['name']}: unknown {spec['algorithm']} options {', '.join(unknown)}; "
+                             f"options: {', '.join(COUNTER_OPTIONS[spec['algorithm']])}")
+        if spec.get('background', 'mog2') not in BACKGROUNDS:
+            raise ValueError(f"{spec['name']}: background must be one of {BACKGROUNDS}")
+
+
+def count_video(video_path, counters=DEFAULT_COUNTERS, threaded=False, buffer_size=8, return_stats=False,
+                profile=None):
+    # Svaki frejm se dekodira jednom i prosleđuje svim brojačima; vraća {ime brojača: broj}.
+    # counters: lista rečnika {'name', 'algorithm', 'roi' (opciono) i parametri brojača tog algoritma}.
+    # Video se preskače (grab) samo kada nijednom brojaču naredni frejmovi nisu potrebni.
+    check_counters(counters)
+    reader = open_frames(video_path, None, threaded=threaded, buffer_size=buffer_size)
+    frame = reader.read()
+    if frame is None:
+        reader.release()
+        counts = {spec['name']: 0 for spec in counters}
+        return (counts, reader.stats.summary()) if return_stats else counts
+
+    slots = [_open_counter(spec, video_path, frame.shape, profile) for spec in counters]
+    shared = SharedHsv([slot.roi for slot in slots])
+    while frame is not None:
+        shared.new_frame(frame)
+        frame_index = reader.position
+        for slot in slots:
+            slot.process(frame, frame_index, shared)
+        skip = min(slot.skip_until for slot in slots) - frame_index
+        if skip > 0:
+            reader.skip(skip)
+        frame = reader.read()
+
+    reader.release()
+    counts = {slot.name: slot.count for slot in slots}
+    if return_stats:
+        return counts, dict(reader.stats.summary(), hsv_conversions=shared.conversions)
+    return counts
+
+
+def load_counters(path):
+    with open(path) as f:
+        counters = json.load(f)
+    check_counters(counters)
+    return counters
+
+
+def main(dataset_folder, counters=DEFAULT_COUNTERS, workers=1, manifest=None, threaded=False, buffer_size=8,
+         stats=False):
+    check_counters(counters)
+    manifest_df, video_paths = load_manifest(dataset_folder, manifest)
+    results = run_batch(count_video, video_paths, workers=workers, counters=counters, threaded=threaded,
+                        buffer_size=buffer_size, return_stats=stats)
+    if stats:
+        for video_path, (_, summary) in zip(video_paths, results):
+            print(f"{os.path.basename(video_path)}: {summary['frames']} frames ({summary['skipped']} skipped), "
+                  f"decode {summary['decode_fps']:.1f} fps, {summary['hsv_conversions']} HSV conversions",
+                  file=sys.stderr)
+        results = [counts for counts, _ in results]
+
+    # Brojevi po videu (CSV) na stdout, MAE svakog brojača na stderr
+    names = [spec['name'] for spec in counters]
+    print(','.join(['video'] + names))
+    for video, counts in zip(manifest_df['video'], results):
+        print(','.join([video] + [str(counts[name]) for name in names]))
+    if 'count' in manifest_df:
+        truth = manifest_df['count'].to_numpy()
+        for name in names:
+            mae = np.mean(np.abs(np.array([counts[name] for counts in results]) - truth))
+            print(f"{name}: MAE {mae:.2f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Decode every video once and run several counters (ROIs, lines, HSV ranges, algorithms) on it.")
+    parser.add_argument("dataset_folder")
+    parser.add_argument("--counters", metavar="FILE",
+                        help="JSON list of counters: {\"name\", \"algorithm\": kolokvijum|klk, \"roi\": [x, y, w, h] "
+                             "or \"full\", plus that algorithm's counter options, e.g. \"line\", \"track_line\", "
+                             "\"lower_blue\", \"upper_blue\", \"strip_width\", \"background\"} (default: both "
+                             "algorithms with their own settings; unknown options are rejected)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of worker processes (0 = all cores, 1 = serial run)")
+    parser.add_argument("--manifest",
+                        help="CSV with video,count columns (default: <dataset_folder>/buzzy_beetle_count.csv)")
+    parser.add_argument("--threaded", action="store_true",
+                        help="decode frames on a separate thread while the previous ones are analysed")
+    parser.add_argument("--buffer-size", type=int, default=8,
+                        help="number of frames buffered between decoder and analysis (with --threaded)")
+    parser.add_argument("--stats", action="store_true",
+                        help="print frames, decode fps and HSV conversions per video to stderr")
+    args = parser.parse_args()
+    main(args.dataset_folder, load_counters(args.counters) if args.counters else DEFAULT_COUNTERS,
+         workers=args.workers, manifest=args.manifest, threaded=args.threaded, buffer_size=args.buffer_size,
+         stats=args.stats)
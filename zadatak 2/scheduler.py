@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from background import BACKGROUNDS, BackgroundStore
+from kolokvijum import ROI
+from live import LiveCounter, open_source, parse_roi
+
+
+class _Stream:
+    # LiveCounter jednog izvora i ono što raspoređivač zna o njemu
+    def __init__(self, name, counter, base_stride):
+        self.name = name
+        self.counter = counter
+        self.base_stride = base_stride
+        # Kamera ili video pušten brzinom snimanja; fajl koji se čita najbrže moguće ne gubi frejmove kada
+        # analiza kasni, pa mu se stride ne menja
+        self.live = getattr(counter.source, 'live', False)
+        self.busy = False  # paket ovog toka je u pool-u
+        self.active = False  # imao je frejmove ili paket u radu pri poslednjem izboru
+        self.service = 0.0  # sekunde analize; manje znači veću prednost
+        self.dropped = 0  # odbačenih frejmova pri poslednjoj proveri opterećenja
+        self.started = time.time()
+
+
+class StreamScheduler:
+    # Više izvora u jednom procesu. Svaki tok ima svoj LiveCounter (pozadinski model, tragove, broj),
+    # a frejmove analiziraju niti jednog deljenog pool-a, u paketima od najviše batch_size frejmova.
+    # - Redosled: tok ima najviše jedan paket u radu, pa se njegovi frejmovi obrađuju redom.
+    # - Fer raspodela: sledeći paket dobija tok sa najmanje potrošenog vremena analize. Tok koji je mirovao
+    #   kreće od najmanjeg vremena aktivnih tokova, pa posle pauze ne može da zauzme ceo pool.
+    # - Preopterećenje: kada neki tok uživo kasni više od target_lag ili gubi frejmove, mirnim tokovima uživo
+    #   (bez prelaska u poslednjih quiet_seconds) se duplira stride, do max_stride. Fajlovi bez --realtime
+    #   se nikad ne proređuju i ne utiču na procenu opterećenja. Stride se vraća korak po korak
+    #   tek kada preopterećenja nema quiet_seconds, da se ne bi menjao na svakoj proveri.
+    def __init__(self, workers=None, batch_size=4, target_lag=0.5, max_stride=8, quiet_seconds=2.0,
+                 adjust_every=0.5):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.target_lag = target_lag
+        self.max_stride = max_stride
+        self.quiet_seconds = quiet_seconds
+        self.adjust_every = adjust_every
+        self.streams = []
+        self._floor = 0.0
+        self._last_overload = 0.0
+        self._loop = None
+        self._wake = None
+
+    def add(self, name, source, **kwargs):
+        # kwargs idu u LiveCounter (roi, max_latency, buffer_size, idle_stride, strip_width, background_store, ...)
+        counter = LiveCounter(source, name=name, on_frame=self._notify, **kwargs)
+        self.streams.append(_Stream(name, counter, kwargs.get('idle_stride', 1)))
+        return counter
+
+    def _notify(self):
+        # Sa niti čitača: stigao je frejm (ili je izvor završio)
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass  # petlja je već zatvorena
+
+    def _pick(self, slots):
+        for stream in self.streams:
+            active = stream.busy or stream.counter.ready
+            if active and not stream.active:
+                stream.service = max(stream.service, self._floor)
+            stream.active = active
+        services = [stream.service for stream in self.streams if stream.active]
+        if services:
+            self._floor = min(services)
+        ready = [stream for stream in self.streams if not stream.busy and stream.counter.ready]
+        ready.sort(key=lambda stream: stream.service)
+        return ready[:max(slots, 0)]
+
+    def _work(self, stream):
+        start = time.perf_counter()
+        events = stream.counter.drain(self.batch_size)
+        stream.service += time.perf_counter() - start
+        return events
+
+    def _shed_load(self, now):
+        live = [stream for stream in self.streams if stream.live]
+        worst_lag = max((stream.counter.lag(now) for stream in live), default=0.0)
+        dropping = False
+        for stream in live:
+            dropped = stream.counter.dropped
+            dropping = dropping or dropped > stream.dropped
+            stream.dropped = dropped
+        overloaded = worst_lag > self.target_lag or dropping
+        if overloaded:
+            self._last_overload = now
+        calm = now - self._last_overload > self.quiet_seconds
+        for stream in live:
+            counter = stream.counter
+            quiet = now - (counter.last_event or stream.started) > self.quiet_seconds
+            if overloaded and quiet and counter.stride < self.max_stride:
+                counter.stride = min(counter.stride * 2, self.max_stride)
+            elif calm and counter.stride > stream.base_stride:
+                counter.stride = max(counter.stride // 2, stream.base_stride)
+
+    def lags(self, now=None):
+        now = now or time.time()
+        return {stream.name: stream.counter.lag(now) for stream in self.streams}
+
+    def stats(self):
+        return [dict(stream.counter.summary(), service=stream.service) for stream in self.streams]
+
+    async def events(self):
+        # Događaji svih tokova, kako nastaju; završava kada svi izvori završe
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        running = {}
+        next_adjust = time.time() + self.adjust_every
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while True:
+                self._wake.clear()
+                now = time.time()
+                if now >= next_adjust:
+                    self._shed_load(now)
+                    next_adjust = now + self.adjust_every
+                for stream in self._pick(self.workers - len(running)):
+                    stream.busy = True
+                    running[self._loop.run_in_executor(pool, self._work, stream)] = stream
+                if not running and all(stream.counter.finished for stream in self.streams):
+                    return
+
+                wake = asyncio.ensure_future(self._wake.wait())
+                done, _ = await asyncio.wait([*running, wake], timeout=self.adjust_every,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                wake.cancel()
+                for future in done:
+                    if future is wake:
+                        continue
+                    stream = running.pop(future)
+                    stream.busy = False
+                    for event in future.result():
+                        yield event
+        finally:
+            for stream in self.streams:
+                stream.counter.close()
+            pool.shutdown(wait=True, cancel_futures=True)
+            self._loop = None
+
+
+async def _report(scheduler, every, file=sys.stderr):
+    while True:
+        await asyncio.sleep(every)
+        print('  '.join(f"{s['source']}: count {s['count']} lag {s['lag']:.2f}s stride {s['stride']} "
+                        f"dropped {s['dropped']}" for s in scheduler.stats()), file=file)
+
+
+async def _run(args):
+    scheduler = StreamScheduler(args.workers, args.batch_size, args.target_lag, args.max_stride, args.quiet_seconds)
+    store = BackgroundStore(args.background_store) if args.background_store else None
+    for source in args.sources:
+        scheduler.add(source, open_source(source, realtime=args.realtime), roi=args.roi,
+                      max_latency=args.max_latency, buffer_size=args.buffer_size, idle_stride=args.stride,
+                      strip_width=args.strip_width, background=args.background, background_store=store)
+    reporter = asyncio.ensure_future(_report(scheduler, args.report_every)) if args.report_every else None
+    try:
+        async for event in scheduler.events():
+            print(json.dumps(event.to_dict()), flush=True)
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        for summary in scheduler.stats():
+            print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Count beetles on several feeds in one process, sharing one pool of analysis threads.")
+    parser.add_argument("sources", nargs="+", help="video files or tcp://HOST:PORT test streams")
+    parser.add_argument("--realtime", action="store_true", help="play video files at their frame rate, like cameras")
+    parser.add_argument("-j", "--workers", type=int, default=0, help="analysis threads (0 = one per CPU core)")
+    parser.add_argument("--batch-size", type=int, default=4, help="most frames of one feed analysed per task")
+    parser.add_argument("--target-lag", type=float, default=0.5,
+                        help="when a feed lags more than this (seconds) or drops frames, raise the stride of "
+                             "quiet feeds")
+    parser.add_argument("--max-stride", type=int, default=8, help="highest stride load shedding may set")
+    parser.add_argument("--quiet-seconds", type=float, default=2.0,
+                        help="a feed without crossings for this long counts as quiet")
+    parser.add_argument("--buffer-size", type=int, default=16,
+                        help="frames queued per feed; a live feed drops the oldest when it is full")
+    parser.add_argument("--max-latency", type=float, help="skip frames that waited longer than this many seconds")
+    parser.add_argument("--roi", type=parse_roi, default=ROI, metavar="X,Y,W,H",
+                        help="counting region (default: the one kolokvijum.py uses; 'full' = whole frame)")
+    parser.add_argument("--stride", type=int, default=1, help="initial stride of every feed")
+    parser.add_argument("--strip-width", type=int,
+                        help="run background subtraction only on bands of this width around the counting lines")
+    parser.add_argument("--background", choices=BACKGROUNDS, default="mog2",
+                        help="mog2: adaptive model; static: median of the samples stored for each feed "
+                             "(needs --background-store)")
+    parser.add_argument("--background-store", metavar="DIR",
+                        help="background samples per feed and ROI: MOG2 starts warm from the previous run "
+                             "and saves new samples on exit")
+    parser.add_argument("--report-every", type=float, default=2.0,
+                        help="print per-feed count, lag, stride and drops to stderr every N seconds (0 = never)")
+    try:
+        asyncio.run(_run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,113 @@
+from collections import defaultdict
+
+import numpy as np
+
+
+class Track:
+    def __init__(self, track_id, x, y, frame_index):
+        self.id = track_id
+        self.x = x
+        self.y = y
+        self.first_seen = frame_index
+        self.last_seen = frame_index
+        self.hits = 1
+        self.counted = False
+
+
+class LineCrossing:
+    def __init__(self, track_id, frame_index, x, y, direction):
+        self.track_id = track_id
+        self.frame_index = frame_index
+        self.x = x
+        self.y = y
+        self.direction = direction  # 1 = s leva na desno, -1 = s desna na levo
+
+
+class CentroidTracker:
+    # Praćenje centara objekata između frejmova. Aktivni tragovi su u mreži ćelija veličine
+    # max_distance, pa se za svaku detekciju porede samo tragovi iz susednih ćelija. Trag koji
+    # nije viđen max_age frejmova se briše, tako da memorija zavisi samo od broja objekata u kadru.
+    def __init__(self, max_distance=40, max_age=30, line_x=None):
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.line_x = line_x
+        self.cell_size = max(int(max_distance), 1)
+        self.tracks = {}
+        self._grid = defaultdict(set)
+        self._next_id = 0
+        self._frame_index = -1
+
+    def _cell(self, x, y):
+        return (int(x) // self.cell_size, int(y) // self.cell_size)
+
+    def _nearby_tracks(self, centers):
+        ids = set()
+        for x, y in centers:
+            cx, cy = self._cell(x, y)
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    ids.update(self._grid.get((cx + dx, cy + dy), ()))
+        return sorted(ids)
+
+    def _move(self, track, x, y):
+        old_cell = self._cell(track.x, track.y)
+        new_cell = self._cell(x, y)
+        if old_cell != new_cell:
+            self._grid[old_cell].discard(track.id)
+            if not self._grid[old_cell]:
+                del self._grid[old_cell]
+            self._grid[new_cell].add(track.id)
+        track.x = x
+        track.y = y
+
+    def _expire(self, frame_index):
+        for track_id in [t.id for t in self.tracks.values() if frame_index - t.last_seen > self.max_age]:
+            track = self.tracks.pop(track_id)
+            cell = self._cell(track.x, track.y)
+            self._grid[cell].discard(track_id)
+            if not self._grid[cell]:
+                del self._grid[cell]
+
+    def update(self, centers, frame_index=None):
+        # Vraća trag za svaku detekciju (istim redom) i listu prelazaka linije u ovom frejmu
+        if frame_index is None:
+            frame_index = self._frame_index + 1
+        self._frame_index = frame_index
+        self._expire(frame_index)
+
+        assigned = [None] * len(centers)
+        candidate_ids = self._nearby_tracks(centers) if centers else []
+        if candidate_ids:
+            # Sve udaljenosti detekcija-trag odjednom, pa pohlepno spajanje od najbližih parova
+            points = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+            track_points = np.array([(self.tracks[i].x, self.tracks[i].y) for i in candidate_ids], dtype=np.float64)
+            distances = np.linalg.norm(points[:, None, :] - track_points[None, :, :], axis=2)
+            used_tracks = set()
+            for flat_index in np.argsort(distances, axis=None, kind='stable'):
+                det, cand = divmod(int(flat_index), len(candidate_ids))
+                if distances[det, cand] >= self.max_distance:
+                    break
+                if assigned[det] is not None or cand in used_tracks:
+                    continue
+                assigned[det] = self.tracks[candidate_ids[cand]]
+                used_tracks.add(cand)
+
+        crossings = []
+        for det, (x, y) in enumerate(centers):
+            track = assigned[det]
+            if track is None:
+                track = Track(self._next_id, x, y, frame_index)
+                self._next_id += 1
+                self.tracks[track.id] = track
+                self._grid[self._cell(x, y)].add(track.id)
+                assigned[det] = track
+                continue
+
+            if self.line_x is not None and (track.x <= self.line_x) != (x <= self.line_x):
+                direction = 1 if x > track.x else -1
+                crossings.append(LineCrossing(track.id, frame_index, x, y, direction))
+            self._move(track, x, y)
+            track.last_seen = frame_index
+            track.hits += 1
+
+        return assigned, crossings
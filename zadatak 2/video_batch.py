@@ -0,0 +1,35 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import cv2
+import pandas as pd
+
+
+def load_manifest(dataset_folder, manifest=None):
+    # Manifest je CSV u istom formatu kao buzzy_beetle_count.csv (kolone video, count),
+    # putanje videa su relativne u odnosu na dataset folder
+    manifest_path = manifest or os.path.join(dataset_folder, 'buzzy_beetle_count.csv')
+    manifest_df = pd.read_csv(manifest_path)
+    video_paths = [os.path.join(dataset_folder, video) for video in manifest_df['video']]
+    return manifest_df, video_paths
+
+
+def _init_worker():
+    # Svaki proces dobija jedno jezgro, pa OpenCV ne treba da pravi sopstvene niti
+    cv2.setNumThreads(1)
+
+
+def run_batch(count_fn, video_paths, workers=1, **kwargs):
+    func = partial(count_fn, **kwargs)
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(video_paths))
+
+    if workers <= 1:
+        return [func(video_path) for video_path in video_paths]
+
+    # map vraća rezultate redosledom ulaza, bez obzira na to koji proces je prvi završio
+    chunksize = max(1, len(video_paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return list(executor.map(func, video_paths, chunksize=chunksize))